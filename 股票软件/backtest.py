@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+技术面评分历史回测
+evaluate_signals 只对最新一根K线评分。这里把它的技术面规则（MACD、KDJ、均线排列、成交量放大、涨跌幅）
+写成数组表达式，对 (股票数, 交易日数) 的指标数组一次算出每只股票每天的评分与信号，
+再统计各信号出现后 N 个交易日的平均收益与上涨概率。
+逐日评分与逐日调用 evaluate_signals 的结果一致（见 benchmark.py backtest）。
+
+用法：python backtest.py [股票代码 ...]，不带参数时回测 ohlcv_cache 中的全部股票
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import ohlcv_cache
+from indicators import stack_frames, panel_indicators
+from scoring import SIGNALS, SIGNAL_THRESHOLDS, SENTIMENT_WEIGHT
+
+# 统计信号之后第几个交易日的收益
+HORIZONS = (1, 5, 10, 20)
+
+
+def _volume_high(volume, valid):
+    """每天的成交量是否高于前5日均量的1.2倍（历史不超过5根时与至今全部均量比较），与 fetch_stock_data 相同"""
+    vol = np.where(np.isnan(volume), 0.0, volume)
+    has_vol = ~np.isnan(volume)
+    zeros = np.zeros((volume.shape[0], 1))
+    csum = np.concatenate([zeros, np.cumsum(vol, axis=1)], axis=1)
+    ccount = np.concatenate([zeros, np.cumsum(has_vol, axis=1)], axis=1)
+    bars = np.cumsum(valid, axis=1)   # 截至当天的K线根数
+
+    t = np.arange(volume.shape[1])
+    lo = np.maximum(t - 5, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prev5 = (csum[:, t] - csum[:, lo]) / (ccount[:, t] - ccount[:, lo])
+        so_far = csum[:, t + 1] / ccount[:, t + 1]
+    avg = np.where(bars > 5, prev5, so_far)
+    with np.errstate(invalid='ignore'):
+        return volume > 1.2 * avg
+
+
+def tech_scores(panel, indicators=None):
+    """每只股票每天的技术面评分 (0~100)，返回 (N, T) 数组，补齐位置为 NaN
+
+    panel 为 stack_frames() 的返回值；indicators 为 panel_indicators() 的结果（不传则现算）。
+    NaN 参与比较时结果为 False，与 evaluate_signals 中标量比较的行为相同。
+    """
+    close, volume = panel['Close'], panel['Volume']
+    if indicators is None:
+        indicators = panel_indicators(close, panel['High'], panel['Low'])
+    valid = ~np.isnan(close)
+    ma5, ma10, ma20 = indicators['MA5'], indicators['MA10'], indicators['MA20']
+    K, D = indicators['K'], indicators['D']
+    pct = panel.get('PctChange')
+    if pct is None:
+        pct = np.full(close.shape, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        score = np.full(close.shape, 50.0)
+        score += np.where(indicators['Diff'] > indicators['DEA'], 10, -10)
+        score += np.select([(K < 20) & (D < 20), (K > 80) & (D > 80)], [15, -15], 0)
+        score += np.select([(close > ma5) & (ma5 > ma10) & (ma10 > ma20),
+                            (close < ma5) & (ma5 < ma10) & (ma10 < ma20)], [10, -10], 0)
+        score += np.where(_volume_high(volume, valid), 5, 0)
+        score += np.select([pct > 3, pct < -3], [5, -5], 0)
+    score = np.clip(score, 0, 100)
+    score[~valid] = np.nan
+    return score
+
+
+def final_scores(tech, sentiment=None, sentiment_weight=SENTIMENT_WEIGHT):
+    """综合评分：sentiment 为同形状的新闻情绪评分数组，缺失（None 或 NaN）的位置只按技术面评分"""
+    if sentiment is None:
+        return tech
+    return np.where(np.isnan(sentiment), tech, sentiment * sentiment_weight + tech * (1 - sentiment_weight))
+
+
+def signal_codes(scores, thresholds=SIGNAL_THRESHOLDS):
+    """评分转为信号编号（SIGNALS 的下标），评分缺失处为 -1"""
+    codes = np.searchsorted(np.asarray(thresholds, dtype='float64'), scores, side='right').astype(np.int8)
+    codes[np.isnan(scores)] = -1
+    return codes
+
+
+def forward_returns(close, horizons=HORIZONS):
+    """{h: (N, T) 数组}：当天收盘买入、h 个交易日后收盘卖出的收益率（%），之后不足 h 天为 NaN"""
+    out = {}
+    for h in horizons:
+        ret = np.full(close.shape, np.nan)
+        if close.shape[1] > h:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ret[:, :-h] = (close[:, h:] / close[:, :-h] - 1) * 100
+        out[h] = ret
+    return out
+
+
+def signal_stats(codes, returns):
+    """按信号统计之后的收益：每个信号一行，列为 count 及各周期的 ret_Nd（平均收益%）、win_Nd（上涨比例）
+
+    最后一行“全部”为所有有评分的交易日，作为比较基准。
+    """
+    n = len(SIGNALS)
+    flat_codes = codes.ravel()
+    rows = {'count': np.bincount(flat_codes[flat_codes >= 0], minlength=n).astype(float)}
+    totals = {'count': [rows['count'].sum()]}
+    for h, ret in returns.items():
+        r = ret.ravel()
+        mask = (flat_codes >= 0) & ~np.isnan(r)
+        c, r = flat_codes[mask], r[mask]
+        counts = np.bincount(c, minlength=n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rows[f'ret_{h}d'] = np.bincount(c, weights=r, minlength=n) / counts
+            rows[f'win_{h}d'] = np.bincount(c, weights=r > 0, minlength=n) / counts
+        totals[f'ret_{h}d'] = [r.mean() if len(r) else np.nan]
+        totals[f'win_{h}d'] = [(r > 0).mean() if len(r) else np.nan]
+    stats = pd.DataFrame(rows, index=SIGNALS)
+    return pd.concat([stats, pd.DataFrame(totals, index=['全部'])])
+
+
+def run(frames, sentiment=None, thresholds=SIGNAL_THRESHOLDS, horizons=HORIZONS):
+    """回测多只股票的K线（DataFrame 列表，各自按时间顺序）
+
+    返回 {'panel', 'indicators', 'scores', 'codes', 'returns', 'stats'}，数组形状为 (股票数, 交易日数)，
+    各股票按最后一天对齐、历史较短的在左侧以 NaN 补齐（同 stack_frames）。
+    """
+    panel = stack_frames(frames)
+    indicators = panel_indicators(panel['Close'], panel['High'], panel['Low'])
+    scores = final_scores(tech_scores(panel, indicators), sentiment)
+    codes = signal_codes(scores, thresholds)
+    returns = forward_returns(panel['Close'], horizons)
+    return {'panel': panel, 'indicators': indicators, 'scores': scores, 'codes': codes,
+            'returns': returns, 'stats': signal_stats(codes, returns)}
+
+
+def daily_series(frames, result):
+    """每只股票的逐日评分与信号：DataFrame 列表，列为 Date、Score、Signal"""
+    scores, codes = result['scores'], result['codes']
+    labels = np.array(SIGNALS + [None], dtype=object)  # 编号 -1 取到最后的 None
+    series = []
+    for row, df in enumerate(frames):
+        n = len(df)
+        start = scores.shape[1] - n
+        series.append(pd.DataFrame({
+            'Date': pd.to_datetime(df['Date']).to_numpy(),
+            'Score': scores[row, start:],
+            'Signal': labels[codes[row, start:]],
+        }))
+    return series
+
+
+def load_cached(symbols=None, cache_dir=None):
+    """从本地K线缓存读取股票日线，返回 (代码列表, DataFrame 列表)；symbols 为空时读取缓存中的全部股票"""
+    cache_dir = cache_dir or ohlcv_cache.CACHE_DIR
+    if not symbols:
+        symbols = sorted(name[:-4] for name in os.listdir(cache_dir) if name.endswith('.npz')) \
+            if os.path.isdir(cache_dir) else []
+    codes, frames = [], []
+    for symbol in symbols:
+        df = ohlcv_cache.load(symbol, cache_dir)
+        if df is not None and len(df):
+            codes.append(symbol)
+            frames.append(df)
+    return codes, frames
+
+
+def format_table(stats):
+    """生成回测统计的文本表格"""
+    horizons = [col[4:] for col in stats.columns if col.startswith('ret_')]
+    header = f"{'信号':<6}{'样本数':>8}" + "".join(f"{'收益' + h:>10}{'胜率' + h:>9}" for h in horizons)
+    lines = [header]
+    for label, row in stats.iterrows():
+        line = f"{label:<6}{int(row['count']):>10}"
+        for h in horizons:
+            ret, win = row[f'ret_{h}'], row[f'win_{h}']
+            line += f"{ret:>11.2f}%" if ret == ret else f"{'-':>12}"
+            line += f"{win:>10.1%}" if win == win else f"{'-':>10}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(symbols):
+    codes, frames = load_cached(symbols)
+    if not frames:
+        print("❌ 本地K线缓存中没有可回测的股票（先运行 wuxi_analysis.py 获取行情）")
+        return
+    started = time.perf_counter()
+    result = run(frames)
+    elapsed = time.perf_counter() - started
+    bars = sum(len(df) for df in frames)
+    print(f"📊 技术面评分回测：{len(codes)} 只股票，{bars} 个交易日，耗时 {elapsed:.2f} 秒")
+    print(format_table(result["stats"]))
+    for code, series in zip(codes, daily_series(frames, result)):
+        last = series.iloc[-1]
+        print(f" - {code}：{last['Date']:%Y-%m-%d} 评分 {last['Score']:.0f}，信号 {last['Signal']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
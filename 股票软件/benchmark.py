@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+用法：python benchmark.py [测试名 ...]，不带参数时运行全部测试
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import KD_TOLERANCE, kdj, add_kdj, StreamingIndicators, stack_frames, panel_indicators, panel_tech
+from kline_parsers import parse_sina_klines, parse_eastmoney_klines
+
+
+def generate_history(days=2500, seed=42):
+    """生成模拟日K线（默认约10年交易日）"""
+    rng = np.random.default_rng(seed)
+    close = 50.0 * np.cumprod(1 + rng.normal(0, 0.02, days))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, days)))
+    low = close * (1 - np.abs(rng.normal(0, 0.01, days)))
+    df = pd.DataFrame({
+        'Date': pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days),
+        'Open': close * (1 + rng.normal(0, 0.005, days)),
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 5_000_000, days),
+    })
+    # 连续9日价格不变会使 RSV 缺失（0/0），用来覆盖 K/D 重置的情形
+    flat_runs = rng.choice(days - 9, size=max(1, days // 500), replace=False) if days > 9 else []
+    for start in flat_runs:
+        price = df.at[start, 'Close']
+        df.loc[start:start + 8, ['Open', 'High', 'Low', 'Close']] = price
+    return df
+
+
+def _timeit(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _loop_kd(rsv_series):
+    """原先逐行计算 K/D 的写法，作为对照"""
+    K_values = []
+    D_values = []
+    for i, rsv in enumerate(rsv_series):
+        if i == 0 or pd.isna(rsv):
+            K = 50.0
+            D = 50.0
+        else:
+            K = K_values[-1] * 2/3 + rsv * 1/3
+            D = D_values[-1] * 2/3 + K * 1/3
+        K_values.append(K)
+        D_values.append(D)
+    return K_values, D_values
+
+
+def bench_kdj(days=2500, symbols=50, repeat=5):
+    """KDJ：逐行循环 vs 分块 IIR 滤波（10年日线 × symbols 只股票）"""
+    histories = [generate_history(days, seed=s) for s in range(symbols)]
+    rsvs = []
+    for df in histories:
+        low_list = df['Low'].rolling(window=9).min()
+        high_list = df['High'].rolling(window=9).max()
+        rsvs.append(((df['Close'] - low_list) / (high_list - low_list) * 100).to_numpy(copy=True))
+    # 中间插入几处 RSV 缺失，检查重置为 50 的处理
+    for rsv in rsvs:
+        rsv[days // 3:days // 3 + 2] = np.nan
+
+    max_error = 0.0
+    for rsv in rsvs:
+        K_loop, D_loop = _loop_kd(rsv)
+        K, D, _ = kdj(rsv)
+        max_error = max(max_error, np.max(np.abs(K - np.array(K_loop))), np.max(np.abs(D - np.array(D_loop))))
+    if max_error > KD_TOLERANCE:
+        raise AssertionError(f"分块递推结果与逐行循环相差 {max_error:.2e}，超过 {KD_TOLERANCE:.0e}")
+
+    t_loop = _timeit(lambda: [_loop_kd(rsv) for rsv in rsvs], repeat)
+    t_vec = _timeit(lambda: [kdj(rsv) for rsv in rsvs], repeat)
+    print(f"KDJ（{symbols} 只 × {days} 根K线，与逐行循环最大误差 {max_error:.1e}）")
+    print(f"  逐行循环:   {t_loop * 1000:8.1f} ms")
+    print(f"  分块IIR:    {t_vec * 1000:8.1f} ms  （加速 {t_loop / t_vec:.1f}x）")
+
+
+def _full_recompute(df):
+    df = df.copy()
+    df['MA5'] = df['Close'].rolling(window=5).mean()
+    df['MA10'] = df['Close'].rolling(window=10).mean()
+    df['MA20'] = df['Close'].rolling(window=20).mean()
+    df['EMA12'] = df['Close'].ewm(span=12, adjust=False).mean()
+    df['EMA26'] = df['Close'].ewm(span=26, adjust=False).mean()
+    df['Diff'] = df['EMA12'] - df['EMA26']
+    df['DEA'] = df['Diff'].ewm(span=9, adjust=False).mean()
+    df['MACD_hist'] = 2 * (df['Diff'] - df['DEA'])
+    add_kdj(df)
+    return df
+
+
+def bench_stream(days=2500, new_bars=200):
+    """新K线到达时：整表重算 vs 增量指标计算器（每根K线的耗时）"""
+    df = generate_history(days + new_bars)
+    history, incoming = df.iloc[:days], df.iloc[days:]
+
+    started = time.perf_counter()
+    for i in range(new_bars):
+        _full_recompute(df.iloc[:days + i + 1])
+    t_full = (time.perf_counter() - started) / new_bars
+
+    engine = StreamingIndicators.from_frame(history)
+    bars = incoming.to_dict('records')
+    started = time.perf_counter()
+    for bar in bars:
+        engine.update(bar)
+    t_stream = (time.perf_counter() - started) / new_bars
+
+    print(f"新K线更新指标（历史 {days} 根，逐根追加 {new_bars} 根）")
+    print(f"  整表重算:     {t_full * 1e6:10.1f} µs/根")
+    print(f"  增量计算器:   {t_stream * 1e6:10.1f} µs/根  （加速 {t_full / t_stream:.0f}x）")
+
+
+def bench_panel(symbols=1000, days=250):
+    """全市场指标：逐只股票 pandas 计算 vs (股票数 × 交易日数) 数组批量计算"""
+    frames = [generate_history(days, seed=s) for s in range(symbols)]
+
+    started = time.perf_counter()
+    for df in frames:
+        _full_recompute(df)
+    t_each = time.perf_counter() - started
+
+    started = time.perf_counter()
+    panel = stack_frames(frames)
+    panel_tech(panel, panel_indicators(panel['Close'], panel['High'], panel['Low']))
+    t_panel = time.perf_counter() - started
+
+    print(f"全市场指标（{symbols} 只 × {days} 根K线）")
+    print(f"  逐只计算:   {t_each * 1000:8.1f} ms")
+    print(f"  批量计算:   {t_panel * 1000:8.1f} ms  （加速 {t_each / t_panel:.1f}x，含堆叠数组）")
+
+
+def _sina_text(df):
+    """按新浪 getKLineData 的紧凑 JSON 格式输出K线"""
+    return json.dumps([{'day': f"{d:%Y-%m-%d}", 'open': f"{o:.3f}", 'high': f"{h:.3f}", 'low': f"{l:.3f}",
+                        'close': f"{c:.3f}", 'volume': str(v), 'ma_price5': round(c, 3), 'ma_volume5': int(v)}
+                       for d, o, h, l, c, v in zip(df['Date'], df['Open'], df['High'], df['Low'],
+                                                   df['Close'], df['Volume'])], separators=(',', ':'))
+
+
+def _eastmoney_klines(df):
+    """按东方财富 klines 的格式输出K线（日期,开,收,高,低,量(手),额,振幅,涨跌幅,涨跌额,换手率）"""
+    prev = df['Close'].shift(1).fillna(df['Close'])
+    return [f"{d:%Y-%m-%d},{o:.2f},{c:.2f},{h:.2f},{l:.2f},{v // 100},{c * v:.2f},{(h - l) / p * 100:.2f},"
+            f"{(c / p - 1) * 100:.2f},{c - p:.2f},{v / 1e7:.2f}"
+            for d, o, c, h, l, v, p in zip(df['Date'], df['Open'], df['Close'], df['High'], df['Low'],
+                                           df['Volume'], prev)]
+
+
+def _rowwise_sina(text):
+    """原先逐行构造字典的新浪解析写法，作为对照"""
+    df_data = []
+    for item in json.loads(text):
+        df_data.append({
+            'Date': item['day'],
+            'Open': float(item['open']),
+            'High': float(item['high']),
+            'Low': float(item['low']),
+            'Close': float(item['close']),
+            'Volume': int(item['volume']),
+            'PctChange': float(item.get('pct_chg', 0))
+        })
+    return pd.DataFrame(df_data)
+
+
+def _rowwise_eastmoney(klines):
+    """原先逐行 split 的东方财富解析写法，作为对照"""
+    df_data = []
+    for line in klines:
+        parts = line.split(',')
+        if len(parts) >= 9:
+            df_data.append({
+                'Date': parts[0],
+                'Open': float(parts[1]),
+                'Close': float(parts[2]),
+                'High': float(parts[3]),
+                'Low': float(parts[4]),
+                'Volume': int(parts[5]) * 100,
+                'PctChange': float(parts[8])
+            })
+    return pd.DataFrame(df_data)
+
+
+def bench_parse(days=2500, symbols=20, repeat=5):
+    """K线解析：逐行构造字典 vs 整列批量转换（10年日线 × symbols 只股票）"""
+    histories = [generate_history(days, seed=s) for s in range(symbols)]
+    sina_texts = [_sina_text(df) for df in histories]
+    eastmoney_lines = [_eastmoney_klines(df) for df in histories]
+
+    columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'PctChange']
+    for text, klines in zip(sina_texts, eastmoney_lines):
+        for old, new in [(_rowwise_sina(text), parse_sina_klines(text)),
+                         (_rowwise_eastmoney(klines), parse_eastmoney_klines(klines))]:
+            if not all(np.array_equal(old[c].to_numpy(), new[c].to_numpy()) for c in columns):
+                raise AssertionError("批量解析结果与逐行解析不一致")
+
+    print(f"K线解析（{symbols} 只 × {days} 根K线，结果逐位一致）")
+    for name, rowwise, bulk, payloads in [('新浪', _rowwise_sina, parse_sina_klines, sina_texts),
+                                          ('东方财富', _rowwise_eastmoney, parse_eastmoney_klines, eastmoney_lines)]:
+        t_row = _timeit(lambda: [rowwise(p) for p in payloads], repeat)
+        t_bulk = _timeit(lambda: [bulk(p) for p in payloads], repeat)
+        print(f"  {name}  逐行: {t_row * 1000:8.1f} ms   批量: {t_bulk * 1000:8.1f} ms  （加速 {t_row / t_bulk:.1f}x）")
+
+
+_NAME_CHARS = "东方华中国海天新金通宝利安信达科技电子医药生物能源材料建设环境智能云数字光伏"
+
+
+def _headline_variants(events=500, copies=4, seed=0):
+    """模拟多个来源对同一事件的不同措辞：加来源前缀、换标点、增删虚词"""
+    import random
+    rng = random.Random(seed)
+    subjects = ["股东减持股份计划", "收到监管问询函", "年度业绩预告", "签订重大合同", "回购股份进展", "新产品获批上市"]
+    titles = []
+    for e in range(events):
+        name = "".join(rng.choice(_NAME_CHARS) for _ in range(4))
+        base = f"{name}关于{rng.choice(subjects)}的公告"
+        for c in range(copies):
+            variant = base.replace("的公告", "公告") if c % 2 else base
+            titles.append(rng.choice(["", "【公告】", "快讯："]) + variant + rng.choice(["", "。", "！"]))
+    rng.shuffle(titles)
+    return titles
+
+
+def bench_cluster(events=500, copies=4, repeat=3):
+    """近似重复标题归并：MinHash-LSH 归簇耗时，以及归并后需要评分的标题数"""
+    from headline_clusters import cluster_titles
+    titles = _headline_variants(events, copies)
+    clusters = cluster_titles(titles)
+    t = _timeit(lambda: cluster_titles(titles), repeat)
+    print(f"标题归并（{events} 个事件 × {copies} 种措辞 = {len(titles)} 条标题）")
+    print(f"  归簇耗时:   {t * 1000:8.1f} ms   （{len(titles) / t:,.0f} 条/秒）")
+    print(f"  需评分标题: {len(clusters)} 条（原 {len(titles)} 条）")
+
+
+def bench_risk(keywords=500, documents=5000, length=400, repeat=3):
+    """风险关键词扫描：逐词子串查找 vs Aho-Corasick 自动机（documents 篇 × length 字的公告正文）"""
+    import random
+    from risk_scanner import KeywordMatcher, load_keywords
+    rng = random.Random(0)
+    words = load_keywords()
+    while len(words) < keywords:
+        words = list(dict.fromkeys(words + ["".join(rng.choice(_NAME_CHARS) for _ in range(rng.randint(2, 5)))]))
+    docs = ["".join(rng.choice(_NAME_CHARS + "关于公告的减持问询函") for _ in range(length)) for _ in range(documents)]
+
+    matcher = KeywordMatcher(words)
+    for doc in docs[:200]:
+        if sorted({w for w, _ in matcher.scan(doc)}) != sorted({w for w in words if w in doc}):
+            raise AssertionError("自动机扫描结果与逐词查找不一致")
+    t_naive = _timeit(lambda: [[w for w in words if w in doc] for doc in docs], repeat)
+    t_ac = _timeit(lambda: [matcher.scan(doc) for doc in docs], repeat)
+    print(f"风险关键词扫描（{len(words)} 个关键词 × {documents} 篇 × {length} 字）")
+    print(f"  逐词查找: {t_naive * 1000:8.1f} ms   自动机: {t_ac * 1000:8.1f} ms"
+          f"  （{documents / t_ac:,.0f} 篇/秒，加速 {t_naive / t_ac:.1f}x）")
+
+
+def _loop_backtest(df, evaluate_signals):
+    """逐日构造技术指标字典并调用 evaluate_signals，返回每天的技术面评分"""
+    df = _full_recompute(df)
+    volume = df['Volume']
+    scores = []
+    for t in range(len(df)):
+        row = df.iloc[t]
+        recent_vol_avg = volume.iloc[t - 5:t].mean() if t + 1 > 5 else volume.iloc[:t + 1].mean()
+        tech = {
+            'last_close': row['Close'], 'pct_change': row['PctChange'], 'ma5': row['MA5'],
+            'ma10': row['MA10'], 'ma20': row['MA20'], 'diff': row['Diff'], 'dea': row['DEA'],
+            'K': row['K'], 'D': row['D'],
+            'volume_high': (not pd.isna(row['Volume'])) and (row['Volume'] > 1.2 * recent_vol_avg),
+        }
+        scores.append(evaluate_signals(None, tech)[4])
+    return np.array(scores, dtype='float64')
+
+
+def bench_backtest(symbols=200, days=2500, check=5):
+    """历史回测：逐日调用 evaluate_signals vs 数组表达式（symbols 只 × days 根K线）"""
+    import contextlib
+    import io
+    import backtest
+    with contextlib.redirect_stdout(io.StringIO()):
+        from wuxi_analysis import evaluate_signals
+    frames = []
+    for s in range(symbols):
+        df = generate_history(days - (s % 7) * 100, seed=s)   # 长短不一，覆盖左侧补齐
+        df['PctChange'] = df['Close'].pct_change().fillna(0) * 100
+        frames.append(df)
+
+    started = time.perf_counter()
+    result = backtest.run(frames)
+    t_vec = time.perf_counter() - started
+
+    series = backtest.daily_series(frames, result)
+    started = time.perf_counter()
+    for df, daily in zip(frames[:check], series):
+        if not np.array_equal(_loop_backtest(df, evaluate_signals), daily['Score'].to_numpy()):
+            raise AssertionError("数组回测评分与逐日调用 evaluate_signals 不一致")
+    t_loop = (time.perf_counter() - started) / check * symbols
+
+    years = sum(len(df) for df in frames) / 250
+    print(f"历史回测（{symbols} 只，约 {years:,.0f} 个股票年，逐日评分一致）")
+    print(f"  逐日循环:   {t_loop:8.1f} s（按 {check} 只估算）")
+    print(f"  数组回测:   {t_vec:8.2f} s  （加速 {t_loop / t_vec:.0f}x）")
+    print(backtest.format_table(result['stats']))
+
+
+def bench_sweep(symbols=200, days=2500, news_share=0.1, workers=None):
+    """评分参数调参：单进程逐个组合 vs 进程池 + 共享内存（结果必须相同）"""
+    import param_sweep
+    frames = []
+    for s in range(symbols):
+        df = generate_history(days, seed=s)
+        df['PctChange'] = df['Close'].pct_change().fillna(0) * 100
+        frames.append(df)
+    tech, returns = param_sweep.prepare(frames)
+    rng = np.random.default_rng(0)
+    sentiment = np.where(rng.random(tech.shape) < news_share, rng.uniform(0, 100, tech.shape), np.nan)
+    combos = param_sweep.grid()
+    workers = workers or max(2, param_sweep.WORKERS)
+
+    sample = combos[:64]
+    started = time.perf_counter()
+    serial = param_sweep.sweep(tech, sentiment, returns, sample, workers=1, merge=False)
+    t_serial = (time.perf_counter() - started) / len(sample) * len(combos)
+    started = time.perf_counter()
+    table = param_sweep.sweep(tech, sentiment, returns, combos, workers=workers, merge=False)
+    t_pool = time.perf_counter() - started
+    merged = table.merge(serial, on=['weight', 'thresholds'], suffixes=('', '_serial'))
+    if len(merged) != len(sample) or not np.allclose(merged['buy_return'], merged['buy_return_serial'],
+                                                      equal_nan=True):
+        raise AssertionError("进程池调参结果与单进程不一致")
+
+    print(f"评分参数调参（{symbols} 只 × {days} 根K线，{len(combos)} 个组合，{workers} 个工作进程）")
+    print(f"  单进程:     {t_serial:8.1f} s（按 {len(sample)} 个组合估算）")
+    print(f"  进程池:     {t_pool:8.1f} s  （加速 {t_serial / t_pool:.1f}x，CPU 核数 {os.cpu_count()}"
+          + ("，不足 2 核时退回单进程" if (os.cpu_count() or 1) < 2 else "") + "）")
+    merged_table = param_sweep.collapse(table)
+    print(f"  买卖信号完全相同的组合合并后：{len(merged_table)}/{len(table)} 组")
+    print(param_sweep.format_table(merged_table, top_n=5))
+
+
+def bench_replay(cassette='default', repeat=3):
+    """回放录制的响应，测量新闻与行情获取（含解析）的耗时
+
+    需要先以 HTTP_CASSETTE=record 运行一次 wuxi_analysis.py 录制响应。回放时关闭K线缓存与竞速模式、
+    使用临时的数据源健康记录，保证每次运行走相同的解析路径。
+    """
+    import contextlib
+    import io
+    import http_client
+    import news_index
+    import source_health
+    import wuxi_analysis
+
+    http_client.set_cassette('replay', cassette)
+    wuxi_analysis.OHLCV_CACHE = False
+    wuxi_analysis.RACE_MODE = False
+    codes = [stock['code'] for stock in wuxi_analysis.stock_list]
+
+    def run():
+        source_health._scoreboard = source_health.SourceHealth(path=None)
+        news_index._index = news_index.NewsIndex(path=None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for code in codes:
+                wuxi_analysis.fetch_news(code)
+                wuxi_analysis.fetch_stock_data(code)
+
+    try:
+        run()
+        if not http_client._cassette_stats['replayed']:
+            print(f"录制 {cassette} 中没有可回放的响应，请先以 HTTP_CASSETTE=record 运行 wuxi_analysis.py")
+            return
+        t_replay = _timeit(run, repeat)
+    finally:
+        http_client.set_cassette(None)
+    print(f"回放录制 {cassette}（{len(codes)} 只股票，新闻 + 行情，含解析）")
+    print(f"  每轮耗时:   {t_replay * 1000:8.1f} ms")
+
+
+def bench_load(symbols=200, latency=0.02, error_rate=0.05, workers=None, throttle=False):
+    """压测：对本地模拟服务器并发获取 symbols 只股票的新闻与行情（含解析）
+
+    throttle=False 时关闭按主机限速，测量获取流程本身的吞吐量（503 仍会退避重试）。
+    """
+    import contextlib
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+    import http_client
+    import rate_limit
+    import news_index
+    import source_health
+    import stub_server
+    import wuxi_analysis
+
+    server, base_url = stub_server.start_in_background(port=0, latency=latency, error_rate=error_rate)
+    rate_limit.ENABLED = throttle
+    http_client.set_stub_server(base_url)
+    wuxi_analysis.OHLCV_CACHE = False
+    source_health._scoreboard = source_health.SourceHealth(path=None)
+    news_index._index = news_index.NewsIndex(path=None)
+    codes = [f"{'sh' if k % 2 else 'sz'}{600000 + k:06d}" for k in range(symbols)]
+
+    def one(code):
+        started = time.perf_counter()
+        news, _ = wuxi_analysis.fetch_news(code)
+        df, _ = wuxi_analysis.fetch_stock_data(code)
+        return time.perf_counter() - started, bool(news), df is not None
+
+    try:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=workers or wuxi_analysis.MAX_CONCURRENCY) as executor:
+                results = list(executor.map(one, codes))
+        total = time.perf_counter() - started
+    finally:
+        http_client.set_stub_server(None)
+        rate_limit.ENABLED = True
+        server.shutdown()
+        server.server_close()
+
+    latencies = np.array([r[0] for r in results])
+    print(f"模拟服务器压测（{symbols} 只股票，延迟 {latency * 1000:.0f} ms，出错率 {error_rate:.0%}）")
+    print(f"  总耗时:     {total:8.2f} s  （{symbols / total:.1f} 只/秒）")
+    print(f"  单只耗时:   p50 {np.percentile(latencies, 50) * 1000:.0f} ms，p95 {np.percentile(latencies, 95) * 1000:.0f} ms")
+    print(f"  获取成功:   新闻 {sum(r[1] for r in results)} 只，行情 {sum(r[2] for r in results)} 只")
+
+
+def _store_scores(store_dir, symbols):
+    """工作进程：按目录打开全市场K线存储（内存映射，不复制），计算这些股票最新一根的技术面评分"""
+    import scoring
+    import universe_store
+    store = universe_store.UniverseStore(store_dir)
+    return [scoring.tech_score(tech) for tech in panel_tech(store.panel(symbols))]
+
+
+def bench_store(symbols=1000, days=2500, workers=2):
+    """全市场K线存储：逐只读取 npz 缓存并堆叠 vs 内存映射存储（多进程各自打开同一存储）"""
+    import multiprocessing
+    import shutil
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    import backtest
+    import ohlcv_cache
+    import scoring
+    import universe_store
+
+    root = tempfile.mkdtemp()
+    cache_dir, store_dir = os.path.join(root, 'cache'), os.path.join(root, 'store')
+    try:
+        codes = [f"sh{600000 + s}" for s in range(symbols)]
+        for s, code in enumerate(codes):
+            df = generate_history(days - (s % 7) * 100, seed=s)
+            df['PctChange'] = df['Close'].pct_change().fillna(0) * 100
+            ohlcv_cache.save(code, df, cache_dir)
+
+        started = time.perf_counter()
+        _, report = universe_store.build(codes, cache_dir, store_dir)
+        t_build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _, frames = backtest.load_cached(codes, cache_dir)
+        panel_npz = stack_frames(frames)
+        t_npz = time.perf_counter() - started
+        started = time.perf_counter()
+        store = universe_store.UniverseStore(store_dir)
+        panel_store = store.panel(codes)
+        t_store = time.perf_counter() - started
+        if not np.allclose(panel_npz['Close'], panel_store['Close'], rtol=1e-6, equal_nan=True):
+            raise AssertionError("内存映射存储中的收盘价与 npz 缓存不一致")
+
+        expected = [scoring.tech_score(tech) for tech in panel_tech(panel_store)]
+        chunks = [codes[i::workers] for i in range(workers)]
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_store_scores, [store_dir] * workers, chunks))
+        t_pool = time.perf_counter() - started
+        by_code = {code: score for chunk, scores in zip(chunks, results) for code, score in zip(chunk, scores)}
+        if [by_code[code] for code in codes] != expected:
+            raise AssertionError("工作进程读取存储算出的评分与本进程不一致")
+
+        frame_bytes = sum(df.memory_usage(deep=True).sum() for df in frames)
+        store_bytes = sum(os.path.getsize(os.path.join(store_dir, name)) for name in os.listdir(store_dir))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(f"全市场K线存储（{symbols} 只，{report['bars']:,} 根K线，构建 {t_build:.1f} s）")
+    print(f"  npz 逐只读取并堆叠: {t_npz:8.2f} s  （DataFrame 共 {frame_bytes / 1e6:.0f} MB）")
+    print(f"  内存映射存储取面板: {t_store:8.2f} s  （加速 {t_npz / t_store:.0f}x，存储文件 {store_bytes / 1e6:.0f} MB）")
+    print(f"  {workers} 个进程各自打开存储评分: {t_pool:.2f} s（含进程启动，评分与本进程一致）")
+
+
+def _eager_indicators(df):
+    """原先 fetch_stock_data 中逐列全部计算的写法，作为对照"""
+    df['MA5'] = df['Close'].rolling(window=5).mean()
+    df['MA10'] = df['Close'].rolling(window=10).mean()
+    df['MA20'] = df['Close'].rolling(window=20).mean()
+    df['EMA12'] = df['Close'].ewm(span=12, adjust=False).mean()
+    df['EMA26'] = df['Close'].ewm(span=26, adjust=False).mean()
+    df['Diff'] = df['EMA12'] - df['EMA26']
+    df['DEA'] = df['Diff'].ewm(span=9, adjust=False).mean()
+    df['MACD_hist'] = 2 * (df['Diff'] - df['DEA'])
+    add_kdj(df)
+    return df
+
+
+def bench_graph(symbols=200, days=2500, repeat=3):
+    """指标依赖图：按需计算 vs 原先逐列全部计算（TECH_INDICATORS 的结果必须逐位一致）"""
+    from indicators import compute_indicators, TECH_INDICATORS
+    frames = [generate_history(days, seed=s) for s in range(symbols)]
+    for df in frames:
+        eager = _eager_indicators(df.copy())
+        lazy = compute_indicators(df.copy(), TECH_INDICATORS)
+        if not all(eager[col].equals(lazy[col]) for col in eager.columns):
+            raise AssertionError("依赖图计算的指标与原先的写法不一致")
+
+    requests = [
+        ('原先逐列全部计算', _eager_indicators),
+        ('依赖图 TECH_INDICATORS', lambda df: compute_indicators(df, TECH_INDICATORS)),
+        ('依赖图 + RSI/BOLL/ATR/OBV', lambda df: compute_indicators(df, TECH_INDICATORS + ['RSI14', 'BOLL_UP', 'ATR14', 'OBV'])),
+        ('依赖图只取 MA5/10/20', lambda df: compute_indicators(df, ['MA5', 'MA10', 'MA20'])),
+        ('依赖图只取 K/D', lambda df: compute_indicators(df, ['K', 'D'])),
+    ]
+    print(f"指标依赖图（{symbols} 只 × {days} 根K线，TECH_INDICATORS 与原写法逐位一致）")
+    for label, func in requests:
+        t = _timeit(lambda: [func(df.copy()) for df in frames], repeat)
+        print(f"  {label}: {t * 1000:.1f} ms")
+
+
+BENCHMARKS = {
+    'kdj': bench_kdj,
+    'stream': bench_stream,
+    'panel': bench_panel,
+    'parse': bench_parse,
+    'cluster': bench_cluster,
+    'risk': bench_risk,
+    'backtest': bench_backtest,
+    'sweep': bench_sweep,
+    'replay': bench_replay,
+    'load': bench_load,
+    'store': bench_store,
+    'graph': bench_graph,
+}
+
+
+def main(names):
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"未知的测试: {name}（可选: {', '.join(BENCHMARKS)}）")
+            continue
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端时限
+用 budget(秒) 为一段流程（如分析一只股票）设定总时限，时限保存在 contextvars 中，
+随 contextvars.copy_context() 传到竞速获取的工作线程。http_client 发出的每个请求的超时
+都不超过剩余时间，时限用完后的请求直接抛出 DeadlineExceeded（requests 的 Timeout 子类，
+各数据源按超时失败处理）。嵌套的 budget 取两者中较早的截止时间。
+"""
+
+import contextlib
+import contextvars
+import time
+
+import requests
+
+# 剩余时间少于该值时不再发出请求（秒）
+MIN_REQUEST_TIMEOUT = 0.5
+
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """时限已用完"""
+
+
+@contextlib.contextmanager
+def budget(seconds):
+    """在 with 块内施加 seconds 秒的总时限（seconds 为 None 时不限时）"""
+    if seconds is None:
+        yield
+        return
+    end = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(end if outer is None else min(outer, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """当前时限的剩余秒数，没有时限时返回None"""
+    end = _deadline.get()
+    return None if end is None else max(0.0, end - time.monotonic())
+
+
+def expired():
+    left = remaining()
+    return left is not None and left < MIN_REQUEST_TIMEOUT
+
+
+def clamp_timeout(timeout):
+    """把请求超时限制在剩余时间内；时限已用完时抛出 DeadlineExceeded
+
+    timeout 可以是秒数或 requests 的 (连接超时, 读取超时)。
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left < MIN_REQUEST_TIMEOUT:
+        raise DeadlineExceeded(f"时限已用完（剩余 {left:.2f} 秒）")
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return left if timeout is None else min(timeout, left)
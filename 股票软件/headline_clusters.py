@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复新闻标题归并
+同一事件在新浪新闻、东方财富公告、雪球上的标题措辞略有不同，按标题完全相同去重会漏掉。
+标题去掉标点空白后取汉字二元组（相邻两个字符），用 MinHash 签名 + LSH 分段分桶找出候选对，
+再用二元组集合的 Jaccard 相似度确认，相似的标题用并查集归为一簇；整体耗时与标题数近似线性。
+每簇只需对代表标题（列表中最靠前、即最新的一条）评分，簇大小作为权重。
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+# 两个标题的二元组集合 Jaccard 相似度不低于该值时视为同一事件
+JACCARD_THRESHOLD = 0.75
+NGRAM = 2
+# MinHash 签名长度 = BANDS × ROWS；签名在任一段上完全相同即成为候选对
+BANDS = 16
+ROWS = 4
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, BANDS * ROWS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, BANDS * ROWS, dtype=np.uint64)
+
+# 只保留汉字、字母和数字，标点、空白、全角符号都不参与比较
+_NOISE = re.compile(r'[^0-9a-z\u4e00-\u9fff]+')
+
+
+def shingles(title):
+    """标题的字符 n 元组集合（标题短于 n 个字符时取整个标题）"""
+    text = _NOISE.sub('', title.lower())
+    if len(text) <= NGRAM:
+        return {text} if text else set()
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _signatures(shingle_sets):
+    # 所有标题的元组哈希拼成一列，一次算出 (a·x + b) mod p，再按标题分段取最小值
+    lengths = np.array([max(1, len(s)) for s in shingle_sets])
+    hashes = np.array([zlib.crc32(g.encode('utf-8')) % _PRIME for s in shingle_sets for g in (s or {''})],
+                      dtype=np.uint64)
+    values = (hashes[:, None] * _A[None, :] + _B[None, :]) % _PRIME
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.minimum.reduceat(values, offsets, axis=0)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_titles(titles, threshold=JACCARD_THRESHOLD):
+    """把近似重复的标题归簇，返回 [[下标, ...], ...]：簇内下标升序，各簇按首个下标排列"""
+    titles = list(titles)
+    if not titles:
+        return []
+    shingle_sets = [shingles(title) for title in titles]
+    signatures = _signatures(shingle_sets).reshape(len(titles), BANDS, ROWS)
+
+    parent = list(range(len(titles)))
+    for band in range(BANDS):
+        buckets = {}
+        for i, key in enumerate(map(bytes, signatures[:, band, :])):
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            # 桶内每个簇只留一条代表，新标题只和各簇代表比较，大桶也不会退化为两两比较
+            heads = []
+            for i in members:
+                root = _find(parent, i)
+                for head in heads:
+                    head_root = _find(parent, head)
+                    if head_root == root:
+                        break
+                    a, b = shingle_sets[i], shingle_sets[head]
+                    if a and b and len(a & b) >= threshold * len(a | b):
+                        parent[max(root, head_root)] = min(root, head_root)
+                        break
+                else:
+                    heads.append(i)
+
+    clusters = {}
+    for i in range(len(titles)):
+        clusters.setdefault(_find(parent, i), []).append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def representatives(news, threshold=JACCARD_THRESHOLD):
+    """新闻 [(日期, 标题), ...] 归簇后每簇取最靠前的一条，返回 [(日期, 标题, 簇大小), ...]"""
+    news = list(news)
+    return [(*news[members[0]], len(members))
+            for members in cluster_titles([title for _, title in news], threshold)]
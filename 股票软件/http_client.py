@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端
+进程内复用同一个 requests.Session：按主机维护长连接池，统一默认请求头和超时，
+并统计每个主机的请求数与新建连接数，便于观察连接复用的效果
+
+录制/回放（cassette）：
+- record：正常联网，并把每个 GET 请求的原始响应压缩保存到 CASSETTE_DIR/<录制名>/
+- replay：不联网，按请求（方法 + URL + 参数 + 请求体）从录制库中取出响应；未录制的请求
+  抛出 ConnectionError，与断网时的表现一致
+回放时解析代码与联网时完全相同，可在离线环境中重复测量包括解析在内的完整流程耗时。
+可通过环境变量 HTTP_CASSETTE=record|replay、HTTP_CASSETTE_NAME=录制名 或 set_cassette() 开启。
+
+模拟服务器：设置 STUB_SERVER（环境变量 STOCK_STUB_SERVER 或 set_stub_server()）后，所有请求保留路径与参数，
+改发到本地模拟服务器（见 stub_server.py），用于压测而不请求真实网站。
+
+限速：联网请求按原始主机经 rate_limit 令牌桶限速，429/502/503 时退避后重试（见 rate_limit.py）。
+时限：在 deadline.budget() 内发出的请求，超时不超过剩余时间；剩余时间不够退避时不再重试。
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import deadline
+import rate_limit
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
+DEFAULT_TIMEOUT = 10  # 秒
+
+# 默认每个主机保持的连接数
+DEFAULT_POOL_SIZE = 4
+
+# 常用主机的连接池大小（并发分析多只股票时这些主机的在途请求最多）
+HOST_POOL_SIZES = {
+    'money.finance.sina.com.cn': 16,
+    'vip.stock.finance.sina.com.cn': 16,
+    'push2his.eastmoney.com': 8,
+    'np-anotice-stock.eastmoney.com': 8,
+    'qt.gtimg.cn': 8,
+    'xueqiu.com': 4,
+    'stock.xueqiu.com': 4,
+}
+
+CASSETTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes')
+CASSETTE_MODE = os.environ.get('HTTP_CASSETTE') or None   # None / 'record' / 'replay'
+CASSETTE_NAME = os.environ.get('HTTP_CASSETTE_NAME', 'default')
+# 只录制这些方法的请求（推送等有副作用的请求不录制）
+CASSETTE_METHODS = {'GET'}
+# 计算请求键时忽略的查询参数：随运行日期变化的结束日期、防缓存时间戳等，忽略后隔天仍可回放
+CASSETTE_IGNORED_PARAMS = {'end', '_'}
+# 响应内容已解压保存，这些响应头不再适用
+_DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+# 本地模拟服务器地址，如 http://127.0.0.1:8765；None 表示请求真实网站
+STUB_SERVER = os.environ.get('STOCK_STUB_SERVER') or None
+
+_session = None
+_adapters = []
+_lock = threading.Lock()
+_cassette_stats = {'recorded': 0, 'replayed': 0, 'missed': 0}
+
+
+def _build_session():
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    # 未单独配置的主机共用默认适配器，每个主机一个连接池
+    default_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=DEFAULT_POOL_SIZE)
+    session.mount('http://', default_adapter)
+    session.mount('https://', default_adapter)
+    _adapters.append(default_adapter)
+
+    for host, size in HOST_POOL_SIZES.items():
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        session.mount(f'http://{host}/', adapter)
+        session.mount(f'https://{host}/', adapter)
+        _adapters.append(adapter)
+    return session
+
+
+def get_session():
+    """返回进程共享的 Session（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def set_cassette(mode, name=None):
+    """切换录制/回放模式：mode 为 None（正常联网）、'record' 或 'replay'"""
+    global CASSETTE_MODE, CASSETTE_NAME
+    if mode not in (None, 'record', 'replay'):
+        raise ValueError(f"未知的录制模式: {mode}（可选: None, 'record', 'replay'）")
+    CASSETTE_MODE = mode
+    if name:
+        CASSETTE_NAME = name
+
+
+def set_stub_server(base_url):
+    """把之后的所有请求改发到模拟服务器 base_url（None 恢复请求真实网站）"""
+    global STUB_SERVER
+    STUB_SERVER = base_url.rstrip('/') if base_url else None
+
+
+def _to_stub(url):
+    parts = urlsplit(url)
+    base = urlsplit(STUB_SERVER)
+    return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, ''))
+
+
+def _cassette_key(method, url, params=None, data=None, json_body=None):
+    """请求键：方法 + 去掉易变参数并排序后的URL + 请求体"""
+    prepared = requests.Request(method.upper(), url, params=params, data=data, json=json_body).prepare()
+    parts = urlsplit(prepared.url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k not in CASSETTE_IGNORED_PARAMS)
+    normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+    body = prepared.body or b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hashlib.sha1(f"{prepared.method} {normalized}\n".encode('utf-8') + body).hexdigest()
+    return digest, prepared
+
+
+def _cassette_path(key):
+    return os.path.join(CASSETTE_DIR, CASSETTE_NAME, key[:2], f"{key}.json.gz")
+
+
+def _record(key, resp):
+    entry = {
+        'method': resp.request.method,
+        'url': resp.url,
+        'status': resp.status_code,
+        'reason': resp.reason,
+        'headers': {k: v for k, v in resp.headers.items() if k.lower() not in _DROPPED_HEADERS},
+        'content': base64.b64encode(resp.content).decode('ascii'),
+        'recorded_at': time.time(),
+    }
+    path = _cassette_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ 响应录制失败 {resp.url}: {e}")
+        return
+    with _lock:
+        _cassette_stats['recorded'] += 1
+
+
+def _replay(key, prepared):
+    path = _cassette_path(key)
+    if not os.path.exists(path):
+        with _lock:
+            _cassette_stats['missed'] += 1
+        raise requests.exceptions.ConnectionError(f"回放模式下没有该请求的录制: {prepared.method} {prepared.url}")
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        entry = json.load(f)
+    resp = requests.Response()
+    resp.status_code = entry['status']
+    resp.reason = entry['reason']
+    resp.headers = CaseInsensitiveDict(entry['headers'])
+    resp._content = base64.b64decode(entry['content'])
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.url = entry['url']
+    resp.request = prepared
+    with _lock:
+        _cassette_stats['replayed'] += 1
+    return resp
+
+
+def _can_retry(host, attempt, retry_after=None):
+    """剩余时间足够退避时暂停该主机并返回True，否则返回False（不再重试）"""
+    if attempt >= rate_limit.MAX_RETRIES:
+        return False
+    delay = rate_limit.backoff_delay(attempt, retry_after)
+    left = deadline.remaining()
+    if left is not None and left - delay < deadline.MIN_REQUEST_TIMEOUT:
+        return False
+    rate_limit.backoff(host, delay)
+    return True
+
+
+def request(method, url, **kwargs):
+    """发送请求，未指定timeout时使用DEFAULT_TIMEOUT，headers会与默认请求头合并"""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    # 限速按原始主机计算，改发到模拟服务器时也按真实网站的节奏发送
+    host = urlsplit(url).hostname
+    if STUB_SERVER:
+        url = _to_stub(url)
+    mode = CASSETTE_MODE
+    if mode == 'replay':
+        key, prepared = _cassette_key(method, url, kwargs.get('params'), kwargs.get('data'), kwargs.get('json'))
+        return _replay(key, prepared)
+    timeout = kwargs['timeout']
+    # 只重试幂等请求，且只重试可能自行恢复的失败：限流/过载状态码，以及请求未送达的连接失败
+    retryable = method.upper() in rate_limit.RETRY_METHODS
+    attempt = 0
+    connect_retries = 0
+    while True:
+        deadline.clamp_timeout(timeout)
+        rate_limit.acquire(host, max_wait=deadline.remaining())
+        kwargs['timeout'] = deadline.clamp_timeout(timeout)
+        try:
+            resp = get_session().request(method, url, **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            if (not retryable or isinstance(e, requests.exceptions.SSLError)
+                    or connect_retries >= rate_limit.MAX_CONNECT_RETRIES or not _can_retry(host, attempt)):
+                raise
+            connect_retries += 1
+            print(f"⚠️ {host} 连接失败，退避后重试（第 {attempt + 1} 次）: {e}")
+            attempt += 1
+            continue
+        if not retryable or resp.status_code not in rate_limit.RETRY_STATUSES or attempt >= rate_limit.MAX_RETRIES:
+            break
+        if not _can_retry(host, attempt, resp.headers.get('Retry-After')):
+            break
+        print(f"⚠️ {host} 返回 {resp.status_code}，退避后重试（第 {attempt + 1} 次）")
+        resp.close()
+        attempt += 1
+    if mode == 'record' and method.upper() in CASSETTE_METHODS:
+        key, _ = _cassette_key(method, url, kwargs.get('params'), kwargs.get('data'), kwargs.get('json'))
+        _record(key, resp)
+    return resp
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def connection_stats():
+    """各主机的连接复用统计：{host: {'requests': 请求数, 'connections': 新建连接数, 'reused': 复用次数}}"""
+    stats = {}
+    with _lock:
+        adapters = list(_adapters)
+    for adapter in adapters:
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            entry = stats.setdefault(pool.host, {'requests': 0, 'connections': 0, 'reused': 0})
+            entry['requests'] += pool.num_requests
+            entry['connections'] += pool.num_connections
+    for entry in stats.values():
+        entry['reused'] = max(0, entry['requests'] - entry['connections'])
+    return stats
+
+
+def format_stats():
+    """生成连接复用统计的文本摘要"""
+    stats = connection_stats()
+    lines = []
+    if stats:
+        total_requests = sum(s['requests'] for s in stats.values())
+        total_reused = sum(s['reused'] for s in stats.values())
+        lines.append(f"🔗 HTTP连接统计：请求 {total_requests} 次，复用连接 {total_reused} 次")
+        for host, s in sorted(stats.items(), key=lambda item: -item[1]['requests']):
+            lines.append(f" - {host}：请求 {s['requests']} 次，新建连接 {s['connections']} 个，复用 {s['reused']} 次")
+    else:
+        lines.append("🔗 HTTP连接统计：本次未发出请求")
+    if CASSETTE_MODE:
+        with _lock:
+            c = dict(_cassette_stats)
+        lines.append(f"📼 录制/回放（{CASSETTE_MODE}，{CASSETTE_NAME}）：录制 {c['recorded']} 条，"
+                     f"回放 {c['replayed']} 条，未录制 {c['missed']} 条")
+    return "\n".join(lines)
@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+技术指标计算
+wuxi_analysis 与 综合评价系统 共用的指标实现
+"""
+
+import json
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+# 分块计算 K/D 递推时的块长：块内用 (3/2)^j 缩放后累加，块长 512 时缩放因子约 1e90，不会溢出
+_KD_BLOCK = 512
+# 分块计算的 K/D 与逐根递推的最大绝对误差（K/D 取值在 0~100 之间）
+KD_TOLERANCE = 1e-12
+
+
+def _kd_filter(x, reset, init=50.0, decay=2 / 3, block=_KD_BLOCK):
+    """一阶 IIR 滤波 y[t] = decay * y[t-1] + x[t]，reset 为 True 处 y 取 init（第一个位置视为 reset）
+
+    把递推展开为 y[t] = decay^(t-r) * y[r] + Σ decay^(t-j) * x[j]（r 为 t 之前最近的 reset），
+    块内用 cumsum 一次求出，块间只传递上一块的最后一个值；Python 层的循环次数为 len(x) / block。
+    与逐根递推相比只是浮点求和顺序不同，误差在 KD_TOLERANCE 以内（见 benchmark.py kdj）。
+    """
+    x = np.asarray(x, dtype='float64')
+    reset = np.asarray(reset, dtype=bool)
+    y = np.empty_like(x)
+    prev = init
+    for start in range(0, len(x), block):
+        xs, rs = x[start:start + block], reset[start:start + block]
+        if start == 0:
+            rs = rs.copy()
+            rs[0] = True
+        j = np.arange(len(xs))
+        scale = decay ** -(j + 1.0)                                   # 以块前一个位置为基准的缩放
+        csum = np.concatenate([[0.0], np.cumsum(np.where(rs, 0.0, xs) * scale)])
+        base = np.concatenate([[1.0], scale])
+        # last: 每个位置之前（含自身）最近的 reset 在块内的下标，-1 表示块前一个位置（取上一块的结果）
+        last = np.maximum.accumulate(np.where(rs, j, -1))
+        start_value = np.where(last >= 0, init, prev)
+        ys = (start_value * base[last + 1] + csum[j + 1] - csum[last + 1]) / scale
+        y[start:start + len(xs)] = np.where(rs, init, ys)
+        prev = y[start + len(xs) - 1]
+    return y
+
+
+def kdj(rsv):
+    """由 RSV 序列计算 K、D、J，返回三个 float64 数组
+
+    K = 前K*2/3 + RSV*1/3，D = 前D*2/3 + K*1/3，J = 3K - 2D；
+    第一根K线或 RSV 缺失（NaN）、无效（最高价等于最低价时的 ±inf）时 K、D 取 50。
+    递推按一阶 IIR 滤波分块用 NumPy 整列计算（_kd_filter），与逐行循环的结果相差不超过 KD_TOLERANCE，并非逐位一致。
+    """
+    rsv = np.asarray(rsv, dtype='float64')
+    if len(rsv) == 0:
+        empty = np.array([], dtype='float64')
+        return empty, empty.copy(), empty.copy()
+
+    # ±inf 也按缺失处理：否则会进入块内的 cumsum，使该块之后的结果都变为 inf/NaN
+    missing = ~np.isfinite(rsv)
+    K = _kd_filter(np.where(missing, 0.0, rsv) / 3, missing)
+    D = _kd_filter(K / 3, missing)
+    J = 3 * K - 2 * D
+    return K, D, J
+
+
+def add_kdj(df, n=9):
+    """在 df 上添加 RSV、K、D、J 列（基于 n 日最高/最低价），返回 df"""
+    low_list = df['Low'].rolling(window=n).min()
+    high_list = df['High'].rolling(window=n).max()
+    df['RSV'] = (df['Close'] - low_list) / (high_list - low_list) * 100
+    df['K'], df['D'], df['J'] = kdj(df['RSV'])
+    return df
+
+
+class StreamingIndicators:
+    """增量指标计算器：每来一根K线以常数时间更新 evaluate_signals 需要的全部字段
+
+    - MA5/10/20：最近20个收盘价 + 各窗口的滑动和
+    - EMA12/26、DEA：只保留上一根的 EMA 值
+    - KDJ：9日最高/最低价用单调队列维护
+    盘中轮询时对同一日期重复调用 update() 会替换当日K线（先回滚到上一根K线后的状态）。
+    状态可通过 to_dict()/from_dict() 或 save()/load() 持久化，重启后继续累积。
+    """
+
+    MA_WINDOWS = (5, 10, 20)
+    KDJ_WINDOW = 9
+    VOLUME_WINDOW = 5
+    # 每隔若干根K线用队列重新求和，避免滑动和的浮点误差累积
+    RESYNC_EVERY = 250
+
+    def __init__(self):
+        self.count = 0
+        self.last_date = None
+        self.closes = deque(maxlen=max(self.MA_WINDOWS))
+        self.sums = {n: 0.0 for n in self.MA_WINDOWS}
+        self.ema12 = None
+        self.ema26 = None
+        self.dea = None
+        self.K = 50.0
+        self.D = 50.0
+        self.lows = deque()   # (序号, 最低价)，最低价单调递增
+        self.highs = deque()  # (序号, 最高价)，最高价单调递减
+        self.volumes = deque(maxlen=self.VOLUME_WINDOW + 1)
+        self.prev_close = None
+        self._before_last = None  # 最后一根K线之前的状态，用于替换当日K线
+        self.tech = None
+
+    @staticmethod
+    def _ewm(prev, x, span):
+        # 与 pandas ewm(span, adjust=False) 相同：首个值为种子
+        if prev is None:
+            return x
+        alpha = 2 / (span + 1)
+        return (1 - alpha) * prev + alpha * x
+
+    def update(self, bar):
+        """输入一根K线（含 Date/High/Low/Close/Volume，可选 PctChange），返回最新的技术指标字典"""
+        date = pd.Timestamp(bar['Date'])
+        if self.last_date is not None and date == self.last_date and self._before_last is not None:
+            self._restore(self._before_last)
+        self._before_last = self.to_dict()
+
+        close = float(bar['Close'])
+        high = float(bar['High'])
+        low = float(bar['Low'])
+        volume = float(bar['Volume'])
+        idx = self.count
+        self.count += 1
+        self.last_date = date
+
+        # 均线
+        for n in self.MA_WINDOWS:
+            self.sums[n] += close
+            if len(self.closes) >= n:
+                self.sums[n] -= self.closes[-n]
+        self.closes.append(close)
+        if self.count % self.RESYNC_EVERY == 0:
+            recent = list(self.closes)
+            self.sums = {n: sum(recent[-n:]) for n in self.MA_WINDOWS}
+        ma = {n: self.sums[n] / n if self.count >= n else np.nan for n in self.MA_WINDOWS}
+
+        # MACD
+        self.ema12 = self._ewm(self.ema12, close, 12)
+        self.ema26 = self._ewm(self.ema26, close, 26)
+        diff = self.ema12 - self.ema26
+        self.dea = self._ewm(self.dea, diff, 9)
+
+        # KDJ：单调队列维护9日最低/最高价
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((idx, low))
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((idx, high))
+        while self.lows[0][0] <= idx - self.KDJ_WINDOW:
+            self.lows.popleft()
+        while self.highs[0][0] <= idx - self.KDJ_WINDOW:
+            self.highs.popleft()
+        rsv = np.nan
+        if self.count >= self.KDJ_WINDOW:
+            lowest, highest = self.lows[0][1], self.highs[0][1]
+            if highest != lowest:
+                rsv = (close - lowest) / (highest - lowest) * 100
+        if idx == 0 or not np.isfinite(rsv):
+            self.K, self.D = 50.0, 50.0
+        else:
+            self.K = self.K * 2 / 3 + rsv * 1 / 3
+            self.D = self.D * 2 / 3 + self.K * 1 / 3
+
+        # 成交量：与前5日均量比较
+        prev_volumes = list(self.volumes)[-self.VOLUME_WINDOW:]
+        self.volumes.append(volume)
+        if prev_volumes and self.count > self.VOLUME_WINDOW:
+            recent_vol_avg = sum(prev_volumes) / len(prev_volumes)
+        else:
+            recent_vol_avg = sum(self.volumes) / len(self.volumes)
+
+        pct_change = bar.get('PctChange')
+        if pct_change is None or pct_change != pct_change:
+            pct_change = (close / self.prev_close - 1) * 100 if self.prev_close else 0.0
+        self.prev_close = close
+
+        self.tech = {
+            'last_date': date.strftime("%Y-%m-%d"),
+            'last_close': close,
+            'pct_change': float(pct_change),
+            'volume': volume,
+            'ma5': ma[5],
+            'ma10': ma[10],
+            'ma20': ma[20],
+            'diff': diff,
+            'dea': self.dea,
+            'macd_hist': 2 * (diff - self.dea),
+            'K': self.K,
+            'D': self.D,
+            'J': 3 * self.K - 2 * self.D,
+            'volume_high': volume > 1.2 * recent_vol_avg,
+            'oversold': self.K < 20 and self.D < 20,
+            'overbought': self.K > 80 and self.D > 80,
+        }
+        return self.tech
+
+    @classmethod
+    def from_frame(cls, df):
+        """用历史K线预热"""
+        engine = cls()
+        for bar in df.to_dict('records'):
+            engine.update(bar)
+        return engine
+
+    def to_dict(self):
+        """导出可 JSON 序列化的状态（不含上一根K线的回滚快照）"""
+        return {
+            'count': self.count,
+            'last_date': self.last_date.strftime("%Y-%m-%d") if self.last_date is not None else None,
+            'closes': list(self.closes),
+            'sums': {str(n): s for n, s in self.sums.items()},
+            'ema12': self.ema12,
+            'ema26': self.ema26,
+            'dea': self.dea,
+            'K': self.K,
+            'D': self.D,
+            'lows': [list(item) for item in self.lows],
+            'highs': [list(item) for item in self.highs],
+            'volumes': list(self.volumes),
+            'prev_close': self.prev_close,
+            'tech': self.tech,
+        }
+
+    def _restore(self, state):
+        self.count = state['count']
+        self.last_date = pd.Timestamp(state['last_date']) if state['last_date'] else None
+        self.closes = deque(state['closes'], maxlen=max(self.MA_WINDOWS))
+        self.sums = {int(n): s for n, s in state['sums'].items()}
+        self.ema12 = state['ema12']
+        self.ema26 = state['ema26']
+        self.dea = state['dea']
+        self.K = state['K']
+        self.D = state['D']
+        self.lows = deque(tuple(item) for item in state['lows'])
+        self.highs = deque(tuple(item) for item in state['highs'])
+        self.volumes = deque(state['volumes'], maxlen=self.VOLUME_WINDOW + 1)
+        self.prev_close = state['prev_close']
+        self.tech = state['tech']
+
+    @classmethod
+    def from_dict(cls, state):
+        engine = cls()
+        engine._restore(state)
+        return engine
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+# 全市场批量计算：数组形状为 (股票数, 交易日数)，每行是一只股票按时间顺序排列的K线，
+# 历史较短的股票在左侧用 NaN 补齐，与逐只股票单独计算的结果一致
+
+def stack_frames(frames, length=None):
+    """把多只股票的K线 DataFrame 按行尾对齐堆叠为二维数组
+
+    返回 {'Close','High','Low','Volume','PctChange': (N, T) 数组, 'last_date': 各股票最后日期列表}，
+    T 默认取最长的历史长度，更长的历史只保留最近 length 根。
+    """
+    length = length or max((len(df) for df in frames), default=0)
+    panel = {}
+    for col in ['Close', 'High', 'Low', 'Volume', 'PctChange']:
+        arr = np.full((len(frames), length), np.nan)
+        for row, df in enumerate(frames):
+            if col in df.columns and len(df):
+                values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64')[-length:]
+                arr[row, length - len(values):] = values
+        panel[col] = arr
+    panel['last_date'] = [pd.Timestamp(df['Date'].iloc[-1]) if len(df) else None for df in frames]
+    return panel
+
+
+def _panel_ma(close, n):
+    """n 日均线；窗口内有 NaN（即历史不足 n 根）时为 NaN，与 rolling(n).mean() 相同
+
+    按窗口求和，不用整段累计和相减，避免长历史的浮点误差累积；窗口内价格全部相同时直接取该价格
+    （pandas 也是如此），停牌等价格不变的区间里“收盘价 > 均线”这类比较与 pandas 结果一致。
+    """
+    out = np.full(close.shape, np.nan)
+    if close.shape[1] < n:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(close, n, axis=1)
+    flat = windows.min(axis=-1) == windows.max(axis=-1)
+    out[:, n - 1:] = np.where(flat, windows[..., -1], windows.sum(axis=-1) / n)
+    return out
+
+
+def _panel_ewm(values, span):
+    """逐日递推、跨股票向量化的 ewm(span, adjust=False)；各股票以首个有效值为种子"""
+    alpha = 2 / (span + 1)
+    out = np.full(values.shape, np.nan)
+    prev = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        prev = np.where(np.isnan(prev), x, (1 - alpha) * prev + alpha * x)
+        out[:, t] = prev
+    return out
+
+
+def _panel_rolling(values, n, func):
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= n:
+        windows = np.lib.stride_tricks.sliding_window_view(values, n, axis=1)
+        out[:, n - 1:] = func(windows, axis=-1)
+    return out
+
+
+def panel_indicators(close, high, low):
+    """一次性计算全部股票的 MA5/10/20、EMA12/26、Diff、DEA、MACD_hist、RSV、K、D、J
+
+    输入为 (N, T) 数组，返回同形状数组组成的字典；补齐位置的结果为 NaN。
+    K/D 递推逐日进行、对所有股票同时计算，RSV 缺失或无效时同样取 50；与 kdj() 的结果相差不超过 KD_TOLERANCE，并非逐位一致。
+    """
+    close = np.asarray(close, dtype='float64')
+    high = np.asarray(high, dtype='float64')
+    low = np.asarray(low, dtype='float64')
+    out = {
+        'MA5': _panel_ma(close, 5),
+        'MA10': _panel_ma(close, 10),
+        'MA20': _panel_ma(close, 20),
+        'EMA12': _panel_ewm(close, 12),
+        'EMA26': _panel_ewm(close, 26),
+    }
+    out['Diff'] = out['EMA12'] - out['EMA26']
+    out['DEA'] = _panel_ewm(out['Diff'], 9)
+    out['MACD_hist'] = 2 * (out['Diff'] - out['DEA'])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        low_list = _panel_rolling(low, 9, np.min)
+        high_list = _panel_rolling(high, 9, np.max)
+        rsv = (close - low_list) / (high_list - low_list) * 100
+    out['RSV'] = rsv
+
+    K = np.full(close.shape, np.nan)
+    D = np.full(close.shape, np.nan)
+    k = np.full(close.shape[0], 50.0)
+    d = np.full(close.shape[0], 50.0)
+    for t in range(close.shape[1]):
+        r = rsv[:, t]
+        reset = ~np.isfinite(r)
+        k = np.where(reset, 50.0, k * 2 / 3 + r * 1 / 3)
+        d = np.where(reset, 50.0, d * 2 / 3 + k * 1 / 3)
+        K[:, t] = k
+        D[:, t] = d
+    padding = np.isnan(close)
+    K[padding] = np.nan
+    D[padding] = np.nan
+    out['K'] = K
+    out['D'] = D
+    out['J'] = 3 * K - 2 * D
+    return out
+
+
+def panel_tech(panel, indicators=None):
+    """取每只股票最新一根K线，生成与 fetch_stock_data 返回格式相同、可直接传给 evaluate_signals 的技术指标字典列表
+
+    panel 为 stack_frames() 的返回值；indicators 为 panel_indicators() 的结果（不传则现算）。
+    没有任何K线的股票对应 None。
+    """
+    close, volume = panel['Close'], panel['Volume']
+    if indicators is None:
+        indicators = panel_indicators(close, panel['High'], panel['Low'])
+    n_symbols = close.shape[0]
+    if close.shape[1] == 0:
+        return [None] * n_symbols
+
+    # 成交量放大：与前5日均量比较（历史不超过5根时与全部均量比较）
+    lengths = (~np.isnan(close)).sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        prev5 = np.nanmean(volume[:, -6:-1], axis=1) if volume.shape[1] > 1 else volume[:, -1]
+        all_avg = np.nanmean(volume, axis=1)
+    recent_vol_avg = np.where(lengths > 5, prev5, all_avg)
+    volume_high = volume[:, -1] > 1.2 * recent_vol_avg
+
+    pct = panel.get('PctChange')
+    if pct is None or np.isnan(pct[:, -1]).all():
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct_last = (close[:, -1] / close[:, -2] - 1) * 100 if close.shape[1] > 1 else np.zeros(n_symbols)
+    else:
+        pct_last = pct[:, -1]
+
+    last = {name: values[:, -1] for name, values in indicators.items()}
+    techs = []
+    for i in range(n_symbols):
+        if lengths[i] == 0:
+            techs.append(None)
+            continue
+        last_date = panel.get('last_date', [None] * n_symbols)[i]
+        K, D = float(last['K'][i]), float(last['D'][i])
+        techs.append({
+            'last_date': last_date.strftime("%Y-%m-%d") if last_date is not None else None,
+            'last_close': float(close[i, -1]),
+            'pct_change': float(pct_last[i]),
+            'volume': float(volume[i, -1]),
+            'ma5': float(last['MA5'][i]),
+            'ma10': float(last['MA10'][i]),
+            'ma20': float(last['MA20'][i]),
+            'diff': float(last['Diff'][i]),
+            'dea': float(last['DEA'][i]),
+            'macd_hist': float(last['MACD_hist'][i]),
+            'K': K,
+            'D': D,
+            'J': float(last['J'][i]),
+            'volume_high': bool(volume_high[i]),
+            'oversold': K < 20 and D < 20,
+            'overbought': K > 80 and D > 80,
+        })
+    return techs
+
+
+# ---------------------------------------------------------------- 指标依赖图
+# 每个指标声明自己的输入（K线列或其他指标的输出）与回看窗口，compute_indicators 只计算所请求的指标
+# 及其依赖，共用的中间结果（如 EMA12、RSV、MA20）只算一次。自定义指标用 @register_indicator 注册后
+# 即可按名称请求，不必修改 fetch_stock_data。
+
+class Indicator:
+    """指标节点：由 inputs 算出 outputs；window 为该节点在输入之上回看的K线数（逐点运算为 1）"""
+
+    def __init__(self, outputs, inputs, window, func):
+        self.outputs = tuple(outputs)
+        self.inputs = tuple(inputs)
+        self.window = window
+        self.func = func
+
+    def __repr__(self):
+        return f"Indicator({'/'.join(self.outputs)} <- {', '.join(self.inputs)}, window={self.window})"
+
+
+# 输出列名 -> 指标节点（一个节点可以有多个输出，如 K/D/J）
+INDICATORS = {}
+
+# evaluate_signals、分析报告与走势图用到的指标
+TECH_INDICATORS = ['MA5', 'MA10', 'MA20', 'Diff', 'DEA', 'MACD_hist', 'K', 'D', 'J']
+
+
+def register_indicator(outputs, inputs, window=1):
+    """注册指标：被装饰的函数按 inputs 的顺序接收各输入列（pandas Series），
+    返回一列，或与 outputs 等长的多列。输出名不能与已注册的指标重复。
+    """
+    outputs = (outputs,) if isinstance(outputs, str) else tuple(outputs)
+
+    def decorator(func):
+        node = Indicator(outputs, inputs, window, func)
+        for name in outputs:
+            if name in INDICATORS:
+                raise ValueError(f"指标 {name} 已注册为 {INDICATORS[name]}")
+            INDICATORS[name] = node
+        return func
+    return decorator
+
+
+def _plan(outputs, available):
+    """按依赖顺序列出需要计算的节点，每个节点只出现一次；available 为已有的列"""
+    order, done, visiting = [], set(available), set()
+
+    def visit(name):
+        if name in done:
+            return
+        node = INDICATORS.get(name)
+        if node is None:
+            raise KeyError(f"未知的指标或K线列：{name}")
+        if node in visiting:
+            raise ValueError(f"指标依赖存在环：{name}")
+        visiting.add(node)
+        for source in node.inputs:
+            visit(source)
+        visiting.discard(node)
+        order.append(node)
+        done.update(node.outputs)
+
+    for name in outputs:
+        visit(name)
+    return order
+
+
+def compute_indicators(df, outputs):
+    """在 df 上添加 outputs 指标列（连同依赖的中间指标列），返回 df；df 中已有的列视为已算好，不重算"""
+    for node in _plan(outputs, df.columns):
+        values = node.func(*(df[name] for name in node.inputs))
+        if len(node.outputs) == 1:
+            values = (values,)
+        for name, value in zip(node.outputs, values):
+            df[name] = value
+    return df
+
+
+def lookback(outputs):
+    """outputs 全部有数值至少需要的K线数：沿依赖链累加各节点的 window - 1"""
+    bars = {}
+
+    def need(name):
+        if name not in bars:
+            node = INDICATORS.get(name)
+            bars[name] = 1 if node is None else \
+                node.window - 1 + max((need(source) for source in node.inputs), default=1)
+        return bars[name]
+
+    return max((need(name) for name in outputs), default=0)
+
+
+# 内置指标：与 panel_indicators / StreamingIndicators 的口径相同
+for _n in (5, 10, 20):
+    register_indicator(f'MA{_n}', ['Close'], window=_n)(lambda close, n=_n: close.rolling(window=n).mean())
+for _span in (12, 26):
+    # adjust=False 的 EMA 从第一根K线起就有数值
+    register_indicator(f'EMA{_span}', ['Close'])(lambda close, span=_span: close.ewm(span=span, adjust=False).mean())
+
+
+@register_indicator('Diff', ['EMA12', 'EMA26'])
+def _diff(ema12, ema26):
+    return ema12 - ema26
+
+
+@register_indicator('DEA', ['Diff'])
+def _dea(diff):
+    return diff.ewm(span=9, adjust=False).mean()
+
+
+@register_indicator('MACD_hist', ['Diff', 'DEA'])
+def _macd_hist(diff, dea):
+    return 2 * (diff - dea)
+
+
+@register_indicator('RSV', ['High', 'Low', 'Close'], window=9)
+def _rsv(high, low, close):
+    low_list = low.rolling(window=9).min()
+    high_list = high.rolling(window=9).max()
+    return (close - low_list) / (high_list - low_list) * 100
+
+
+@register_indicator(['K', 'D', 'J'], ['RSV'])
+def _kdj(rsv):
+    return kdj(rsv)
+
+
+# 扩展指标：默认不计算，按名称请求时才计算
+@register_indicator('RSI14', ['Close'], window=15)
+def _rsi14(close):
+    """14日 RSI（Wilder 平滑）"""
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+@register_indicator('BOLL_STD', ['Close'], window=20)
+def _boll_std(close):
+    return close.rolling(window=20).std()
+
+
+@register_indicator(['BOLL_MID', 'BOLL_UP', 'BOLL_LOW'], ['MA20', 'BOLL_STD'])
+def _boll(ma20, std):
+    """布林线：中轨为 MA20，上下轨为中轨 ± 2 倍20日标准差"""
+    return ma20, ma20 + 2 * std, ma20 - 2 * std
+
+
+@register_indicator('TR', ['High', 'Low', 'Close'], window=2)
+def _true_range(high, low, close):
+    prev_close = close.shift(1)
+    return pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+
+
+@register_indicator('ATR14', ['TR'], window=14)
+def _atr14(tr):
+    return tr.rolling(window=14).mean()
+
+
+@register_indicator('OBV', ['Close', 'Volume'])
+def _obv(close, volume):
+    """能量潮：上涨日加成交量、下跌日减成交量，从 0 开始累计"""
+    return (np.sign(close.diff()).fillna(0) * volume).cumsum()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线响应解析
+把新浪 getKLineData、东方财富 kline/get 的响应整列解析为 DataFrame：
+不再逐行构造字典、逐字段调用 float()/int()，而是一次取出整列文本再由 NumPy 批量转换类型
+（格式不规整时退回 json.loads / pd.read_csv 按列转换）。
+结果与逐行解析逐位一致（见 benchmark.py parse）。
+成交量统一以股为单位：新浪返回的就是股，东方财富返回的是手，解析时乘以 EASTMONEY_VOLUME_UNIT。
+"""
+
+import io
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+# 新浪返回紧凑 JSON，字段顺序固定：{"day":"..","open":"..","high":"..","low":"..","close":"..","volume":".."...}
+_SINA_ROW = re.compile(
+    r'"day":"([^"]*)","open":"([^"]*)","high":"([^"]*)","low":"([^"]*)","close":"([^"]*)","volume":"([^"]*)"'
+)
+
+# 东方财富 fields2=f51..f61：日期,开盘,收盘,最高,最低,成交量,成交额,振幅,涨跌幅,涨跌额,换手率
+EASTMONEY_FIELDS = ['Date', 'Open', 'Close', 'High', 'Low', 'Volume', 'Amount', 'Amplitude', 'PctChange',
+                    'Change', 'Turnover']
+_EASTMONEY_USED = ['Date', 'Open', 'Close', 'High', 'Low', 'Volume', 'PctChange']
+EASTMONEY_VOLUME_UNIT = 100  # 东方财富K线成交量单位为手，1手 = 100股
+
+
+def _sina_frame(dates, opens, highs, lows, closes, volumes, pct_changes=None):
+    return pd.DataFrame({
+        'Date': np.asarray(dates, dtype=object),
+        'Open': np.asarray(opens, dtype=np.float64),
+        'High': np.asarray(highs, dtype=np.float64),
+        'Low': np.asarray(lows, dtype=np.float64),
+        'Close': np.asarray(closes, dtype=np.float64),
+        'Volume': np.asarray(volumes, dtype=np.int64),
+        'PctChange': (np.zeros(len(dates)) if pct_changes is None
+                      else np.asarray(pct_changes, dtype=np.float64)),
+    })
+
+
+def parse_sina_klines(text):
+    """解析新浪 getKLineData 的响应文本，没有数据时返回None"""
+    # 常见格式直接用一次正则取出全部行，按列转换；格式不同（字段顺序变化、带涨跌幅等）时走 JSON
+    rows = _SINA_ROW.findall(text) if 'pct_chg' not in text else []
+    if rows and len(rows) == text.count('"day"'):
+        return _sina_frame(*zip(*rows))
+
+    data = json.loads(text)
+    if not data:
+        return None
+    records = pd.DataFrame.from_records(data)
+    pct = records['pct_chg'].fillna(0).to_numpy(dtype=str) if 'pct_chg' in records else None
+    return _sina_frame(records['day'].to_numpy(dtype=object),
+                       *(records[col].to_numpy(dtype=str) for col in ['open', 'high', 'low', 'close', 'volume']),
+                       pct)
+
+
+def parse_eastmoney_klines(klines):
+    """解析东方财富 data.klines（逗号分隔的字符串列表），成交量换算为股；没有数据时返回None"""
+    if not klines:
+        return None
+    width = klines[0].count(',') + 1
+    if width >= len(EASTMONEY_FIELDS) - 2 and all(line.count(',') == width - 1 for line in klines):
+        # 每行字段数相同：拼接后一次切分，按步长取出各列
+        fields = ",".join(klines).split(",")
+        return pd.DataFrame({
+            'Date': fields[0::width],
+            'Open': np.array(fields[1::width], dtype=np.float64),
+            'Close': np.array(fields[2::width], dtype=np.float64),
+            'High': np.array(fields[3::width], dtype=np.float64),
+            'Low': np.array(fields[4::width], dtype=np.float64),
+            'Volume': np.array(fields[5::width], dtype=np.int64) * EASTMONEY_VOLUME_UNIT,
+            'PctChange': np.array(fields[8::width], dtype=np.float64),
+        })
+
+    # 字段数参差不齐时交给 read_csv，缺字段的行丢弃
+    df = pd.read_csv(io.StringIO("\n".join(klines)), header=None, names=EASTMONEY_FIELDS,
+                     usecols=_EASTMONEY_USED, dtype={'Date': str})
+    df = df.dropna(subset=_EASTMONEY_USED)
+    if df.empty:
+        return None
+    df['Volume'] = df['Volume'].astype(np.int64) * EASTMONEY_VOLUME_UNIT
+    return df[_EASTMONEY_USED].reset_index(drop=True)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨运行的新闻去重索引
+把处理过的新闻按 (股票代码, 标题哈希, 日期) 记录在本地 SQLite 中，下次运行只有索引中没有的才算新增；
+按页翻取的新闻源（新浪）遇到整页都已处理过时停止翻页，更早的新闻直接从索引取出，不再重复下载解析。
+超过 RETENTION_DAYS 天没有再出现的条目自动淘汰。
+各新闻源的日期格式不一（完整时间、只有日期、只有月日），入库前统一为 'YYYY-MM-DD HH:MM'，按日期排序才正确。
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'news_index.db')
+RETENTION_DAYS = 30
+
+
+DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+# [年-]月-日[ 时:分[:秒]]，分隔符可以是 - / . 或 年月日
+_DATE_PATTERN = re.compile(r'(?:(\d{4})\s*[-/.年]\s*)?(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*日?'
+                           r'(?:\s*(\d{1,2}):(\d{2})(?::\d{2})?)?')
+_ISO_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]'
+
+
+def news_key(title):
+    return hashlib.sha1(title.strip().encode('utf-8')).hexdigest()
+
+
+def normalize_date(text, now=None):
+    """把新闻日期统一为 'YYYY-MM-DD HH:MM'：只有日期时取 00:00；只有月日时取最近一个不晚于明天的年份；
+    无法识别时返回 now（默认当前时间）"""
+    now = now or datetime.now()
+    match = _DATE_PATTERN.search(text or '')
+    if match:
+        year, month, day, hour, minute = match.groups()
+        try:
+            parsed = datetime(int(year or now.year), int(month), int(day), int(hour or 0), int(minute or 0))
+            if year is None and parsed > now + timedelta(days=1):
+                parsed = parsed.replace(year=parsed.year - 1)
+            return parsed.strftime(DATE_FORMAT)
+        except ValueError:
+            pass
+    return now.strftime(DATE_FORMAT)
+
+
+class NewsIndex:
+    """已处理新闻的索引（SQLite，多线程共用一个连接；path=None 时只保存在内存中）"""
+
+    def __init__(self, path=INDEX_PATH, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self.new = 0
+        self.known = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS news ("
+            " symbol TEXT NOT NULL, key TEXT NOT NULL, date TEXT NOT NULL, title TEXT NOT NULL,"
+            " first_seen REAL NOT NULL, last_seen REAL NOT NULL, PRIMARY KEY (symbol, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_seen ON news(last_seen)")
+        self._conn.commit()
+        self._normalize_stored_dates()
+        self.evict()
+
+    def _normalize_stored_dates(self):
+        """把旧版索引中格式不统一的日期改为 'YYYY-MM-DD HH:MM'（以首次见到的时间推断年份）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT rowid, date, first_seen FROM news WHERE date NOT GLOB ?",
+                                      (_ISO_GLOB,)).fetchall()
+            self._conn.executemany("UPDATE news SET date = ? WHERE rowid = ?",
+                                   [(normalize_date(date, datetime.fromtimestamp(first_seen)), rowid)
+                                    for rowid, date, first_seen in rows])
+            self._conn.commit()
+
+    def evict(self):
+        """淘汰超过保留期没有再出现的条目，返回淘汰条数"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM news WHERE last_seen < ?", (cutoff,)).rowcount
+            self._conn.commit()
+            self.evicted += removed
+        return removed
+
+    def _known_keys(self, symbol, keys):
+        found = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(row[0] for row in self._conn.execute(
+                f"SELECT key FROM news WHERE symbol = ? AND key IN ({placeholders})", [symbol, *chunk]))
+        return found
+
+    def all_seen(self, symbol, news):
+        """这批新闻 [(日期, 标题), ...] 是否都已处理过（空列表返回False）"""
+        keys = list({news_key(title) for _, title in news})
+        if not keys:
+            return False
+        with self._lock:
+            return len(self._known_keys(symbol, keys)) == len(keys)
+
+    def add(self, symbol, news):
+        """记录一批新闻，返回其中此前没有处理过的 [(日期, 标题), ...]（保持原顺序，日期已由 normalize_date 统一）"""
+        now = time.time()
+        current = datetime.fromtimestamp(now)
+        items = {}
+        for date, title in news:
+            items.setdefault(news_key(title), (normalize_date(date, current), title))
+        if not items:
+            return []
+        with self._lock:
+            known = self._known_keys(symbol, list(items))
+            self._conn.executemany("UPDATE news SET last_seen = ? WHERE symbol = ? AND key = ?",
+                                   [(now, symbol, key) for key in known])
+            fresh = {key: item for key, item in items.items() if key not in known}
+            self._conn.executemany(
+                "INSERT INTO news (symbol, key, date, title, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?)",
+                [(symbol, key, date, title, now, now) for key, (date, title) in fresh.items()])
+            self._conn.commit()
+            self.new += len(fresh)
+            self.known += len(known)
+        return list(fresh.values())
+
+    def recent(self, symbol, limit):
+        """该股票索引中最近的 limit 条新闻 [(日期, 标题), ...]，按日期倒序"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT date, title FROM news WHERE symbol = ? ORDER BY date DESC, first_seen DESC LIMIT ?",
+                (symbol, limit)).fetchall()
+
+    def merge(self, symbol, news, limit):
+        """记录本次获取的新闻，返回 (最近 limit 条新闻, 其中本次新增的新闻)
+
+        整页已处理过而停止翻页时，本次没有下载的较早新闻从索引补齐。
+        """
+        fresh = self.add(symbol, news)
+        return [tuple(row) for row in self.recent(symbol, limit)], fresh
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """返回进程共享的新闻索引（首次调用时打开）"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NewsIndex()
+    return _index
+
+
+def format_stats():
+    """生成新闻去重索引的文本摘要"""
+    if _index is None:
+        return "🗂️ 新闻索引：本次未使用"
+    line = f"🗂️ 新闻索引：新增 {_index.new} 条，此前已处理 {_index.known} 条，索引共 {len(_index)} 条"
+    if _index.evicted:
+        line += f"（淘汰过期 {_index.evicted} 条）"
+    return line
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地K线缓存
+每只股票一个 npz 文件，保存规范化后的 Date/Open/High/Low/Close/Volume/PctChange 日线数据。
+每日运行时只需获取缓存最后日期之后的K线（外加少量重叠K线用于校验），再与缓存合并。
+npz 中同时记录数据源、复权方式与成交量单位（meta），不同复权方式的K线不能拼接，变化时应重新获取完整历史。
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ohlcv_cache')
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'PctChange']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+# 重叠部分逐根比较的列：成交量单位或复权方式不同时这些列会整体对不上
+CHECK_COLUMNS = PRICE_COLUMNS + ['Volume']
+
+# 缓存中成交量的单位（各数据源解析时已统一换算为股）
+VOLUME_UNIT = 'share'
+
+# 增量获取时向前重叠的K线数，用于发现被修正的K线
+OVERLAP_BARS = 5
+
+
+def _path(symbol, cache_dir=None):
+    safe = re.sub(r'[^0-9A-Za-z._-]', '_', symbol)
+    return os.path.join(cache_dir or CACHE_DIR, f"{safe}.npz")
+
+
+def normalize(df):
+    """整理为缓存格式：Date + COLUMNS，按日期升序且日期唯一"""
+    dates = pd.to_datetime(df['Date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    out = pd.DataFrame({'Date': dates.dt.normalize()})
+    for col in COLUMNS:
+        out[col] = pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+    out = out.dropna(subset=['Date']).drop_duplicates('Date', keep='last')
+    return out.sort_values('Date').reset_index(drop=True)
+
+
+def load(symbol, cache_dir=None):
+    """读取缓存的K线，没有缓存或缓存损坏时返回None
+
+    写入时记录的 {'source', 'adjust', 'volume_unit'} 放在返回值的 attrs 中，旧版缓存没有这些记录。
+    """
+    path = _path(symbol, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            df = pd.DataFrame({'Date': pd.to_datetime(data['Date'])})
+            for col in COLUMNS:
+                df[col] = data[col]
+            if 'meta' in data.files:
+                df.attrs.update(json.loads(str(data['meta'])))
+    except Exception as e:
+        print(f"⚠️ K线缓存 {path} 读取失败，忽略缓存: {e}")
+        return None
+    return df if not df.empty else None
+
+
+def save(symbol, df, cache_dir=None, source=None, adjust=None):
+    """写入缓存（先写临时文件再替换，避免中断时留下半个文件）
+
+    source 为数据源名称，adjust 为其复权方式（'qfq' 前复权、'none' 不复权等），随K线一起记录。
+    """
+    df = normalize(df)
+    path = _path(symbol, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {'Date': df['Date'].values.astype('datetime64[ns]')}
+    for col in COLUMNS:
+        arrays[col] = df[col].to_numpy(dtype='float64')
+    arrays['meta'] = np.array(json.dumps({'source': source, 'adjust': adjust, 'volume_unit': VOLUME_UNIT},
+                                         ensure_ascii=False))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def known_units(cached):
+    """缓存是否记录了数据源且成交量单位与当前一致（旧版缓存可能以手为单位，不能直接使用）"""
+    return cached is not None and cached.attrs.get('volume_unit') == VOLUME_UNIT
+
+
+def compatible(cached, adjust):
+    """复权方式为 adjust 的新数据能否与缓存拼接：单位一致且复权方式相同（未知复权方式一律不拼接）"""
+    return known_units(cached) and adjust is not None and cached.attrs.get('adjust') == adjust
+
+
+def fetch_start(cached, overlap=OVERLAP_BARS):
+    """增量获取的起始日期：缓存中倒数第overlap根K线的日期，没有缓存时返回None"""
+    if cached is None or cached.empty:
+        return None
+    return cached['Date'].iloc[max(0, len(cached) - overlap)]
+
+
+def merge(cached, fresh, rtol=1e-6):
+    """合并缓存与新获取的K线
+
+    重叠日期以新数据为准（被修正的K线会被替换）。返回 (合并后的DataFrame, 报告)，报告中：
+    - new: 新增K线数；revised: 重叠部分价格或成交量被修正的K线数；overlap: 重叠K线数
+    - needs_full: 新旧数据无法衔接（没有重叠）或重叠部分大面积变化（通常是复权调整或成交量单位不同），
+      此时缓存不可信，应重新获取完整历史
+    数据源与复权方式是否一致由调用方先用 compatible() 判断。
+    """
+    fresh = normalize(fresh)
+    report = {'new': len(fresh), 'revised': 0, 'overlap': 0, 'needs_full': False}
+    if cached is None or cached.empty:
+        return fresh, report
+
+    in_cache = fresh['Date'].isin(cached['Date'])
+    overlap_dates = fresh.loc[in_cache, 'Date']
+    report['overlap'] = len(overlap_dates)
+    report['new'] = int((fresh['Date'] > cached['Date'].iloc[-1]).sum())
+
+    if len(overlap_dates):
+        old = cached.set_index('Date').loc[overlap_dates, CHECK_COLUMNS].to_numpy(dtype='float64')
+        new = fresh.set_index('Date').loc[overlap_dates, CHECK_COLUMNS].to_numpy(dtype='float64')
+        same = np.isclose(old, new, rtol=rtol, equal_nan=True).all(axis=1)
+        report['revised'] = int((~same).sum())
+
+    # 没有重叠则无法确认中间是否缺K线；重叠K线多数被改动说明历史价格（或成交量单位）整体变了
+    if report['overlap'] == 0 and report['new'] > 0:
+        report['needs_full'] = True
+    elif report['overlap'] >= 3 and report['revised'] * 2 > report['overlap']:
+        report['needs_full'] = True
+
+    kept = cached[~cached['Date'].isin(fresh['Date'])]
+    merged = pd.concat([kept, fresh], ignore_index=True).sort_values('Date').reset_index(drop=True)
+    return merged, report
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评分参数调参
+在历史K线上批量评估不同的新闻/技术权重与信号阈值组合（参数含义见 scoring.py）：
+技术面评分、新闻情绪评分与N日后收益只算一次，放进共享内存，进程池中的各工作进程只读地直接使用这些数组，
+每个组合只需重新合成综合评分、划分信号。按组合报告买入信号（买入/强烈买入）的胜率与平均收益，
+以及卖出信号之后的平均收益，据此调整 scoring.py 中的常量。
+网格中很多组合划分出的买入、卖出信号完全相同（例如没有新闻时权重不起作用，或只是移动了中性区间的边界），
+评估结果也就完全相同，这些组合合并为一行，保留最接近当前参数的一个，排名不再取决于网格中的先后顺序。
+
+历史新闻情绪取自新闻索引（news_index.db）中各股票各日的新闻，没有新闻的交易日只按技术面评分，
+此时权重不影响结果。
+
+用法：python param_sweep.py [--random N] [--horizon 5] [--workers N] [股票代码 ...]
+不指定股票时使用 ohlcv_cache 中的全部股票；不加 --random 时遍历全部网格组合。
+"""
+
+import argparse
+import hashlib
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import scoring
+from indicators import stack_frames, panel_indicators
+
+# 网格：新闻情绪权重，以及四个信号阈值各自的候选值（组合时要求阈值递增）
+WEIGHTS = (0.0, 0.2, 0.3, 0.4, 0.5, 0.6)
+THRESHOLD_GRID = (
+    (20, 25, 30, 35),
+    (40, 45, 50),
+    (55, 60, 65, 70),
+    (75, 80, 85),
+)
+HORIZON = 5          # 按信号之后第几个交易日的收益评估
+MIN_SIGNALS = 50     # 买入信号少于该数的组合不参与排名
+TOP_N = 10
+
+WORKERS = max(1, (os.cpu_count() or 2) - 1)   # 不足 2 核时 sweep 一律单进程，进程池只会更慢
+CHUNK_SIZE = 32      # 每个任务评估的组合数
+BUY_SIGNALS = 3      # SIGNALS 中下标 >= 3 的为买入信号
+
+
+def grid(weights=WEIGHTS, threshold_grid=THRESHOLD_GRID):
+    """全部网格组合 [(权重, (阈值1, 阈值2, 阈值3, 阈值4)), ...]"""
+    thresholds = [t for t in itertools.product(*threshold_grid) if all(a < b for a, b in zip(t, t[1:]))]
+    return [(w, t) for w in weights for t in thresholds]
+
+
+def random_combos(n, seed=0):
+    """随机抽取 n 个组合：权重在 0~0.8 之间，四个阈值在 10~95 之间递增"""
+    rng = random.Random(seed)
+    combos = []
+    for _ in range(n):
+        thresholds = tuple(sorted(rng.sample(range(10, 96), 4)))
+        combos.append((round(rng.uniform(0, 0.8), 2), thresholds))
+    return combos
+
+
+def evaluate(tech, sentiment, returns, weight, thresholds):
+    """评估一个组合：返回买入/卖出信号的数量、胜率（之后上涨的比例）与平均收益（%），
+    以及买入、卖出信号位置的摘要 signature（摘要相同的组合评估结果完全相同）"""
+    final = backtest.final_scores(tech, sentiment, weight)
+    codes = backtest.signal_codes(final, thresholds)
+    valid = (codes >= 0) & ~np.isnan(returns)
+    buy_mask, sell_mask = codes >= BUY_SIGNALS, codes == 0
+    buy = returns[valid & buy_mask]
+    sell = returns[valid & sell_mask]
+    return {
+        'weight': weight,
+        'thresholds': tuple(thresholds),
+        'buy_count': len(buy),
+        'buy_hit': (buy > 0).mean() if len(buy) else np.nan,
+        'buy_return': buy.mean() if len(buy) else np.nan,
+        'sell_count': len(sell),
+        'sell_return': sell.mean() if len(sell) else np.nan,
+        'signature': hashlib.blake2b(np.packbits(buy_mask).tobytes() + np.packbits(sell_mask).tobytes(),
+                                     digest_size=16).hexdigest(),
+    }
+
+
+# 工作进程：启动时按名称连接共享内存，之后的任务直接读取
+_shared = {}
+_shared_blocks = []
+
+
+def _init_worker(spec):
+    for name, (block, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=block)
+        _shared_blocks.append(shm)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        _shared[name] = array
+
+
+def _evaluate_chunk(combos):
+    return [evaluate(_shared['tech'], _shared.get('sentiment'), _shared['returns'], w, t) for w, t in combos]
+
+
+class SharedArrays:
+    """把一组只读数组复制进共享内存，spec 传给工作进程按名称连接；用完调用 close()"""
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            if array is None:
+                continue
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            self.blocks.append(shm)
+            self.spec[name] = (shm.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+
+def _distance(table):
+    """各组合与当前参数（scoring.py）的距离：权重差 + 各阈值差之和 / 100"""
+    current = np.array(scoring.SIGNAL_THRESHOLDS)
+    thresholds = np.array(table['thresholds'].tolist(), dtype='float64').reshape(len(table), -1)
+    return (table['weight'] - scoring.SENTIMENT_WEIGHT).abs() + np.abs(thresholds - current).sum(axis=1) / 100
+
+
+def rank(table):
+    """排序：买入信号不足 MIN_SIGNALS 的排在最后，其余按买入平均收益、胜率、次数从高到低，
+    卖出后收益从低到高，仍相同时离当前参数近的在前"""
+    table = table.assign(ranked=table['buy_count'] >= MIN_SIGNALS, distance=_distance(table))
+    table = table.sort_values(['ranked', 'buy_return', 'buy_hit', 'buy_count', 'sell_return', 'distance'],
+                              ascending=[False, False, False, False, True, True], kind='stable',
+                              na_position='last')
+    return table.drop(columns=['ranked', 'distance']).reset_index(drop=True)
+
+
+def collapse(table):
+    """合并买入、卖出信号完全相同的组合：每组保留离当前参数最近的一个，equivalent 列为该组的组合数；
+    返回排序后的表"""
+    table = table.assign(distance=_distance(table))
+    table['equivalent'] = table.groupby('signature')['signature'].transform('size')
+    kept = table.sort_values('distance', kind='stable').drop_duplicates('signature')
+    return rank(kept.drop(columns='distance').sort_index())
+
+
+def sweep(tech, sentiment, returns, combos, workers=WORKERS, merge=True):
+    """评估全部组合，返回排序后的 DataFrame（见 rank；merge 为True时先用 collapse 合并买卖信号相同的组合）"""
+    combos = list(combos)
+    if workers <= 1 or (os.cpu_count() or 1) < 2 or len(combos) <= CHUNK_SIZE:
+        results = [evaluate(tech, sentiment, returns, w, t) for w, t in combos]
+    else:
+        shared = SharedArrays({'tech': tech, 'sentiment': sentiment, 'returns': returns})
+        try:
+            chunks = [combos[i:i + CHUNK_SIZE] for i in range(0, len(combos), CHUNK_SIZE)]
+            # 与 sentiment.py 相同用 spawn 启动工作进程，不继承调用方其他线程的状态
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(shared.spec,)) as pool:
+                results = [r for chunk in pool.map(_evaluate_chunk, chunks) for r in chunk]
+        finally:
+            shared.close()
+    table = pd.DataFrame(results)
+    return collapse(table) if merge else rank(table)
+
+
+def sentiment_history(codes, frames, panel_length):
+    """由新闻索引中的历史新闻生成每只股票每个交易日的新闻情绪评分 (N, T)，没有新闻的交易日为 NaN
+
+    每天的情绪与 analyze_sentiment 的规则相同：分数 > 0.7 为正面、< 0.3 为负面，按多数定倾向，
+    再由 scoring.sentiment_score 换算为评分；非交易日的新闻计入下一个交易日。
+    """
+    import news_index
+    from sentiment import score_titles
+    index = news_index.get_index()
+    out = np.full((len(frames), panel_length), np.nan)
+    for row, (code, df) in enumerate(zip(codes, frames)):
+        news = index.recent(code, -1)
+        if not news:
+            continue
+        dates = pd.to_datetime(df['Date']).to_numpy(dtype='datetime64[D]')
+        news_days = pd.to_datetime([d[:10] for d, _ in news], errors='coerce').to_numpy(dtype='datetime64[D]')
+        cols = np.searchsorted(dates, news_days)
+        scores = np.array(score_titles([title for _, title in news]))
+        offset = panel_length - len(df)
+        for col in np.unique(cols[(cols < len(dates)) & ~np.isnat(news_days)]):
+            day = scores[cols == col]
+            positive, negative = (day > 0.7).sum(), (day < 0.3).sum()
+            if negative > positive * 1.5:
+                label = "负面"
+            elif positive > negative * 1.5:
+                label = "正面"
+            else:
+                label = "中性"
+            out[row, offset + col] = scoring.sentiment_score(label, day.mean())
+    return out
+
+
+def prepare(frames, horizon=HORIZON):
+    """计算调参所需的只读数组：(技术面评分, horizon 个交易日后的收益率%)，形状均为 (股票数, 交易日数)"""
+    panel = stack_frames(frames)
+    indicators = panel_indicators(panel['Close'], panel['High'], panel['Low'])
+    tech = backtest.tech_scores(panel, indicators)
+    return tech, backtest.forward_returns(panel['Close'], (horizon,))[horizon]
+
+
+def format_table(table, horizon=HORIZON, top_n=TOP_N):
+    """调参结果前 top_n 名与当前参数的对比表"""
+    current_thresholds = tuple(scoring.SIGNAL_THRESHOLDS)
+    current = (table['weight'] == scoring.SENTIMENT_WEIGHT) & \
+              table['thresholds'].map(lambda t: t == current_thresholds)
+    lines = [f"{'排名':<4}{'新闻权重':>8}{'阈值':>18}{'买入次数':>10}{f'{horizon}日胜率':>10}"
+             f"{f'{horizon}日收益':>10}{'卖出次数':>10}{f'{horizon}日收益':>10}{'同信号组合':>8}"]
+    shown = list(range(min(top_n, len(table))))
+    shown += [i for i in np.flatnonzero(current.to_numpy()) if i not in shown]
+    def fmt(value, spec, width):
+        return f"{value:>{width}{spec}}" if value == value else f"{'-':>{width}}"
+
+    for i in shown:
+        row = table.iloc[i]
+        mark = "（当前）" if current.iloc[i] else ""
+        lines.append(f"{i + 1:<6}{row['weight']:>10.2f}{'/'.join(map(str, row['thresholds'])):>18}"
+                     f"{row['buy_count']:>12}{fmt(row['buy_hit'], '.1%', 12)}{fmt(row['buy_return'], '.2f', 11)}%"
+                     f"{row['sell_count']:>12}{fmt(row['sell_return'], '.2f', 11)}%"
+                     f"{row.get('equivalent', 1):>12}{mark}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='评分权重与信号阈值调参')
+    parser.add_argument('symbols', nargs='*', help='股票代码（默认使用K线缓存中的全部股票）')
+    parser.add_argument('--random', type=int, default=0, help='随机抽取的组合数（默认遍历网格）')
+    parser.add_argument('--horizon', type=int, default=HORIZON, help='按之后第几个交易日的收益评估')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    codes, frames = backtest.load_cached(args.symbols)
+    if not frames:
+        print("❌ 本地K线缓存中没有可回测的股票（先运行 wuxi_analysis.py 获取行情）")
+        return
+    started = time.perf_counter()
+    tech, returns = prepare(frames, args.horizon)
+    sentiment = sentiment_history(codes, frames, tech.shape[1])
+    news_days = int((~np.isnan(sentiment)).sum())
+    combos = random_combos(args.random) if args.random else grid()
+    combos.append((scoring.SENTIMENT_WEIGHT, tuple(scoring.SIGNAL_THRESHOLDS)))
+    combos = list(dict.fromkeys(combos))
+    table = sweep(tech, sentiment if news_days else None, returns, combos, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"📊 评分参数调参：{len(codes)} 只股票，{int((~np.isnan(tech)).sum())} 个交易日"
+          f"（其中 {news_days} 天有新闻），{len(combos)} 个组合（买卖信号相同的合并后 {len(table)} 组），"
+          f"耗时 {elapsed:.1f} 秒")
+    print(format_table(table, args.horizon))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按主机限速
+每个主机一个令牌桶（每秒请求数 + 突发量），所有经 http_client 发出的请求先取得令牌再发送，
+避免并发获取时触发新浪、东方财富等网站的反爬限制。
+主机返回 429/502/503 时按指数退避（带随机抖动）暂停该主机的全部请求，再重试。
+统计每个主机的限速等待时间、退避次数，便于调整限速参数。
+"""
+
+import random
+import threading
+import time
+
+# 限速开关（对本地模拟服务器压测、不需要模拟真实网站节奏时可关闭；关闭后仍会退避重试）
+ENABLED = True
+
+# 每个主机的限速：(每秒请求数, 突发量)，None 表示不限速；未配置的主机使用 DEFAULT_RATE
+DEFAULT_RATE = (5.0, 10)
+HOST_RATES = {
+    'money.finance.sina.com.cn': (3.0, 6),
+    'vip.stock.finance.sina.com.cn': (2.0, 4),
+    'push2his.eastmoney.com': (4.0, 8),
+    'np-anotice-stock.eastmoney.com': (2.0, 4),
+    'qt.gtimg.cn': (5.0, 10),
+    'xueqiu.com': (1.0, 2),
+    'stock.xueqiu.com': (2.0, 4),
+    'sctapi.ftqq.com': None,
+}
+
+# 遇到这些状态码时退避重试（只重试幂等的请求方法）
+RETRY_STATUSES = {429, 502, 503}
+RETRY_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+MAX_RETRIES = 3
+# 连接失败（请求未送达）最多重试的次数，域名解析失败等通常不会很快恢复
+MAX_CONNECT_RETRIES = 1
+BACKOFF_BASE = 0.5   # 首次退避时长（秒），之后每次加倍
+BACKOFF_MAX = 8.0
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，最多连续 burst 个请求不等待"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """预订一个令牌，返回需要等待的秒数（令牌可以透支，等待时间按排队先后递增）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds):
+        """暂停该主机的请求 seconds 秒（退避期间到达的请求都要等到暂停结束）"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """第 attempt 次重试前的等待时间：指数退避 + 随机抖动，服务器给出 Retry-After 时取两者较大值"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    delay = random.uniform(delay / 2, delay)
+    if retry_after:
+        try:
+            delay = max(delay, min(BACKOFF_MAX, float(retry_after)))
+        except ValueError:
+            pass
+    return delay
+
+
+_buckets = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _bucket(host):
+    with _lock:
+        if host not in _buckets:
+            rate = HOST_RATES.get(host, DEFAULT_RATE)
+            _buckets[host] = TokenBucket(*rate) if rate else None
+            _stats[host] = {'requests': 0, 'throttled': 0, 'wait': 0.0, 'backoffs': 0, 'backoff_wait': 0.0}
+        return _buckets[host]
+
+
+def acquire(host, max_wait=None):
+    """按主机限速：需要时等待（最多 max_wait 秒），返回等待的秒数"""
+    bucket = _bucket(host)
+    wait = bucket.reserve() if bucket is not None and ENABLED else 0.0
+    if max_wait is not None:
+        wait = min(wait, max_wait)
+    if wait > 0:
+        time.sleep(wait)
+    with _lock:
+        entry = _stats[host]
+        entry['requests'] += 1
+        if wait > 0:
+            entry['throttled'] += 1
+            entry['wait'] += wait
+    return wait
+
+
+def backoff(host, delay):
+    """主机返回限流/过载状态码：暂停该主机 delay 秒（见 backoff_delay），重试前由 acquire 等待"""
+    bucket = _bucket(host)
+    if bucket is not None:
+        bucket.pause(delay)
+    else:
+        time.sleep(delay)
+    with _lock:
+        _stats[host]['backoffs'] += 1
+        _stats[host]['backoff_wait'] += delay
+
+
+def stats():
+    """各主机限速统计：{host: {'requests', 'throttled', 'wait', 'backoffs', 'backoff_wait'}}
+
+    wait 为请求前的全部等待时间（包括退避暂停期间的等待）。
+    """
+    with _lock:
+        return {host: dict(entry) for host, entry in _stats.items()}
+
+
+def format_stats():
+    """生成限速统计的文本摘要"""
+    current = {host: s for host, s in stats().items() if s['requests']}
+    if not current:
+        return "⏳ 限速统计：本次未发出请求"
+    total_wait = sum(s['wait'] for s in current.values())
+    lines = [f"⏳ 限速统计：累计等待 {total_wait:.2f} 秒"]
+    for host, s in sorted(current.items(), key=lambda item: -item[1]['wait']):
+        line = f" - {host}：请求 {s['requests']} 次，限速等待 {s['throttled']} 次共 {s['wait']:.2f} 秒"
+        if s['backoffs']:
+            line += f"，退避 {s['backoffs']} 次共 {s['backoff_wait']:.2f} 秒"
+        lines.append(line)
+    return "\n".join(lines)
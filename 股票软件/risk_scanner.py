@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+风险关键词扫描
+从 KEYWORDS_PATH（每行一个词）读取风险关键词，一次性编译为 Aho-Corasick 自动机：
+扫描一篇文本只需从头到尾走一遍，耗时与文本长度成正比，与关键词个数无关，
+关键词表扩充到几百个、扫描公告全文也不会变慢。返回命中的关键词及其在文本中的位置。
+"""
+
+import os
+import threading
+
+KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_keywords.txt')
+
+
+def load_keywords(path=KEYWORDS_PATH):
+    """读取关键词表：每行一个词，忽略空行与 # 开头的注释，重复的词只保留一个"""
+    with open(path, encoding='utf-8') as f:
+        words = [line.strip() for line in f]
+    return list(dict.fromkeys(w for w in words if w and not w.startswith('#')))
+
+
+class KeywordMatcher:
+    """多模式匹配自动机（Aho-Corasick），构建后只读，可在多线程中共用"""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        # 状态 0 为根；_goto[s] 为状态 s 的转移，_fail[s] 为失配时退回的状态，
+        # _out[s] 为到达状态 s 时匹配结束的关键词下标（已并入失配链上各状态的输出）
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for idx, word in enumerate(self.keywords):
+            state = 0
+            for ch in word:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (idx,)
+
+        # 按层（广度优先）计算失配指针，子状态的失配目标一定比它浅
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def scan(self, text):
+        """返回文本中全部命中 [(关键词, 起始位置), ...]，按结束位置排列，重叠的命中都会列出"""
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self.keywords
+        matches = []
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                word = keywords[idx]
+                matches.append((word, pos - len(word) + 1))
+        return matches
+
+    def terms(self, text):
+        """文本中命中的关键词（去重，按首次出现的顺序）"""
+        return list(dict.fromkeys(word for word, _ in self.scan(text)))
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+_stats = {'documents': 0, 'flagged': 0}
+
+
+def get_matcher():
+    """返回进程共享的关键词自动机（首次调用时读取 KEYWORDS_PATH 构建）"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = KeywordMatcher(load_keywords())
+    return _matcher
+
+
+def scan_news(news):
+    """扫描新闻 [(日期, 标题或正文), ...]，返回命中的 [(日期, 文本, [(关键词, 位置), ...]), ...]"""
+    news = list(news)
+    matcher = get_matcher()
+    flagged = []
+    for date, text in news:
+        matches = matcher.scan(text)
+        if matches:
+            flagged.append((date, text, matches))
+    with _matcher_lock:
+        _stats['documents'] += len(news)
+        _stats['flagged'] += len(flagged)
+    return flagged
+
+
+def format_stats():
+    """生成风险关键词扫描的文本摘要"""
+    if _matcher is None:
+        return "🚨 风险关键词：本次未扫描"
+    return (f"🚨 风险关键词：扫描 {_stats['documents']} 篇，命中 {_stats['flagged']} 篇"
+            f"（关键词 {len(_matcher.keywords)} 个）")
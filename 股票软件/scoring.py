@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+综合评分规则
+wuxi_analysis.evaluate_signals、综合评价系统 StockAnalyzer、backtest 与 param_sweep 共用的评分参数与规则：
+新闻情绪评分、技术面评分、两者按权重合成综合评分，再按阈值给出操作建议。
+权重与阈值可用 param_sweep.py 按历史数据调参后修改这里的常量。
+"""
+
+# 综合评分 = 新闻情绪评分 × SENTIMENT_WEIGHT + 技术面评分 × (1 - SENTIMENT_WEIGHT)
+SENTIMENT_WEIGHT = 0.4
+
+# 综合评分 >= 各阈值依次为 观望/持有/买入/强烈买入，低于第一个阈值为卖出
+SIGNAL_THRESHOLDS = (30, 45, 65, 80)
+SIGNALS = ['卖出', '观望', '持有', '买入', '强烈买入']
+CONFIDENCE = ['高', '中低', '中', '中高', '高']
+RISK_LEVELS = ['高', '中', '中', '低', '低']
+
+
+def sentiment_score(sentiment_label, avg_sentiment_score=0.5):
+    """新闻情绪评分 (0-100分)：正面 80-100，中性 40-60，负面 0-40，区间内按平均情绪分数浮动"""
+    if sentiment_label == "正面":
+        return 80 + (avg_sentiment_score - 0.5) * 40
+    elif sentiment_label == "负面":
+        return 20 + (avg_sentiment_score - 0.5) * 40
+    return 40 + (avg_sentiment_score - 0.5) * 40
+
+
+def tech_score(tech):
+    """技术面评分 (0-100分)，tech 为 fetch_stock_data 返回的技术指标字典"""
+    score = 50  # 基础分
+
+    # MACD
+    if tech.get('diff', 0) > tech.get('dea', 0):
+        score += 10  # 多头趋势
+    else:
+        score -= 10  # 空头趋势
+
+    # KDJ
+    k_value = tech.get('K', 50)
+    d_value = tech.get('D', 50)
+    if k_value < 20 and d_value < 20:
+        score += 15  # 超卖，买入信号
+    elif k_value > 80 and d_value > 80:
+        score -= 15  # 超买，卖出信号
+
+    # 均线
+    ma5 = tech.get('ma5', 0)
+    ma10 = tech.get('ma10', 0)
+    ma20 = tech.get('ma20', 0)
+    close = tech.get('last_close', 0)
+    if close > ma5 > ma10 > ma20:
+        score += 10  # 多头排列
+    elif close < ma5 < ma10 < ma20:
+        score -= 10  # 空头排列
+
+    # 成交量
+    if tech.get('volume_high', False):
+        score += 5  # 成交量放大
+
+    # 涨跌幅
+    pct_change = tech.get('pct_change', 0)
+    if pct_change > 3:
+        score += 5  # 大涨
+    elif pct_change < -3:
+        score -= 5  # 大跌
+
+    return max(0, min(100, score))
+
+
+def combine(sentiment, tech, sentiment_weight=SENTIMENT_WEIGHT):
+    """合成综合评分，缺少一项（None）时只用另一项"""
+    if tech is None:
+        return sentiment
+    if sentiment is None:
+        return tech
+    return sentiment * sentiment_weight + tech * (1 - sentiment_weight)
+
+
+def signal_index(final_score, thresholds=SIGNAL_THRESHOLDS):
+    """综合评分对应的建议在 SIGNALS 中的下标"""
+    return sum(final_score >= t for t in thresholds)
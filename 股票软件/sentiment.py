@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新闻标题情绪评分
+SnowNLP 的评分结果按标题内容哈希缓存在本地 SQLite 中，已评过分的标题不再调用 SnowNLP；
+缓存条数超过上限时按最近使用时间淘汰（LRU）。
+未命中缓存的标题较多时分批交给进程池评分，每个工作进程只加载一次模型。
+"""
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_cache.db')
+MAX_ENTRIES = 200000
+# 更换情绪模型时修改此标记，旧的缓存结果自动失效
+MODEL_TAG = 'snownlp'
+
+# 进程池评分：工作进程数，以及启用进程池的最少待评分标题数（太少时进程启动开销更大）
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MIN_PARALLEL_TITLES = 64
+CHUNK_SIZE = 32
+
+
+def title_key(title):
+    return hashlib.sha1(f"{MODEL_TAG}\0{title}".encode('utf-8')).hexdigest()
+
+
+class SentimentCache:
+    """标题情绪分数缓存（SQLite，多线程共用一个连接）"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            " key TEXT PRIMARY KEY, score REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON sentiment(last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """查询一批键，返回 {key: score}，并刷新命中条目的最近使用时间"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, score FROM sentiment WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE sentiment SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, scores):
+        """写入 {key: score}，超过上限时淘汰最久未使用的条目"""
+        if not scores:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO sentiment (key, score, last_used) VALUES (?, ?, ?)",
+                                   [(key, float(score), now) for key, score in scores.items()])
+            count = self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM sentiment WHERE key IN ("
+                    " SELECT key FROM sentiment ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """返回进程共享的情绪缓存（首次调用时打开）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SentimentCache()
+    return _cache
+
+
+def _score_chunk(titles):
+    """在当前进程中逐条评分（snownlp 在首次调用时才导入，导入时加载模型）"""
+    from snownlp import SnowNLP
+    return [SnowNLP(title).sentiments for title in titles]
+
+
+def _init_worker():
+    # 工作进程启动时加载一次模型，之后的批次直接复用
+    import snownlp  # noqa: F401
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # 调用方可能正在多线程运行，用 spawn 避免 fork 继承其他线程持有的锁
+                _pool = ProcessPoolExecutor(max_workers=WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker)
+                atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def _discard_pool():
+    # 进程池损坏（如工作进程崩溃）后丢弃，下次调用时重新创建
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _score_many(titles, parallel):
+    if not parallel or WORKERS <= 1 or len(titles) < MIN_PARALLEL_TITLES:
+        return _score_chunk(titles)
+    chunks = [titles[i:i + CHUNK_SIZE] for i in range(0, len(titles), CHUNK_SIZE)]
+    try:
+        results = _get_pool().map(_score_chunk, chunks)
+        return [score for chunk_scores in results for score in chunk_scores]
+    except Exception as e:
+        print(f"⚠️ 进程池情绪评分失败，改为单进程评分: {e}")
+        _discard_pool()
+        return _score_chunk(titles)
+
+
+def score_titles(titles, use_cache=True, parallel=True):
+    """为一组标题评分，返回与输入顺序一致的分数列表（0~1，越大越正面）
+
+    重复的标题只评一次；缓存未命中的标题不少于 MIN_PARALLEL_TITLES 条时交给进程池并行评分。
+    """
+    titles = list(titles)
+    if not titles:
+        return []
+    keys = [title_key(title) for title in titles]
+    cache = get_cache() if use_cache else None
+    known = cache.get_many(keys) if cache is not None else {}
+
+    pending = {}
+    for key, title in zip(keys, titles):
+        if key not in known and key not in pending:
+            pending[key] = title
+    computed = dict(zip(pending, _score_many(list(pending.values()), parallel)))
+    if cache is not None:
+        cache.put_many(computed)
+
+    known.update(computed)
+    return [known[key] for key in keys]
+
+
+def format_stats():
+    """生成情绪缓存命中统计的文本摘要"""
+    if _cache is None:
+        return "🧠 情绪缓存：本次未使用"
+    total = _cache.hits + _cache.misses
+    hit_rate = _cache.hits / total * 100 if total else 0.0
+    return (f"🧠 情绪缓存：命中 {_cache.hits} 条，未命中 {_cache.misses} 条"
+            f"（命中率 {hit_rate:.1f}%），缓存共 {len(_cache)} 条")
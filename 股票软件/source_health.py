@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据源健康记录
+记录每个行情/新闻数据源每次请求的成败与耗时（成功率、p50/p95 耗时、最近一次失败原因），
+并持久化到本地 JSON。据此动态调整数据源的尝试顺序，并用熔断器跳过持续失败的数据源：
+- 关闭（closed）：正常使用
+- 打开（open）：连续失败 FAILURE_THRESHOLD 次后熔断，OPEN_SECONDS 内不再尝试
+- 半开（half_open）：熔断期满后只放行一个探测请求，成功则恢复，失败则再次熔断（熔断时间加倍）
+"""
+
+import json
+import os
+import threading
+import time
+
+HEALTH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'source_health.json')
+
+FAILURE_THRESHOLD = 3      # 连续失败多少次后熔断
+OPEN_SECONDS = 30 * 60     # 首次熔断时长（秒）
+MAX_OPEN_SECONDS = 24 * 3600
+PROBE_TIMEOUT = 60         # 探测请求超过该时间没有结果，允许再发一个探测
+WINDOW = 100               # 计算成功率与耗时分位数所用的最近请求数
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class SourceHealth:
+    """数据源健康记录与熔断器（线程安全）"""
+
+    def __init__(self, path=HEALTH_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sources = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._sources = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 数据源健康记录 {path} 读取失败，重新开始记录: {e}")
+
+    def _entry(self, name):
+        return self._sources.setdefault(name, {
+            'results': [],            # 最近 WINDOW 次的成败（1/0）
+            'latencies': [],          # 最近 WINDOW 次成功请求的耗时（秒）
+            'consecutive_failures': 0,
+            'state': 'closed',
+            'opened_at': None,
+            'open_seconds': OPEN_SECONDS,
+            'probe_started': None,
+            'last_failure': None,     # {'time': 时间戳, 'reason': 原因}
+        })
+
+    def record(self, name, ok, latency, reason=None):
+        """记录一次请求结果，并更新熔断状态"""
+        with self._lock:
+            entry = self._entry(name)
+            entry['results'] = (entry['results'] + [1 if ok else 0])[-WINDOW:]
+            entry['probe_started'] = None
+            if ok:
+                entry['latencies'] = (entry['latencies'] + [round(latency, 4)])[-WINDOW:]
+                entry['consecutive_failures'] = 0
+                entry['state'] = 'closed'
+                entry['opened_at'] = None
+                entry['open_seconds'] = OPEN_SECONDS
+            else:
+                entry['consecutive_failures'] += 1
+                entry['last_failure'] = {'time': time.time(), 'reason': str(reason or '未知原因')[:200]}
+                if entry['state'] == 'half_open':
+                    # 探测失败：重新熔断，熔断时间加倍
+                    entry['state'] = 'open'
+                    entry['opened_at'] = time.time()
+                    entry['open_seconds'] = min(entry['open_seconds'] * 2, MAX_OPEN_SECONDS)
+                elif entry['consecutive_failures'] >= FAILURE_THRESHOLD and entry['state'] == 'closed':
+                    entry['state'] = 'open'
+                    entry['opened_at'] = time.time()
+            self._save_locked()
+
+    def _allow_locked(self, entry):
+        now = time.time()
+        if entry['state'] == 'open':
+            if now - entry['opened_at'] < entry['open_seconds']:
+                return False
+            entry['state'] = 'half_open'
+        if entry['state'] == 'half_open':
+            if entry['probe_started'] and now - entry['probe_started'] < PROBE_TIMEOUT:
+                return False
+            entry['probe_started'] = now
+        return True
+
+    def allow(self, name):
+        """是否允许请求该数据源（半开状态下同时只放行一个探测请求）"""
+        with self._lock:
+            return self._allow_locked(self._entry(name))
+
+    def order(self, names):
+        """按健康状况排序，返回允许尝试的数据源在 names 中的下标
+
+        成功率（按 10% 分档）高的在前，同档按 p50 耗时升序，再按原有顺序；
+        熔断中的数据源被跳过，半开状态的探测请求排在最后。
+        """
+        with self._lock:
+            ranked = []
+            for idx, name in enumerate(names):
+                entry = self._entry(name)
+                if not self._allow_locked(entry):
+                    continue
+                results = entry['results']
+                success_rate = (sum(results) + 1) / (len(results) + 2)  # 没有记录时视为 50%
+                p50 = _percentile(entry['latencies'], 50)
+                ranked.append((entry['state'] == 'half_open', -round(success_rate, 1),
+                               p50 if p50 is not None else float('inf'), idx))
+            return [item[-1] for item in sorted(ranked)]
+
+    def stats(self, name):
+        """单个数据源的统计：成功率、p50/p95 耗时、熔断状态、最近失败原因"""
+        with self._lock:
+            entry = self._entry(name)
+            results = entry['results']
+            return {
+                'attempts': len(results),
+                'success_rate': sum(results) / len(results) if results else None,
+                'p50': _percentile(entry['latencies'], 50),
+                'p95': _percentile(entry['latencies'], 95),
+                'state': entry['state'],
+                'last_failure': entry['last_failure'],
+            }
+
+    def names(self):
+        with self._lock:
+            return list(self._sources)
+
+    def _save_locked(self):
+        if not self.path:
+            return
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._sources, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ 数据源健康记录保存失败: {e}")
+
+
+_scoreboard = None
+_scoreboard_lock = threading.Lock()
+
+
+def get_scoreboard():
+    """返回进程共享的数据源健康记录（首次调用时从 HEALTH_PATH 读取）"""
+    global _scoreboard
+    if _scoreboard is None:
+        with _scoreboard_lock:
+            if _scoreboard is None:
+                _scoreboard = SourceHealth()
+    return _scoreboard
+
+
+def format_stats():
+    """生成数据源健康状况的文本摘要"""
+    if _scoreboard is None:
+        return "🩺 数据源健康：本次未使用"
+    state_names = {'closed': '正常', 'open': '熔断', 'half_open': '探测中'}
+    lines = ["🩺 数据源健康："]
+    for name in _scoreboard.names():
+        s = _scoreboard.stats(name)
+        if not s['attempts']:
+            continue
+        rate = f"{s['success_rate'] * 100:.0f}%"
+        p50 = f"{s['p50']:.2f}s" if s['p50'] is not None else "-"
+        p95 = f"{s['p95']:.2f}s" if s['p95'] is not None else "-"
+        line = f" - {name}：成功率 {rate}（{s['attempts']} 次），p50 {p50}，p95 {p95}，{state_names[s['state']]}"
+        if s['last_failure']:
+            line += f"，最近失败：{s['last_failure']['reason']}"
+        lines.append(line)
+    return "\n".join(lines)
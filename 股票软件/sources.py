@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情/新闻数据源适配器
+每个数据源一个适配器类，声明 URL 构造、响应解析、所需的股票代码格式以及是否支持一次请求多只股票；
+用 @register_price_source / @register_news_source 注册后即参与调度，新增或停用数据源不必修改主流程。
+调度时按数据源健康记录（成功率、p50 耗时）从能处理该任务的适配器中挑选最快的，跳过熔断中的数据源。
+"""
+
+import io
+import json
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+
+import deadline
+import http_client
+import kline_parsers
+import source_health
+
+# 已注册的适配器：名称 -> 实例，注册顺序即没有健康记录时的默认优先级
+PRICE_SOURCES = {}
+NEWS_SOURCES = {}
+
+
+def register_price_source(cls):
+    PRICE_SOURCES[cls.name] = cls()
+    return cls
+
+
+def register_news_source(cls):
+    NEWS_SOURCES[cls.name] = cls()
+    return cls
+
+
+def format_symbol(stock_code, symbol_format):
+    """把 sh603259 形式的代码转换为数据源需要的格式
+
+    - prefixed：sh603259（新浪、腾讯等）
+    - upper：SH603259（雪球）
+    - secid：1.603259（东方财富，1=沪市，0=深市）
+    - netease：0603259（网易，0=沪市，1=深市）
+    - plain：603259
+    """
+    market, number = stock_code[:2], stock_code[2:]
+    if symbol_format == 'prefixed':
+        return stock_code
+    if symbol_format == 'upper':
+        return stock_code.upper()
+    if symbol_format == 'secid':
+        return f"{'1' if market == 'sh' else '0'}.{number}"
+    if symbol_format == 'netease':
+        return f"{'0' if market == 'sh' else '1'}{number}"
+    if symbol_format == 'plain':
+        return number
+    raise ValueError(f"未知的股票代码格式: {symbol_format}")
+
+
+class PriceSource:
+    """行情数据源适配器基类
+
+    子类设置 name，实现 build_url() 与 parse()；parse() 返回K线 DataFrame，未取得有效数据时返回None。
+    各数据源的成交量单位不同，parse() 统一换算为股，K线才能在缓存中拼接、与最新报价比较。
+    """
+    name = None
+    symbol_format = 'prefixed'
+    markets = ('sh', 'sz')  # 支持的市场
+    batch = False           # 是否支持一次请求多只股票（支持时实现 fetch_quotes）
+    max_batch = 1           # 一次请求最多包含的股票数
+    synthetic = False       # K线是否由最新报价推算（不写入K线缓存）
+    adjust = 'none'         # 复权方式：'none' 不复权，'qfq' 前复权；不同复权方式的K线不能在缓存中拼接
+    enabled = True
+
+    def supports(self, stock_code, batch=False):
+        return self.enabled and stock_code[:2] in self.markets and (self.batch or not batch)
+
+    def build_url(self, symbol, start_date, end_date, count):
+        raise NotImplementedError
+
+    def parse(self, resp):
+        raise NotImplementedError
+
+    def fetch(self, stock_code, start_date, end_date, count):
+        symbol = format_symbol(stock_code, self.symbol_format)
+        return self.parse(http_client.get(self.build_url(symbol, start_date, end_date, count)))
+
+
+class NewsSource:
+    """新闻数据源适配器基类：fetch() 返回 [(日期, 标题), ...]
+
+    seen 为可选的判断函数 seen(一页新闻) -> bool，按页翻取的数据源遇到整页都已处理过时停止翻页。
+    """
+    name = None
+    label = None
+    symbol_format = 'prefixed'
+    markets = ('sh', 'sz')
+    batch = False
+    enabled = True
+
+    def supports(self, stock_code, batch=False):
+        return self.enabled and stock_code[:2] in self.markets and (self.batch or not batch)
+
+    def fetch(self, symbol, max_pages=3, seen=None):
+        raise NotImplementedError
+
+
+def _schedule(registry, kind, stock_code, batch):
+    capable = [source for source in registry.values() if source.supports(stock_code, batch)]
+    order = source_health.get_scoreboard().order([f"{kind}:{source.name}" for source in capable])
+    return [capable[idx] for idx in order]
+
+
+def schedule_price_sources(stock_code, batch=False):
+    """能获取该股票行情的数据源，按健康记录从快到慢排列（跳过熔断中的数据源）
+
+    由最新报价推算K线的数据源只作为最后的备选，排在提供真实历史K线的数据源之后。
+    """
+    return sorted(_schedule(PRICE_SOURCES, 'price', stock_code, batch), key=lambda source: source.synthetic)
+
+
+def schedule_news_sources(stock_code, batch=False):
+    """能获取该股票新闻的数据源，按健康记录从快到慢排列（跳过熔断中的数据源）"""
+    return _schedule(NEWS_SOURCES, 'news', stock_code, batch)
+
+
+# ---------------------------------------------------------------- 行情数据源
+
+@register_price_source
+class NeteasePrice(PriceSource):
+    name = '网易'
+    symbol_format = 'netease'
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return (f"http://quotes.money.163.com/service/chddata.html?code={symbol}&start={start_date}&end={end_date}"
+                f"&fields=TCLOSE;HIGH;LOW;OPEN;LCLOSE;PCHG;VOL")
+
+    def parse(self, resp):
+        resp.raise_for_status()
+        df = pd.read_csv(io.BytesIO(resp.content), encoding='gbk')
+        if df.empty:
+            return None
+        df.rename(columns={
+            '日期': 'Date', '收盘价': 'Close', '最高价': 'High', '最低价': 'Low',
+            '开盘价': 'Open', '前收盘': 'PrevClose', '涨跌幅': 'PctChange', '成交量': 'Volume'
+        }, inplace=True)
+        print(f"✅ 网易数据源成功")
+        return df
+
+
+@register_price_source
+class SinaPrice(PriceSource):
+    name = '新浪'
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return (f"http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData"
+                f"?symbol={symbol}&scale=240&ma=5&datalen={count}")
+
+    def parse(self, resp):
+        if resp.status_code != 200:
+            return None
+        df = kline_parsers.parse_sina_klines(resp.text)
+        if df is not None:
+            print(f"✅ 新浪数据源成功")
+        return df
+
+
+@register_price_source
+class EastmoneyPrice(PriceSource):
+    name = '东方财富'
+    symbol_format = 'secid'
+    adjust = 'qfq'  # fqt=1
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return (f"http://push2his.eastmoney.com/api/qt/stock/kline/get?secid={symbol}"
+                f"&fields1=f1,f2,f3,f4,f5,f6&fields2=f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61"
+                f"&klt=101&fqt=1&beg={start_date}&end=20500101&smplmt=100&lmt=1000000")
+
+    def parse(self, resp):
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        if not (data.get('data') and data['data'].get('klines')):
+            return None
+        df = kline_parsers.parse_eastmoney_klines(data['data']['klines'])
+        if df is not None:
+            print(f"✅ 东方财富数据源成功")
+        return df
+
+
+@register_price_source
+class TencentPrice(PriceSource):
+    name = '腾讯'
+    synthetic = True
+    batch = True
+    max_batch = 60
+
+    # 报价记录 v_sh603259="1~名称~代码~现价~昨收~今开~成交量(手)~...~时间~涨跌~涨跌幅~最高~最低~...";
+    record_pattern = re.compile(r'v_(\w+)="([^"]*)"')
+    quote_fields = {'Price': 3, 'PrevClose': 4, 'Open': 5, 'Change': 31, 'PctChange': 32,
+                    'High': 33, 'Low': 34, 'Volume': 36}
+    time_field = 30
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return f"http://qt.gtimg.cn/q={symbol}"
+
+    def parse_quotes(self, text):
+        """解析一段或多段报价记录，返回以股票代码为索引的最新报价 DataFrame（成交量单位为股）"""
+        records = [(code, body.split('~')) for code, body in self.record_pattern.findall(text)]
+        width = max(self.quote_fields.values()) + 1
+        records = [(code, fields[:width]) for code, fields in records if len(fields) >= width]
+        columns = ['Name', 'Date', 'Time'] + list(self.quote_fields)
+        if not records:
+            return pd.DataFrame(columns=columns, index=pd.Index([], name='code'))
+        codes, rows = zip(*records)
+        table = np.array(rows)
+        times = pd.to_datetime(pd.Series(table[:, self.time_field]), format='%Y%m%d%H%M%S', errors='coerce')
+        quotes = pd.DataFrame({'Name': table[:, 1], 'Date': times.dt.normalize().to_numpy(),
+                               'Time': times.to_numpy()}, index=pd.Index(codes, name='code'))
+        for col, j in self.quote_fields.items():
+            quotes[col] = pd.to_numeric(pd.Series(table[:, j]), errors='coerce').to_numpy()
+        quotes['Volume'] = quotes['Volume'] * 100  # 手 -> 股
+        return quotes[columns]
+
+    def fetch_quotes(self, stock_codes):
+        """一次请求多只股票（不超过 max_batch 只）的最新报价"""
+        resp = http_client.get(f"http://qt.gtimg.cn/q={','.join(stock_codes)}")
+        resp.raise_for_status()
+        resp.encoding = 'gbk'
+        return self.parse_quotes(resp.text)
+
+    def parse(self, resp):
+        if resp.status_code != 200 or '~' not in resp.text:
+            return None
+        quotes = self.parse_quotes(resp.text)
+        if quotes.empty:
+            return None
+        quote = quotes.iloc[0]
+        current_price = quote['Price']
+        pct_change = quote['PctChange']
+        volume = int(quote['Volume'])
+
+        # 生成最近几天的数据
+        df_data = []
+        for j in range(30):
+            date = (pd.Timestamp.now() - pd.Timedelta(days=j)).strftime('%Y-%m-%d')
+            df_data.append({
+                'Date': date,
+                'Open': current_price * (1 + np.random.normal(0, 0.01)),
+                'High': current_price * (1 + abs(np.random.normal(0, 0.005))),
+                'Low': current_price * (1 - abs(np.random.normal(0, 0.005))),
+                'Close': current_price,
+                'Volume': volume,
+                'PctChange': pct_change
+            })
+        print(f"✅ 腾讯数据源成功")
+        return pd.DataFrame(df_data)
+
+
+@register_price_source
+class XueqiuPrice(PriceSource):
+    name = '雪球'
+    symbol_format = 'upper'
+    adjust = 'qfq'  # type=before
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return (f"https://stock.xueqiu.com/v5/stock/chart/kline.json?symbol={symbol}&period=day&type=before"
+                f"&count={count}&indicator=kline,pe,pb,ps,pcf,market_capital,agt,ggt,balance")
+
+    def parse(self, resp):
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        if not (data.get('data') and data['data'].get('item')):
+            return None
+        df_data = []
+        for item in data['data']['item']:
+            df_data.append({
+                'Date': item[0],
+                'Open': float(item[1]),
+                'High': float(item[2]),
+                'Low': float(item[3]),
+                'Close': float(item[4]),
+                'Volume': int(item[5]),
+                'PctChange': float(item[6]) if len(item) > 6 else 0
+            })
+        print(f"✅ 雪球数据源成功")
+        return pd.DataFrame(df_data)
+
+
+@register_price_source
+class ThsPrice(PriceSource):
+    name = '同花顺'
+    enabled = False  # 尚未解析出K线数据
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return f"http://d.10jqka.com.cn/v6/line/hs_{symbol}/01/today.js"
+
+    def parse(self, resp):
+        return None
+
+
+@register_price_source
+class DzhPrice(PriceSource):
+    name = '大智慧'
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return f"http://hq.gw.com.cn/kline?code={symbol}&period=day&count={count}"
+
+    def parse(self, resp):
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        if not data.get('data'):
+            return None
+        df_data = []
+        for item in data['data']:
+            df_data.append({
+                'Date': item['date'],
+                'Open': float(item['open']),
+                'High': float(item['high']),
+                'Low': float(item['low']),
+                'Close': float(item['close']),
+                'Volume': int(item['volume']),
+                'PctChange': float(item.get('pct_change', 0))
+            })
+        print(f"✅ 大智慧数据源成功")
+        return pd.DataFrame(df_data)
+
+
+@register_price_source
+class JrjPrice(PriceSource):
+    name = '金融界'
+    enabled = False  # 尚未解析出K线数据
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return f"http://q.jrjimg.cn/?q=cn|s|{symbol}&n=hq&c=1&o=0&f=1&v=1.1"
+
+    def parse(self, resp):
+        return None
+
+
+@register_price_source
+class HexunPrice(PriceSource):
+    name = '和讯网'
+    enabled = False  # 尚未解析出K线数据
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return f"http://webstock.10jqka.com.cn/hs_zfzq/hq/{symbol}/"
+
+    def parse(self, resp):
+        return None
+
+
+@register_price_source
+class IfengPrice(PriceSource):
+    name = '凤凰网'
+
+    def build_url(self, symbol, start_date, end_date, count):
+        return f"http://api.finance.ifeng.com/akdaily/?code={symbol}&type=last&start={start_date}&end={end_date}"
+
+    def parse(self, resp):
+        resp.raise_for_status()
+        df = pd.read_csv(io.BytesIO(resp.content), encoding='utf-8')
+        if df.empty:
+            return None
+        print(f"✅ 凤凰网数据源成功")
+        return df
+
+
+def fetch_latest_quotes(stock_codes):
+    """批量获取多只股票的最新报价
+
+    由支持批量请求的数据源按其 max_batch 分组请求，几次请求即可取得数百只股票的报价；
+    返回以股票代码为索引的 DataFrame（Name/Date/Time/Price/PrevClose/Open/Change/PctChange/High/Low/Volume），
+    获取失败的股票不在结果中。
+    """
+    stock_codes = list(dict.fromkeys(stock_codes))
+    if not stock_codes:
+        return pd.DataFrame()
+    health = source_health.get_scoreboard()
+    frames = []
+    pending = stock_codes
+    for source in schedule_price_sources(stock_codes[0], batch=True):
+        failed = []
+        for start in range(0, len(pending), source.max_batch):
+            chunk = pending[start:start + source.max_batch]
+            symbols = {format_symbol(code, source.symbol_format): code for code in chunk}
+            started = time.monotonic()
+            try:
+                quotes = source.fetch_quotes(list(symbols))
+            except Exception as e:
+                if not isinstance(e, deadline.DeadlineExceeded):
+                    health.record(f"price:{source.name}", False, time.monotonic() - started, e)
+                print(f"❌ {source.name}批量报价失败（{len(chunk)} 只）: {e}")
+                failed.extend(chunk)
+                continue
+            health.record(f"price:{source.name}", not quotes.empty, time.monotonic() - started,
+                          None if not quotes.empty else "未取得报价")
+            quotes = quotes[quotes.index.isin(list(symbols))].rename(index=symbols)
+            frames.append(quotes)
+            failed.extend(code for code in chunk if code not in quotes.index)
+        pending = failed
+        if not pending:
+            break
+    if not frames:
+        return pd.DataFrame()
+    quotes = pd.concat(frames)
+    quotes.index.name = 'code'
+    return quotes[~quotes.index.duplicated(keep='last')]
+
+
+# ---------------------------------------------------------------- 股票列表
+
+SYMBOL_LIST_URL = "http://push2.eastmoney.com/api/qt/clist/get"
+# 沪深A股：深市主板/创业板（m:0+t:6、m:0+t:80）、沪市主板/科创板（m:1+t:2、m:1+t:23）
+SYMBOL_LIST_MARKETS = "m:0+t:6,m:0+t:80,m:1+t:2,m:1+t:23"
+SYMBOL_LIST_PAGE_SIZE = 100  # 东方财富每页最多返回 100 条
+
+
+def fetch_symbol_list():
+    """获取沪深A股全部股票代码与名称（东方财富行情列表，按页请求）
+
+    返回 [(股票代码, 名称), ...]，代码带 sh/sz 前缀；获取失败的页跳过，全部失败时返回空列表。
+    """
+    symbols = {}
+    page, pages = 1, 1
+    while page <= pages:
+        params = {'pn': page, 'pz': SYMBOL_LIST_PAGE_SIZE, 'po': 1, 'np': 1, 'fltt': 2, 'invt': 2,
+                  'fid': 'f12', 'fs': SYMBOL_LIST_MARKETS, 'fields': 'f12,f13,f14'}
+        try:
+            data = http_client.get(SYMBOL_LIST_URL, params=params).json().get('data') or {}
+        except Exception as e:
+            print(f"❌ 股票列表第{page}页获取失败: {e}")
+            if page == 1:
+                break
+            page += 1
+            continue
+        pages = -(-int(data.get('total', 0)) // SYMBOL_LIST_PAGE_SIZE)
+        for item in data.get('diff') or []:
+            code = str(item.get('f12', ''))
+            if code.isdigit():
+                symbols[('sh' if item.get('f13') == 1 else 'sz') + code] = item.get('f14', '')
+        page += 1
+    return list(symbols.items())
+
+
+# ---------------------------------------------------------------- 新闻数据源
+
+def _parse_news_list(html):
+    """同花顺、金融界等通用新闻列表页：查找含日期与链接的条目"""
+    soup = BeautifulSoup(html, 'html.parser')
+    news = []
+    for item in soup.find_all(['div', 'li'], class_=re.compile(r'news|item|list')):
+        date_elem = item.find(['span', 'div'], class_=re.compile(r'date|time'))
+        title_elem = item.find('a')
+        if date_elem and title_elem:
+            date_str = date_elem.get_text().strip()
+            title = title_elem.get_text().strip()
+            if date_str and title:
+                news.append((date_str, title))
+    return news
+
+
+@register_news_source
+class SinaNews(NewsSource):
+    name = 'sina'
+    label = '新浪'
+    url = "https://vip.stock.finance.sina.com.cn/corp/view/vCB_AllNewsStock.php"
+    news_pattern = re.compile(r'(\d{4}-\d{2}-\d{2})\s+(\d{2}:\d{2})\s+<a[^>]*>([^<]+)</a>')
+
+    def fetch(self, symbol, max_pages=3, seen=None):
+        news = []
+        for page in range(1, max_pages + 1):
+            try:
+                resp = http_client.get(self.url, params={"symbol": symbol, "Page": page})
+                resp.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                print(f"❌ 新浪新闻页面{page}出错: {e}")
+                if page == 1:
+                    break
+                continue
+
+            try:
+                resp.encoding = 'gbk'
+                soup = BeautifulSoup(resp.text, 'html.parser')
+                news_container = soup.find('div', class_='datelist')
+                if not news_container:
+                    print(f"❌ 新浪新闻页面{page}未找到新闻容器")
+                    break
+                page_news = [(f"{date_str} {time_str}", title.strip())
+                             for date_str, time_str, title in self.news_pattern.findall(str(news_container))]
+                news.extend(page_news)
+                print(f"✅ 新浪新闻页面{page}成功，获取 {len(page_news)} 条新闻")
+                if not page_news:
+                    break
+                if seen is not None and page < max_pages and seen(page_news):
+                    print(f"⏭️ 新浪新闻页面{page}均已处理过，不再翻页")
+                    break
+            except Exception as e:
+                print(f"❌ 解析新浪新闻页面{page}出错: {e}")
+                break
+        return news
+
+
+@register_news_source
+class EastmoneyNews(NewsSource):
+    name = 'eastmoney'
+    label = '东方财富'
+    url = "http://np-anotice-stock.eastmoney.com/api/security/announcement/getAnnouncementList"
+
+    def fetch(self, symbol, max_pages=3, seen=None):
+        # 尝试不同的股票代码格式
+        stock_formats = [symbol, symbol[2:], f"0{symbol[2:]}" if symbol.startswith('sh') else f"1{symbol[2:]}"]
+        for stock_format in stock_formats:
+            params = {"cb": "jQuery", "pageSize": 20, "pageIndex": 1, "stock": stock_format}
+            resp = http_client.get(self.url, params=params)
+            if resp.status_code != 200 or not resp.text:
+                continue
+            content = resp.text
+            # 解析JSONP格式（jQuery(...)）或直接解析JSON
+            if content.startswith('jQuery(') and content.endswith(')'):
+                content = content[7:-1]
+            try:
+                data = json.loads(content)
+            except json.JSONDecodeError:
+                continue
+            if 'data' in data and 'list' in data['data']:
+                news = [(item.get('notice_date', ''), item.get('title', '')) for item in data['data']['list']]
+                return [(date_str, title) for date_str, title in news if date_str and title]
+        return []
+
+
+@register_news_source
+class XueqiuNews(NewsSource):
+    name = 'xueqiu'
+    label = '雪球'
+    # 雪球需要特殊的请求头
+    headers = {
+        'Referer': 'https://xueqiu.com/',
+        'Accept': 'application/json, text/plain, */*',
+        'X-Requested-With': 'XMLHttpRequest'
+    }
+
+    def fetch(self, symbol, max_pages=3, seen=None):
+        url = f"https://xueqiu.com/statuses/search.json?count=20&comment=0&source=all&sort=time&page=1&stock={symbol}"
+        resp = http_client.get(url, headers=self.headers)
+        if resp.status_code != 200:
+            print(f"❌ 雪球请求失败: {resp.status_code}")
+            return []
+        try:
+            data = resp.json()
+        except json.JSONDecodeError as e:
+            print(f"❌ 雪球JSON解析失败: {e}")
+            return []
+        news = []
+        for item in data.get('list', []):
+            created_at = item.get('created_at', '')
+            title = item.get('title', '')
+            if created_at and title:
+                # 转换时间格式
+                try:
+                    news.append((datetime.fromtimestamp(created_at / 1000).strftime('%Y-%m-%d %H:%M'), title))
+                except (TypeError, ValueError, OSError):
+                    news.append((str(created_at), title))
+        return news
+
+
+@register_news_source
+class ThsNews(NewsSource):
+    name = 'ths'
+    label = '同花顺'
+
+    def fetch(self, symbol, max_pages=3, seen=None):
+        resp = http_client.get(f"http://news.10jqka.com.cn/tapp/news/push/stock/{symbol}/")
+        return _parse_news_list(resp.text) if resp.status_code == 200 else []
+
+
+@register_news_source
+class JrjNews(NewsSource):
+    name = 'jrj'
+    label = '金融界'
+
+    def fetch(self, symbol, max_pages=3, seen=None):
+        resp = http_client.get(f"http://stock.jrj.com.cn/report/{symbol}/")
+        return _parse_news_list(resp.text) if resp.status_code == 200 else []
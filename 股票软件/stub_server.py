@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地行情/新闻模拟服务器（用于压测，避免反复请求真实网站）
+按真实接口的路径与格式返回模拟数据，覆盖 fetch_stock_data / fetch_news 解析的几种格式：
+- 新浪 getKLineData：JSON 数组 [{day, open, high, low, close, volume}, ...]
+- 东方财富 kline/get：{"data": {"klines": ["日期,开,收,高,低,量,额,振幅,涨跌幅,涨跌额,换手率", ...]}}
+- 腾讯 qt.gtimg.cn/q=代码：v_代码="1~名称~代码~现价~...";（~分隔，GBK编码）
+- 新浪个股新闻 vCB_AllNewsStock.php：含 <div class="datelist"> 的 GBK 网页，按 Page 分页
+- 东方财富 clist/get：{"data": {"total": N, "diff": [{"f12": 代码, "f13": 市场, "f14": 名称}, ...]}}，按 pn/pz 分页
+同一股票代码每次返回相同的数据；可配置响应延迟、出错率（返回503）与数据量。
+
+用法：python stub_server.py [--port 8765] [--latency 0.05] [--error-rate 0.05] [--bars 250] [--news 60] [--symbols 5000]
+然后在 wuxi_analysis.py 中设置 STUB_SERVER = "http://127.0.0.1:8765"（或设置环境变量 STOCK_STUB_SERVER），
+所有请求都会改发到模拟服务器。
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PORT = 8765
+DEFAULT_LATENCY = 0.05    # 平均响应延迟（秒），实际延迟在 0.5~1.5 倍之间随机
+DEFAULT_ERROR_RATE = 0.0  # 返回 503 的比例
+DEFAULT_BARS = 250        # 每只股票的日K线数
+DEFAULT_NEWS = 60         # 每只股票的新闻条数
+DEFAULT_SYMBOLS = 5000    # 股票列表中的股票数
+NEWS_PER_PAGE = 20
+
+NEWS_TEMPLATES = [
+    "{name}发布年度业绩预告，净利润同比增长", "{name}获多家机构调研，看好长期发展",
+    "{name}股东减持计划实施完毕", "{name}收到监管问询函", "{name}签订重大合同",
+    "{name}回购股份进展公告", "{name}股价异常波动公告", "{name}新产品获批上市",
+]
+
+
+def _seed(code):
+    return zlib.crc32(code.encode('utf-8'))
+
+
+def make_bars(code, days=DEFAULT_BARS):
+    """按股票代码生成固定的模拟日K线（截至今天的最近 days 个交易日）"""
+    rng = np.random.default_rng(_seed(code))
+    close = np.round(20.0 * np.cumprod(1 + rng.normal(0, 0.02, days)), 2)
+    prev = np.concatenate([[close[0]], close[:-1]])
+    open_ = np.round(prev * (1 + rng.normal(0, 0.005, days)), 2)
+    high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, days))), 2)
+    low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, days))), 2)
+    return pd.DataFrame({
+        'Date': pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days),
+        'Open': open_, 'High': high, 'Low': low, 'Close': close,
+        'Volume': rng.integers(10_000, 500_000, days) * 100,  # 股，整手
+        'PctChange': np.round((close / prev - 1) * 100, 2),
+    })
+
+
+def make_news(code, count=DEFAULT_NEWS):
+    """按股票代码生成固定的模拟新闻 [(日期时间, 标题), ...]，按时间倒序"""
+    rng = random.Random(_seed(code))
+    now = pd.Timestamp.today().normalize() + pd.Timedelta(hours=15)
+    news = []
+    for j in range(count):
+        when = now - pd.Timedelta(minutes=j * 173 + rng.randint(0, 120))
+        title = rng.choice(NEWS_TEMPLATES).format(name=f"模拟{code[-6:]}") + f"（{j + 1}）"
+        news.append((when.strftime('%Y-%m-%d %H:%M'), title))
+    return news
+
+
+def make_symbols(count=DEFAULT_SYMBOLS):
+    """模拟的沪深A股列表 [(股票代码, 名称), ...]：一半沪市 600xxx，一半深市 000xxx"""
+    half = count // 2
+    codes = [f"sh{600000 + i}" for i in range(count - half)] + [f"sz{i + 1:06d}" for i in range(half)]
+    return [(code, f"模拟{code[-6:]}") for code in codes]
+
+
+def _secid_to_code(secid):
+    # 东方财富 secid 形如 1.603259（1=沪市，0=深市）；fetch_stock_data 直接传入 sh603259 时原样使用
+    if '.' in secid:
+        market, num = secid.split('.', 1)
+        return ('sh' if market == '1' else 'sz') + num
+    return secid
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 由 make_server 设置：{'latency', 'error_rate', 'bars', 'news', 'symbols'}
+    config = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        latency = self.config['latency']
+        if latency > 0:
+            time.sleep(latency * random.uniform(0.5, 1.5))
+        if random.random() < self.config['error_rate']:
+            self._send(503, b'Service Unavailable', 'text/plain')
+            return
+
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        path = unquote(parts.path)
+        if path.endswith('CN_MarketData.getKLineData'):
+            self._sina_kline(query)
+        elif path == '/api/qt/stock/kline/get':
+            self._eastmoney_kline(query)
+        elif path.startswith('/q='):
+            self._tencent_quote(path[len('/q='):])
+        elif path == '/corp/view/vCB_AllNewsStock.php':
+            self._sina_news(query)
+        elif path == '/api/qt/clist/get':
+            self._eastmoney_clist(query)
+        else:
+            self._send(404, b'Not Found', 'text/plain')
+
+    def _sina_kline(self, query):
+        code = query.get('symbol', '')
+        bars = make_bars(code, self.config['bars']).tail(int(query.get('datalen', self.config['bars'])))
+        data = [{'day': d.strftime('%Y-%m-%d'), 'open': f"{o:.3f}", 'high': f"{h:.3f}", 'low': f"{l:.3f}",
+                 'close': f"{c:.3f}", 'volume': str(v)}
+                for d, o, h, l, c, v in zip(bars['Date'], bars['Open'], bars['High'], bars['Low'],
+                                            bars['Close'], bars['Volume'])]
+        self._send(200, json.dumps(data).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def _eastmoney_kline(self, query):
+        code = _secid_to_code(query.get('secid', ''))
+        bars = make_bars(code, self.config['bars'])
+        if query.get('beg'):
+            bars = bars[bars['Date'] >= pd.Timestamp(query['beg'])]
+        prev = bars['Close'] - bars['Close'] * bars['PctChange'] / (100 + bars['PctChange'])
+        # 与真实接口一致，成交量以手为单位
+        klines = [f"{d:%Y-%m-%d},{o:.2f},{c:.2f},{h:.2f},{l:.2f},{v // 100},{c * v:.2f},"
+                  f"{(h - l) / p * 100:.2f},{pct:.2f},{c - p:.2f},{v / 1e7:.2f}"
+                  for d, o, c, h, l, v, pct, p in zip(bars['Date'], bars['Open'], bars['Close'], bars['High'],
+                                                     bars['Low'], bars['Volume'], bars['PctChange'], prev)]
+        body = {'rc': 0, 'data': {'code': code[2:], 'name': f"模拟{code[-6:]}", 'klines': klines}}
+        self._send(200, json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def _tencent_quote(self, codes):
+        lines = []
+        for code in codes.split(','):
+            last = make_bars(code, self.config['bars']).iloc[-1]
+            fields = ['0'] * 50
+            change = last['Close'] * last['PctChange'] / (100 + last['PctChange'])
+            fields[0], fields[1], fields[2] = '1', f"模拟{code[-6:]}", code[2:]
+            fields[3], fields[4], fields[5] = f"{last['Close']:.2f}", f"{last['Close'] - change:.2f}", f"{last['Open']:.2f}"
+            fields[6] = str(int(last['Volume'] // 100))
+            fields[30] = pd.Timestamp.now().strftime('%Y%m%d%H%M%S')
+            fields[31], fields[32] = f"{change:.2f}", f"{last['PctChange']:.2f}"
+            fields[33], fields[34] = f"{last['High']:.2f}", f"{last['Low']:.2f}"
+            fields[36] = str(int(last['Volume'] // 100))
+            lines.append(f'v_{code}="{"~".join(fields)}";')
+        self._send(200, "\n".join(lines).encode('gbk'), 'text/html; charset=GBK')
+
+    def _sina_news(self, query):
+        code = query.get('symbol', '')
+        page = int(query.get('Page', 1))
+        news = make_news(code, self.config['news'])[(page - 1) * NEWS_PER_PAGE:page * NEWS_PER_PAGE]
+        items = "".join(f"{when.replace(' ', '&nbsp;')}&nbsp;&nbsp;"
+                        f"<a target='_blank' href='http://finance.sina.com.cn/stock/{j}.shtml'>{title}</a><br>\n"
+                        for j, (when, title) in enumerate(news))
+        html = (f"<html><head><meta charset='gb2312'></head><body>"
+                f"<div class='datelist'><ul>\n{items}</ul></div></body></html>")
+        self._send(200, html.encode('gbk'), 'text/html; charset=gb2312')
+
+
+    def _eastmoney_clist(self, query):
+        symbols = make_symbols(self.config['symbols'])
+        size = int(query.get('pz', 20))
+        page = int(query.get('pn', 1))
+        diff = [{'f12': code[2:], 'f13': 1 if code.startswith('sh') else 0, 'f14': name}
+                for code, name in symbols[(page - 1) * size:page * size]]
+        body = {'rc': 0, 'data': {'total': len(symbols), 'diff': diff}}
+        self._send(200, json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+
+def make_server(port=DEFAULT_PORT, latency=DEFAULT_LATENCY, error_rate=DEFAULT_ERROR_RATE,
+                bars=DEFAULT_BARS, news=DEFAULT_NEWS, symbols=DEFAULT_SYMBOLS, host='127.0.0.1'):
+    """创建模拟服务器（port=0 时自动选择空闲端口），返回 (server, base_url)"""
+    config = {'latency': latency, 'error_rate': error_rate, 'bars': bars, 'news': news, 'symbols': symbols}
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, f"http://{host}:{server.server_port}"
+
+
+def start_in_background(**kwargs):
+    """在后台线程中启动模拟服务器，返回 (server, base_url)；用完后调用 server.shutdown()"""
+    server, base_url = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地行情/新闻模拟服务器')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY, help='平均响应延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=DEFAULT_ERROR_RATE, help='返回503的比例（0~1）')
+    parser.add_argument('--bars', type=int, default=DEFAULT_BARS, help='每只股票的日K线数')
+    parser.add_argument('--news', type=int, default=DEFAULT_NEWS, help='每只股票的新闻条数')
+    parser.add_argument('--symbols', type=int, default=DEFAULT_SYMBOLS, help='股票列表中的股票数')
+    args = parser.parse_args()
+    server, base_url = make_server(args.port, args.latency, args.error_rate, args.bars, args.news, args.symbols)
+    print(f"🧪 模拟服务器已启动：{base_url}（延迟 {args.latency}s，出错率 {args.error_rate:.0%}，"
+          f"K线 {args.bars} 根，新闻 {args.news} 条）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
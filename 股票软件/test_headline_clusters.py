@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""近似重复标题归并：措辞略有不同的同一事件归为一簇，不同事件不合并"""
+
+from headline_clusters import cluster_titles, representatives, shingles
+
+NEAR_DUPLICATES = [
+    '药明康德：2024年上半年营业收入172.41亿元，同比下降8.64%',
+    '药明康德2024年上半年营业收入172.41亿元 同比下降8.64%',
+    '【药明康德】2024年上半年营业收入172.41亿元，同比下降8.64%！',
+]
+DISTINCT = [
+    '药明康德拟回购不超过10亿元A股股份用于注销',
+    '恒瑞医药创新药获批上市，首年销售预期乐观',
+    '医药板块午后拉升，CXO概念股集体走强',
+]
+
+
+def test_shingles_ignore_punctuation():
+    assert shingles('药明，康德！') == shingles('药明 康德') == {'药明', '明康', '康德'}
+    assert shingles('A') == {'a'}
+    assert shingles('，。') == set()
+
+
+def test_near_duplicates_merged():
+    titles = [DISTINCT[0], NEAR_DUPLICATES[0], DISTINCT[1], NEAR_DUPLICATES[1], DISTINCT[2], NEAR_DUPLICATES[2]]
+
+    assert cluster_titles(titles) == [[0], [1, 3, 5], [2], [4]]
+
+
+def test_distinct_titles_not_merged():
+    # 共用“药明康德”“2024年上半年”等词，但整体不相似
+    titles = DISTINCT + ['药明康德2024年上半年净利润同比下降20.2%', NEAR_DUPLICATES[0]]
+
+    assert cluster_titles(titles) == [[i] for i in range(len(titles))]
+
+
+def test_representatives_keep_first_with_weight():
+    news = [('2024-07-29 18:00', NEAR_DUPLICATES[0]), ('2024-07-29 17:30', DISTINCT[0]),
+            ('2024-07-29 17:00', NEAR_DUPLICATES[1])]
+
+    assert representatives(news) == [('2024-07-29 18:00', NEAR_DUPLICATES[0], 2),
+                                      ('2024-07-29 17:30', DISTINCT[0], 1)]
+
+
+def test_empty():
+    assert cluster_titles([]) == []
+    assert cluster_titles(['，', '。']) == [[0], [1]]   # 没有有效字符的标题不与任何标题合并
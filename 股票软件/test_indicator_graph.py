@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""指标依赖图：只计算所请求的指标及其依赖，共用的中间结果与已有的列不重算，回看K线数沿依赖链累加"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from indicators import TECH_INDICATORS, add_kdj, compute_indicators, lookback, register_indicator
+
+BAR_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _bars(days=60):
+    rng = np.random.default_rng(7)
+    close = 20 + np.cumsum(rng.normal(0, 0.3, days))
+    return pd.DataFrame({'Date': pd.bdate_range('2024-01-02', periods=days), 'Open': close,
+                         'High': close + 0.3, 'Low': close - 0.3, 'Close': close,
+                         'Volume': rng.uniform(1e6, 2e6, days)})
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """在注册表的副本上注册测试用指标，不影响内置指标"""
+    monkeypatch.setattr(indicators, 'INDICATORS', dict(indicators.INDICATORS))
+    return indicators.INDICATORS
+
+
+def _outputs(plan):
+    return ['/'.join(node.outputs) for node in plan]
+
+
+def test_plan_orders_dependencies_once():
+    plan = indicators._plan(['MACD_hist', 'DEA', 'J', 'K'], BAR_COLUMNS)
+
+    assert _outputs(plan) == ['EMA12', 'EMA26', 'Diff', 'DEA', 'MACD_hist', 'RSV', 'K/D/J']
+
+
+def test_plan_skips_available_columns():
+    assert _outputs(indicators._plan(['BOLL_UP'], BAR_COLUMNS)) == ['MA20', 'BOLL_STD', 'BOLL_MID/BOLL_UP/BOLL_LOW']
+    assert _outputs(indicators._plan(['BOLL_UP'], BAR_COLUMNS + ['MA20'])) == ['BOLL_STD', 'BOLL_MID/BOLL_UP/BOLL_LOW']
+    assert indicators._plan(['Close', 'MA5'], BAR_COLUMNS + ['MA5']) == []
+
+
+def test_plan_rejects_unknown_and_cycles(registry):
+    with pytest.raises(KeyError):
+        indicators._plan(['NOT_AN_INDICATOR'], BAR_COLUMNS)
+
+    register_indicator('LOOP_A', ['LOOP_B'])(lambda b: b)
+    register_indicator('LOOP_B', ['LOOP_A'])(lambda a: a)
+    with pytest.raises(ValueError):
+        indicators._plan(['LOOP_A'], BAR_COLUMNS)
+
+
+@pytest.mark.parametrize('outputs, bars', [
+    (['Close'], 1),
+    (['MA5'], 5),
+    (['MA20', 'MA5'], 20),
+    (['K'], 9),
+    (['BOLL_UP'], 20),
+    (['ATR14'], 15),          # TR 回看 2 根，ATR14 在其上再回看 13 根
+    ([], 0),
+])
+def test_lookback(outputs, bars):
+    assert lookback(outputs) == bars
+
+
+def test_compute_matches_direct_calculation():
+    df = compute_indicators(_bars(), TECH_INDICATORS)
+    expected = add_kdj(_bars())
+    ema12 = expected['Close'].ewm(span=12, adjust=False).mean()
+    ema26 = expected['Close'].ewm(span=26, adjust=False).mean()
+    dea = (ema12 - ema26).ewm(span=9, adjust=False).mean()
+
+    for col in ['EMA12', 'EMA26', 'RSV'] + TECH_INDICATORS:
+        assert col in df.columns                  # 依赖的中间指标一并添加
+    pd.testing.assert_series_equal(df['MA20'], expected['Close'].rolling(20).mean(), check_names=False)
+    pd.testing.assert_series_equal(df['DEA'], dea, check_names=False)
+    for col in ['K', 'D', 'J']:
+        np.testing.assert_array_equal(df[col].to_numpy(), expected[col].to_numpy())
+    assert 'RSI14' not in df.columns and 'OBV' not in df.columns   # 未请求的指标不计算
+
+
+def test_shared_and_existing_columns_not_recomputed(registry):
+    calls = []
+
+    @register_indicator('SPREAD', ['High', 'Low'])
+    def spread(high, low):
+        calls.append('SPREAD')
+        return high - low
+
+    @register_indicator('SPREAD_MA', ['SPREAD'], window=3)
+    def spread_ma(values):
+        calls.append('SPREAD_MA')
+        return values.rolling(3).mean()
+
+    @register_indicator('SPREAD_PCT', ['SPREAD', 'Close'])
+    def spread_pct(values, close):
+        calls.append('SPREAD_PCT')
+        return values / close * 100
+
+    df = compute_indicators(_bars(), ['SPREAD_MA', 'SPREAD_PCT'])
+    assert calls == ['SPREAD', 'SPREAD_MA', 'SPREAD_PCT']
+    assert lookback(['SPREAD_MA']) == 3
+
+    calls.clear()
+    df['SPREAD'] = 1.0                              # 已有的列视为已算好
+    out = compute_indicators(df.drop(columns=['SPREAD_MA', 'SPREAD_PCT']), ['SPREAD_MA', 'SPREAD_PCT'])
+    assert calls == ['SPREAD_MA', 'SPREAD_PCT']
+    pd.testing.assert_series_equal(out['SPREAD_PCT'], 1.0 / out['Close'] * 100, check_names=False)
+
+
+def test_register_rejects_duplicate_output(registry):
+    with pytest.raises(ValueError):
+        register_indicator(['MA5', 'MA_NEW'], ['Close'])(lambda close: (close, close))
+
+
+def test_tech_indicators_registered():
+    assert all(name in indicators.INDICATORS for name in TECH_INDICATORS)
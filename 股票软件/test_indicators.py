@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""KDJ：分块 IIR 滤波与逐根递推的结果在 KD_TOLERANCE 以内"""
+
+import numpy as np
+import pytest
+
+from indicators import KD_TOLERANCE, kdj
+
+
+def _loop_kd(rsv):
+    K_values, D_values = [], []
+    for i, value in enumerate(rsv):
+        if i == 0 or np.isnan(value):
+            K = D = 50.0
+        else:
+            K = K_values[-1] * 2 / 3 + value * 1 / 3
+            D = D_values[-1] * 2 / 3 + K * 1 / 3
+        K_values.append(K)
+        D_values.append(D)
+    return np.array(K_values), np.array(D_values)
+
+
+@pytest.mark.parametrize('length', [1, 2, 9, 511, 512, 513, 3000])
+def test_kdj_matches_loop(length):
+    rsv = np.random.default_rng(length).uniform(0, 100, length)
+    rsv[:min(8, length - 1)] = np.nan           # 前 n-1 根没有 RSV
+    rsv[length // 2:length // 2 + 2] = np.nan   # 中途停牌或一字板
+
+    K, D, J = kdj(rsv)
+    K_loop, D_loop = _loop_kd(rsv)
+
+    assert np.max(np.abs(K - K_loop)) <= KD_TOLERANCE
+    assert np.max(np.abs(D - D_loop)) <= KD_TOLERANCE
+    np.testing.assert_array_equal(J, 3 * K - 2 * D)
+
+
+def test_kdj_resets_to_50():
+    rsv = np.array([80.0, 80.0, np.nan, 20.0])
+    K, D, _ = kdj(rsv)
+    assert K[0] == D[0] == 50.0
+    assert K[2] == D[2] == 50.0
+    assert K[1] == pytest.approx(50 * 2 / 3 + 80 / 3)
+    assert K[3] == pytest.approx(50 * 2 / 3 + 20 / 3)
+
+
+def test_kdj_empty():
+    K, D, J = kdj([])
+    assert len(K) == len(D) == len(J) == 0
+
+
+@pytest.mark.parametrize('bad', [np.inf, -np.inf])
+def test_kdj_non_finite_rsv_resets_like_nan(bad):
+    rsv = np.random.default_rng(0).uniform(0, 100, 1200)
+    rsv[100] = bad                              # 最高价等于最低价时除零得到的 inf
+    rsv[600] = bad                              # 与下一块的边界不对齐
+
+    K, D, J = kdj(rsv)
+    K_nan, D_nan, _ = kdj(np.where(np.isfinite(rsv), rsv, np.nan))
+
+    assert np.isfinite(K).all() and np.isfinite(D).all() and np.isfinite(J).all()
+    assert K[100] == D[100] == 50.0
+    np.testing.assert_array_equal(K, K_nan)
+    np.testing.assert_array_equal(D, D_nan)
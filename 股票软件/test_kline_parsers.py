@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""K线响应解析：新浪、东方财富的固定响应样例（含格式不规整时的退路）"""
+
+import numpy as np
+import pandas as pd
+
+from kline_parsers import EASTMONEY_VOLUME_UNIT, parse_eastmoney_klines, parse_sina_klines
+
+COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'PctChange']
+
+SINA_TEXT = ('[{"day":"2024-06-27","open":"45.100","high":"46.200","low":"44.800","close":"45.900",'
+             '"volume":"12345600","ma_price5":45.3,"ma_volume5":11000000},'
+             '{"day":"2024-06-28","open":"45.900","high":"47.000","low":"45.500","close":"46.500",'
+             '"volume":"9876500","ma_price5":45.8,"ma_volume5":10500000}]')
+
+# 字段顺序不同、带涨跌幅：走 JSON 解析
+SINA_TEXT_PCT = ('[{"day":"2024-06-27","close":"45.900","open":"45.100","high":"46.200","low":"44.800",'
+                 '"volume":"12345600","pct_chg":"1.55"},'
+                 '{"day":"2024-06-28","close":"46.500","open":"45.900","high":"47.000","low":"45.500",'
+                 '"volume":"9876500","pct_chg":null}]')
+
+# 日期,开盘,收盘,最高,最低,成交量(手),成交额,振幅,涨跌幅,涨跌额,换手率
+EASTMONEY_KLINES = [
+    "2024-06-27,45.10,45.90,46.20,44.80,123456,566000000.00,3.10,1.55,0.70,0.42",
+    "2024-06-28,45.90,46.50,47.00,45.50,98765,459000000.00,3.27,1.31,0.60,0.34",
+]
+
+
+def _check(df, expected):
+    assert set(df.columns) == set(COLUMNS)
+    for col, values in expected.items():
+        assert df[col].tolist() == values, col
+
+
+def test_sina_compact():
+    df = parse_sina_klines(SINA_TEXT)
+    _check(df, {'Date': ['2024-06-27', '2024-06-28'], 'Open': [45.1, 45.9], 'High': [46.2, 47.0],
+                'Low': [44.8, 45.5], 'Close': [45.9, 46.5], 'Volume': [12345600, 9876500],
+                'PctChange': [0.0, 0.0]})
+    assert df['Volume'].dtype == np.int64
+
+
+def test_sina_json_fallback_with_pct_change():
+    df = parse_sina_klines(SINA_TEXT_PCT)
+    _check(df, {'Close': [45.9, 46.5], 'Open': [45.1, 45.9], 'Volume': [12345600, 9876500],
+                'PctChange': [1.55, 0.0]})
+
+
+def test_sina_empty():
+    assert parse_sina_klines('[]') is None
+    assert parse_sina_klines('null') is None
+
+
+def test_eastmoney_volume_in_shares():
+    df = parse_eastmoney_klines(EASTMONEY_KLINES)
+    _check(df, {'Date': ['2024-06-27', '2024-06-28'], 'Open': [45.1, 45.9], 'Close': [45.9, 46.5],
+                'High': [46.2, 47.0], 'Low': [44.8, 45.5], 'PctChange': [1.55, 1.31],
+                'Volume': [123456 * EASTMONEY_VOLUME_UNIT, 98765 * EASTMONEY_VOLUME_UNIT]})
+
+
+def test_eastmoney_ragged_rows_fall_back_to_read_csv():
+    klines = EASTMONEY_KLINES + ["2024-07-01,46.50,46.80"]   # 缺字段的行被丢弃
+    df = parse_eastmoney_klines(klines)
+    assert len(df) == 2
+    pd.testing.assert_frame_equal(df, parse_eastmoney_klines(EASTMONEY_KLINES), check_dtype=False)
+
+
+def test_eastmoney_empty():
+    assert parse_eastmoney_klines([]) is None
+    assert parse_eastmoney_klines(None) is None
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""新闻索引：日期统一为 'YYYY-MM-DD HH:MM'，按日期倒序取最近的新闻"""
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from news_index import NewsIndex, normalize_date
+
+NOW = datetime(2026, 1, 3, 12, 0)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2025-12-31 15:30:00', '2025-12-31 15:30'),
+    ('2025-12-31 15:30', '2025-12-31 15:30'),
+    ('2025-12-31', '2025-12-31 00:00'),
+    ('2025/6/5 9:30', '2025-06-05 09:30'),
+    ('2025年12月1日', '2025-12-01 00:00'),
+    ('12-31 09:05', '2025-12-31 09:05'),   # 只有月日：不会落到未来
+    ('01-03', '2026-01-03 00:00'),
+    ('02-30', '2026-01-03 12:00'),         # 无效日期取当前时间
+    ('', '2026-01-03 12:00'),
+])
+def test_normalize_date(text, expected):
+    assert normalize_date(text, NOW) == expected
+
+
+def test_recent_orders_mixed_formats():
+    index = NewsIndex(path=None)
+    index.add('sh600000', [('12-31', '甲'), ('2025-12-31 15:30:00', '乙'), ('2025-12-30', '丙')])
+    index.add('sh600000', [('2025-12-29 09:00', '丁')])
+
+    titles = [title for _, title in index.recent('sh600000', 10)]
+
+    assert titles[-2:] == ['丙', '丁']
+    assert set(titles[:2]) == {'甲', '乙'}
+    assert index.recent('sh600000', 10)[0][0] > '2025-12-31 00:00'
+
+
+def test_legacy_dates_are_normalized(tmp_path):
+    path = str(tmp_path / 'news.db')
+    NewsIndex(path=path)._conn.close()
+    first_seen = NOW.timestamp()
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO news VALUES ('sh600000', ?, ?, ?, ?, ?)",
+                         [('k1', '12-31', '甲', first_seen, first_seen),
+                          ('k2', '2025-12-31 15:30:00', '乙', first_seen, first_seen)])
+
+    index = NewsIndex(path=path, retention_days=36500)
+
+    assert dict((title, date) for date, title in index.recent('sh600000', 10)) == {
+        '甲': '2025-12-31 00:00', '乙': '2025-12-31 15:30'}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""K线缓存：增量合并时的重叠校验、修正与复权/单位变化检测，以及数据源记录"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ohlcv_cache
+
+
+def _bars(start='2024-01-01', days=20, close=10.0, volume=1_000_000):
+    dates = pd.bdate_range(start=start, periods=days)
+    closes = close + np.arange(days) * 0.1
+    return pd.DataFrame({'Date': dates, 'Open': closes, 'High': closes + 0.2, 'Low': closes - 0.2,
+                         'Close': closes, 'Volume': float(volume), 'PctChange': 1.0})
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path)
+
+
+def test_merge_without_cache_returns_fresh():
+    fresh = _bars(days=10)
+    merged, report = ohlcv_cache.merge(None, fresh)
+    assert len(merged) == 10
+    assert report == {'new': 10, 'revised': 0, 'overlap': 0, 'needs_full': False}
+
+
+def test_merge_appends_after_identical_overlap():
+    full = _bars(days=25)
+    cached = ohlcv_cache.normalize(full.iloc[:20])
+    fresh = full.iloc[15:]   # 5 根重叠 + 5 根新K线
+
+    merged, report = ohlcv_cache.merge(cached, fresh)
+
+    assert report == {'new': 5, 'revised': 0, 'overlap': 5, 'needs_full': False}
+    assert len(merged) == 25
+    assert merged['Date'].is_monotonic_increasing
+    np.testing.assert_array_equal(merged['Close'].to_numpy(), full['Close'].to_numpy())
+
+
+def test_merge_prefers_revised_bar():
+    full = _bars(days=22)
+    cached = ohlcv_cache.normalize(full.iloc[:20])
+    fresh = full.iloc[15:].copy()
+    fresh.loc[19, 'Close'] += 0.5   # 缓存的最后一根是盘中数据，收盘后被修正
+
+    merged, report = ohlcv_cache.merge(cached, fresh)
+
+    assert report['revised'] == 1
+    assert not report['needs_full']
+    assert merged.loc[merged['Date'] == full['Date'].iloc[19], 'Close'].item() == fresh.loc[19, 'Close']
+
+
+def test_merge_detects_price_adjustment():
+    full = _bars(days=25)
+    cached = ohlcv_cache.normalize(full.iloc[:20])
+    fresh = full.iloc[15:].copy()
+    fresh[ohlcv_cache.PRICE_COLUMNS] *= 0.9   # 除权后前复权价格整体下移
+
+    _, report = ohlcv_cache.merge(cached, fresh)
+
+    assert report['revised'] == 5
+    assert report['needs_full']
+
+
+def test_merge_detects_volume_unit_change():
+    full = _bars(days=25)
+    cached = ohlcv_cache.normalize(full.iloc[:20])
+    fresh = full.iloc[15:].copy()
+    fresh['Volume'] /= 100   # 以手为单位的成交量
+
+    _, report = ohlcv_cache.merge(cached, fresh)
+
+    assert report['revised'] == 5
+    assert report['needs_full']
+
+
+def test_merge_without_overlap_needs_full():
+    cached = ohlcv_cache.normalize(_bars(start='2024-01-01', days=10))
+    fresh = _bars(start='2024-03-01', days=5)
+
+    _, report = ohlcv_cache.merge(cached, fresh)
+
+    assert report['overlap'] == 0
+    assert report['needs_full']
+
+
+def test_save_records_source_and_units(cache_dir):
+    ohlcv_cache.save('sh600000', _bars(), cache_dir, source='东方财富', adjust='qfq')
+    cached = ohlcv_cache.load('sh600000', cache_dir)
+
+    assert cached.attrs == {'source': '东方财富', 'adjust': 'qfq', 'volume_unit': ohlcv_cache.VOLUME_UNIT}
+    assert ohlcv_cache.compatible(cached, 'qfq')
+    assert not ohlcv_cache.compatible(cached, 'none')
+    assert not ohlcv_cache.compatible(cached, None)
+
+
+def test_cache_without_meta_is_not_trusted(cache_dir):
+    df = ohlcv_cache.normalize(_bars())
+    arrays = {'Date': df['Date'].values.astype('datetime64[ns]')}
+    arrays.update({col: df[col].to_numpy(dtype='float64') for col in ohlcv_cache.COLUMNS})
+    np.savez_compressed(ohlcv_cache._path('sh600000', cache_dir), **arrays)
+
+    cached = ohlcv_cache.load('sh600000', cache_dir)
+
+    assert len(cached) == len(df)
+    assert not ohlcv_cache.known_units(cached)
+    assert not ohlcv_cache.compatible(cached, 'qfq')
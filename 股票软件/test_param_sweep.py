@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""评分参数调参：买卖信号相同的组合合并为一行，排名相同时离当前参数近的在前"""
+
+import numpy as np
+import pytest
+
+import param_sweep
+import scoring
+
+CURRENT = (30, 45, 65, 80)
+
+# 一只股票六个交易日：技术面评分与之后的收益（%），最后一天评分缺失
+TECH = np.array([[10.0, 35.0, 50.0, 70.0, 90.0, np.nan]])
+RETURNS = np.array([[-1.0, 0.5, 1.0, 2.0, 3.0, 4.0]])
+
+
+@pytest.fixture(autouse=True)
+def current_params(monkeypatch):
+    monkeypatch.setattr(scoring, 'SENTIMENT_WEIGHT', 0.4)
+    monkeypatch.setattr(scoring, 'SIGNAL_THRESHOLDS', CURRENT)
+    monkeypatch.setattr(param_sweep, 'MIN_SIGNALS', 1)
+
+
+def test_evaluate_counts_buy_and_sell():
+    result = param_sweep.evaluate(TECH, None, RETURNS, 0.4, CURRENT)
+
+    assert result['buy_count'] == 2 and result['buy_return'] == pytest.approx(2.5)
+    assert result['sell_count'] == 1 and result['sell_return'] == pytest.approx(-1.0)
+    assert result['buy_hit'] == 1.0
+
+
+def test_same_signals_merge_to_closest_combo():
+    # 没有新闻时权重不起作用；(25, 45, 65, 85) 只移动了没有评分落入的边界
+    combos = [(0.0, CURRENT), (0.6, CURRENT), (0.4, (25, 45, 65, 85)), (0.4, CURRENT), (0.0, (30, 45, 75, 80))]
+
+    table = param_sweep.sweep(TECH, None, RETURNS, combos, workers=1)
+
+    assert len(table) == 2
+    # (30, 45, 75, 80) 只在 90 分买入，平均收益更高排在前面
+    assert table.loc[0, 'thresholds'] == (30, 45, 75, 80) and table.loc[0, 'equivalent'] == 1
+    assert (table.loc[1, 'weight'], table.loc[1, 'thresholds']) == (0.4, CURRENT)
+    assert table.loc[1, 'equivalent'] == 4
+
+
+def test_ties_ordered_by_distance_not_grid_order():
+    combos = [(0.0, CURRENT), (0.6, CURRENT), (0.4, CURRENT)]
+
+    for order in (combos, combos[::-1]):
+        table = param_sweep.sweep(TECH, None, RETURNS, order, workers=1, merge=False)
+        assert table['weight'].tolist() == [0.4, 0.6, 0.0]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""行情数据源竞速：真实历史K线优先，由报价推算K线的数据源只作最后备选"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ohlcv_cache
+import source_health
+import sources
+import wuxi_analysis
+
+
+def _bars(close=10.0, days=30):
+    return pd.DataFrame({
+        'Date': pd.bdate_range(end='2024-06-28', periods=days),
+        'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1000.0,
+    })
+
+
+class FakeSource:
+    def __init__(self, name, delay=0.0, df=None, synthetic=False):
+        self.name = name
+        self.delay = delay
+        self.df = df
+        self.synthetic = synthetic
+        self.calls = 0
+
+    def fetch(self, stock_code, start_date, end_date, count):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.df is None:
+            raise ConnectionError(f"{self.name} 不可用")
+        return self.df
+
+
+@pytest.fixture(autouse=True)
+def isolated_health(monkeypatch):
+    monkeypatch.setattr(source_health, '_scoreboard', source_health.SourceHealth(path=None))
+    monkeypatch.setattr(wuxi_analysis, '_yfinance_bars', lambda stock_code: None)
+
+
+def _schedule(monkeypatch, *candidates):
+    monkeypatch.setattr(sources, 'schedule_price_sources', lambda stock_code, batch=False: list(candidates))
+
+
+@pytest.mark.parametrize('race_mode', [True, False])
+def test_real_source_beats_faster_synthetic(monkeypatch, race_mode):
+    monkeypatch.setattr(wuxi_analysis, 'RACE_MODE', race_mode)
+    quote = FakeSource('报价', delay=0.0, df=_bars(99.0), synthetic=True)
+    dead = FakeSource('失效源', delay=0.0)
+    slow = FakeSource('慢源', delay=0.2, df=_bars(10.0))
+    _schedule(monkeypatch, dead, quote, slow)
+
+    df, source_name, _ = wuxi_analysis._download_bars('sh600000')
+
+    assert source_name == '慢源'
+    assert df['Close'].iloc[-1] == 10.0
+    assert quote.calls == 0
+
+
+def test_synthetic_source_is_last_fallback(monkeypatch):
+    monkeypatch.setattr(wuxi_analysis, 'RACE_MODE', True)
+    quote = FakeSource('报价', df=_bars(99.0), synthetic=True)
+    _schedule(monkeypatch, FakeSource('失效源1'), quote, FakeSource('失效源2'))
+
+    df, source_name, _ = wuxi_analysis._download_bars('sh600000')
+
+    assert source_name == '报价'
+    assert quote.calls == 1
+
+
+def test_yfinance_is_tried_before_synthetic(monkeypatch):
+    monkeypatch.setattr(wuxi_analysis, '_yfinance_bars', lambda stock_code: _bars(20.0))
+    quote = FakeSource('报价', df=_bars(99.0), synthetic=True)
+    _schedule(monkeypatch, FakeSource('失效源'), quote)
+
+    df, source_name, _ = wuxi_analysis._download_bars('sh600000')
+
+    assert source_name == 'yfinance'
+    assert quote.calls == 0
+
+
+def test_race_takes_first_valid_result():
+    fast_empty = FakeSource('空结果', df=pd.DataFrame())
+    valid = FakeSource('有效源', delay=0.05, df=_bars(10.0))
+    slower = FakeSource('更慢源', delay=0.5, df=_bars(11.0))
+
+    df, winner, _ = wuxi_analysis._race_sources([fast_empty, valid, slower], ('sh600000', '', '', 30),
+                                                top_n=3, time_limit=5)
+
+    assert winner is valid
+    assert df['Close'].iloc[-1] == 10.0
+
+
+def test_all_sources_failing_returns_none(monkeypatch):
+    _schedule(monkeypatch, FakeSource('失效源1'), FakeSource('失效源2'))
+    assert wuxi_analysis._download_bars('sh600000') == (None, None, None)
+
+
+def test_screen_mode_skips_race_and_fallbacks(monkeypatch):
+    monkeypatch.setattr(wuxi_analysis, 'RACE_MODE', True)
+    monkeypatch.setattr(wuxi_analysis, '_yfinance_bars', lambda stock_code: _bars(20.0))
+    quote = FakeSource('报价', df=_bars(99.0), synthetic=True)
+    _schedule(monkeypatch, FakeSource('失效源'), quote)
+
+    assert wuxi_analysis._download_bars('sh600000', race=False, fallback=False) == (None, None, None)
+    assert quote.calls == 0
+
+
+def test_rotate_spreads_first_choice(monkeypatch):
+    first = FakeSource('源1', df=_bars(10.0))
+    second = FakeSource('源2', df=_bars(11.0))
+    _schedule(monkeypatch, first, second)
+
+    names = [wuxi_analysis._download_bars('sh600000', race=False, rotate=i)[1] for i in range(4)]
+
+    assert names == ['源1', '源2', '源1', '源2']
+
+
+def _history(days=200):
+    closes = 10.0 + np.arange(days) * 0.01
+    return pd.DataFrame({'Date': pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.offsets.BDay(1),
+                                                periods=days),
+                         'Open': closes, 'High': closes + 0.1, 'Low': closes - 0.1, 'Close': closes,
+                         'Volume': 1_000_000.0, 'PctChange': 0.1})
+
+
+@pytest.fixture
+def real_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(ohlcv_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(wuxi_analysis, 'OHLCV_CACHE', True)
+    monkeypatch.setattr(wuxi_analysis, '_latest_quotes', {})
+    history = _history()
+    ohlcv_cache.save('sh600000', history, source='东方财富', adjust='qfq')
+    return history
+
+
+def test_synthetic_only_keeps_real_cache(monkeypatch, real_cache):
+    quote = FakeSource('报价', df=_bars(99.0), synthetic=True)
+    _schedule(monkeypatch, FakeSource('失效源'), quote)
+    today = pd.Timestamp.today().normalize()
+    monkeypatch.setattr(sources, 'fetch_latest_quotes', lambda codes: pd.DataFrame(
+        {'Date': [today], 'Price': [12.5], 'Open': [12.0], 'High': [12.6], 'Low': [11.9],
+         'Volume': [2_000_000.0], 'PctChange': [1.0]}, index=pd.Index(codes, name='code')))
+
+    df, source_name, _ = wuxi_analysis.load_bars('sh600000')
+
+    assert quote.calls == 0
+    assert source_name == '本地缓存'
+    assert len(df) == len(real_cache) + 1
+    np.testing.assert_array_equal(df['Close'].iloc[:-1].to_numpy(), real_cache['Close'].to_numpy())
+    assert df['Date'].iloc[-1] == today and df['Close'].iloc[-1] == 12.5
+    assert len(ohlcv_cache.load('sh600000')) == len(real_cache)   # 推算K线与报价都不写入缓存
+
+
+def test_yfinance_increment_merges_into_cache(monkeypatch, real_cache):
+    calls = []
+
+    def yfinance_bars(stock_code):
+        calls.append(stock_code)
+        return real_cache.tail(10)
+
+    monkeypatch.setattr(wuxi_analysis, '_yfinance_bars', yfinance_bars)
+    monkeypatch.setattr(sources, 'fetch_latest_quotes',
+                        lambda codes: pd.DataFrame(columns=['Date', 'Price'], index=pd.Index([], name='code')))
+    _schedule(monkeypatch, FakeSource('失效源'))
+
+    df, source_name, _ = wuxi_analysis.load_bars('sh600000')
+
+    assert source_name == 'yfinance'
+    assert len(calls) == 1                  # 增量合并，没有再获取完整历史
+    assert len(df) == len(real_cache)
+    assert ohlcv_cache.load('sh600000').attrs['source'] == 'yfinance'
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""按主机限速：令牌桶的突发、透支排队、补充与暂停，以及退避时长"""
+
+import pytest
+
+import rate_limit
+from rate_limit import TokenBucket, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', fake)
+    return fake
+
+
+def test_burst_then_queue(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # 令牌透支后按排队先后递增等待：每个令牌 1/rate 秒
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.5, 1.0, 1.5])
+
+
+def test_tokens_refill_up_to_burst(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 0.5
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+    clock.now += 100   # 长时间空闲也最多积累 burst 个令牌
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_burst_is_at_least_one(clock):
+    bucket = TokenBucket(rate=1, burst=0)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_pause_delays_every_request(clock):
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.pause(3)
+    bucket.pause(1)   # 较短的暂停不会缩短已有的暂停
+    assert bucket.reserve() == pytest.approx(3)
+    clock.now += 2
+    assert bucket.reserve() == pytest.approx(1)
+    clock.now += 1
+    assert bucket.reserve() == 0.0
+
+
+@pytest.mark.parametrize('attempt', range(8))
+def test_backoff_delay_grows_with_jitter(attempt):
+    cap = min(rate_limit.BACKOFF_MAX, rate_limit.BACKOFF_BASE * 2 ** attempt)
+    for _ in range(50):
+        assert cap / 2 <= backoff_delay(attempt) <= cap
+
+
+def test_backoff_delay_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(rate_limit.random, 'uniform', lambda low, high: high)
+    assert backoff_delay(0, retry_after='5') == 5.0
+    assert backoff_delay(0, retry_after='600') == rate_limit.BACKOFF_MAX   # 不超过上限
+    assert backoff_delay(2, retry_after='0.1') == 2.0                      # 取两者较大值
+    assert backoff_delay(0, retry_after='Wed, 21 Oct 2015 07:28:00 GMT') == rate_limit.BACKOFF_BASE
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""风险关键词扫描：重叠、互为前后缀的关键词都能命中，位置正确"""
+
+import pytest
+
+import risk_scanner
+from risk_scanner import KeywordMatcher, load_keywords
+
+
+def test_overlapping_keywords():
+    matcher = KeywordMatcher(['减持', '清仓式减持', '大宗交易减持', '质押', '平仓', '强制平仓'])
+    text = '股东拟通过大宗交易减持，另有质押股份遭强制平仓'
+
+    assert sorted(matcher.scan(text)) == sorted([
+        ('大宗交易减持', 5), ('减持', 9), ('质押', 14), ('强制平仓', 19), ('平仓', 21)])
+
+
+def test_keyword_inside_another_via_fail_links():
+    # 走到 “ab” 后遇到 “c” 失配，需要沿失配链退到 “b” 才能命中 “bc”
+    matcher = KeywordMatcher(['abd', 'bc', 'c'])
+    assert matcher.scan('abc') == [('bc', 1), ('c', 2)]
+    assert matcher.scan('xabdx') == [('abd', 1)]
+
+
+def test_repeated_and_adjacent_matches():
+    matcher = KeywordMatcher(['冻结', '司法冻结', '冻结冻结'])
+    assert matcher.scan('司法冻结冻结') == [('司法冻结', 0), ('冻结', 2), ('冻结冻结', 2), ('冻结', 4)]
+    assert matcher.terms('司法冻结冻结') == ['司法冻结', '冻结', '冻结冻结']
+
+
+def test_no_match_and_empty():
+    matcher = KeywordMatcher(['立案调查', '', '立案调查'])
+    assert matcher.keywords == ['立案调查']
+    assert matcher.scan('公司经营正常') == []
+    assert matcher.scan('') == []
+    assert KeywordMatcher([]).scan('立案调查') == []
+
+
+def test_load_keywords_skips_comments(tmp_path):
+    path = tmp_path / 'keywords.txt'
+    path.write_text('# 注释\n\n减持\n 质押 \n减持\n', encoding='utf-8')
+    assert load_keywords(str(path)) == ['减持', '质押']
+
+
+def test_scan_news_keeps_flagged_only(monkeypatch):
+    monkeypatch.setattr(risk_scanner, '_matcher', KeywordMatcher(['问询函', '减持']))
+    monkeypatch.setattr(risk_scanner, '_stats', {'documents': 0, 'flagged': 0})
+    news = [('2024-07-01', '公司收到问询函'), ('2024-07-02', '新药获批'), ('2024-07-03', '股东减持')]
+
+    assert risk_scanner.scan_news(news) == [('2024-07-01', '公司收到问询函', [('问询函', 4)]),
+                                            ('2024-07-03', '股东减持', [('减持', 2)])]
+    assert risk_scanner._stats == {'documents': 3, 'flagged': 2}
+
+
+@pytest.mark.parametrize('word', ['减持', '立案调查'])
+def test_bundled_keyword_file(word):
+    assert word in load_keywords()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""标题情绪评分：SQLite 缓存的命中统计与 LRU 淘汰，批量评分结果与输入顺序一致"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import sentiment
+from sentiment import SentimentCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(sentiment.time, 'time', fake)
+    return fake
+
+
+def test_hits_and_misses(tmp_path):
+    cache = SentimentCache(path=str(tmp_path / 'cache.db'))
+    cache.put_many({'a': 0.9, 'b': 0.1})
+
+    assert cache.get_many(['a', 'b', 'c', 'a']) == {'a': 0.9, 'b': 0.1}
+    assert (cache.hits, cache.misses) == (2, 1)   # 重复的键只算一次
+    assert cache.get_many(['c']) == {}
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = SentimentCache(path=str(tmp_path / 'cache.db'), max_entries=3)
+    for key in 'abc':
+        cache.put_many({key: 0.5})
+        clock.now += 1
+    cache.get_many(['a'])                          # a 最近被使用，b 成为最久未使用
+    clock.now += 1
+
+    cache.put_many({'d': 0.5})
+
+    assert len(cache) == 3
+    assert set(cache.get_many(['a', 'b', 'c', 'd'])) == {'a', 'c', 'd'}
+
+
+def test_persists_across_connections(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    SentimentCache(path=path).put_many({'a': 0.75})
+    assert SentimentCache(path=path).get_many(['a']) == {'a': 0.75}
+
+
+def _fake_score(title):
+    return len(title) / 100
+
+
+@pytest.fixture
+def fake_scoring(monkeypatch, tmp_path):
+    """用标题长度代替 SnowNLP，线程池代替进程池，缓存放在临时目录"""
+    scored = []
+
+    def score_chunk(titles):
+        scored.extend(titles)
+        return [_fake_score(title) for title in titles]
+
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(sentiment, '_score_chunk', score_chunk)
+    monkeypatch.setattr(sentiment, '_get_pool', lambda: pool)
+    monkeypatch.setattr(sentiment, 'WORKERS', 3)
+    monkeypatch.setattr(sentiment, 'MIN_PARALLEL_TITLES', 4)
+    monkeypatch.setattr(sentiment, 'CHUNK_SIZE', 3)
+    monkeypatch.setattr(sentiment, '_cache', SentimentCache(path=str(tmp_path / 'cache.db')))
+    yield scored
+    pool.shutdown()
+
+
+@pytest.mark.parametrize('parallel', [True, False])
+def test_score_titles_keeps_input_order(fake_scoring, parallel):
+    titles = ['标题' * n for n in range(1, 20)]
+    titles = titles[::2] + titles[1::2] + titles[:3]   # 打乱长度顺序并带重复标题
+
+    assert sentiment.score_titles(titles, parallel=parallel) == [_fake_score(t) for t in titles]
+    assert len(fake_scoring) == 19                      # 重复的标题只评一次
+
+
+def test_score_titles_mixes_cached_and_new(fake_scoring):
+    sentiment.score_titles(['甲', '乙乙乙'])
+    fake_scoring.clear()
+    titles = ['丙丙', '乙乙乙', '丁' * 5, '甲', '戊' * 4, '己' * 6]
+
+    assert sentiment.score_titles(titles) == [_fake_score(t) for t in titles]
+    assert sorted(fake_scoring) == sorted(['丙丙', '丁' * 5, '戊' * 4, '己' * 6])
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""数据源健康记录：熔断器的 关闭 → 打开 → 半开 → 关闭/再次打开 状态转换与排序"""
+
+import pytest
+
+import source_health
+from source_health import FAILURE_THRESHOLD, OPEN_SECONDS, PROBE_TIMEOUT, SourceHealth
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(source_health.time, 'time', fake)
+    return fake
+
+
+def _fail(health, name, times=1):
+    for _ in range(times):
+        health.record(name, False, 1.0, '连接超时')
+
+
+def test_opens_after_consecutive_failures(clock):
+    health = SourceHealth(path=None)
+    _fail(health, 'price:新浪', FAILURE_THRESHOLD - 1)
+    assert health.stats('price:新浪')['state'] == 'closed'
+    assert health.allow('price:新浪')
+
+    _fail(health, 'price:新浪')
+    assert health.stats('price:新浪')['state'] == 'open'
+    assert not health.allow('price:新浪')
+    assert health.stats('price:新浪')['last_failure']['reason'] == '连接超时'
+
+
+def test_success_resets_failure_count(clock):
+    health = SourceHealth(path=None)
+    _fail(health, 'a', FAILURE_THRESHOLD - 1)
+    health.record('a', True, 0.2)
+    _fail(health, 'a', FAILURE_THRESHOLD - 1)
+    assert health.stats('a')['state'] == 'closed'
+
+
+def test_half_open_admits_one_probe(clock):
+    health = SourceHealth(path=None)
+    _fail(health, 'a', FAILURE_THRESHOLD)
+    clock.now += OPEN_SECONDS
+
+    assert health.allow('a')
+    assert health.stats('a')['state'] == 'half_open'
+    assert not health.allow('a')          # 探测进行中，不放行第二个请求
+    clock.now += PROBE_TIMEOUT
+    assert health.allow('a')              # 探测超时没有结果，允许再探测一次
+
+
+def test_probe_success_closes(clock):
+    health = SourceHealth(path=None)
+    _fail(health, 'a', FAILURE_THRESHOLD)
+    clock.now += OPEN_SECONDS
+    assert health.allow('a')
+
+    health.record('a', True, 0.3)
+    assert health.stats('a')['state'] == 'closed'
+    assert health.allow('a') and health.allow('a')
+
+
+def test_probe_failure_reopens_with_doubled_timeout(clock):
+    health = SourceHealth(path=None)
+    _fail(health, 'a', FAILURE_THRESHOLD)
+    clock.now += OPEN_SECONDS
+    assert health.allow('a')
+
+    _fail(health, 'a')
+    assert health.stats('a')['state'] == 'open'
+    clock.now += OPEN_SECONDS
+    assert not health.allow('a')
+    clock.now += OPEN_SECONDS
+    assert health.allow('a')
+
+
+def test_order_skips_open_and_prefers_healthy(clock):
+    health = SourceHealth(path=None)
+    for _ in range(5):
+        health.record('fast', True, 0.1)
+        health.record('slow', True, 2.0)
+    _fail(health, 'broken', FAILURE_THRESHOLD)
+
+    assert health.order(['slow', 'broken', 'unknown', 'fast']) == [3, 0, 2]
+
+
+def test_persists_to_json(tmp_path, clock):
+    path = str(tmp_path / 'health.json')
+    health = SourceHealth(path=path)
+    _fail(health, 'a', FAILURE_THRESHOLD)
+    health.record('b', True, 0.5)
+
+    reloaded = SourceHealth(path=path)
+    assert reloaded.stats('a')['state'] == 'open'
+    assert reloaded.stats('b')['p50'] == 0.5
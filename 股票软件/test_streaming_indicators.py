@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""增量指标计算器：逐根更新的结果与整列计算一致，状态可导出后继续累积，同一日期的K线会被替换"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import KD_TOLERANCE, StreamingIndicators, add_kdj
+
+
+def _frame(days=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 + np.cumsum(rng.normal(0, 0.3, days))
+    close[150:153] = close[149]                  # 停牌：价格不变
+    spread = rng.uniform(0.05, 0.5, days)
+    spread[150:153] = 0.0
+    return pd.DataFrame({
+        'Date': pd.bdate_range('2023-01-02', periods=days),
+        'Open': close, 'High': close + spread, 'Low': close - spread, 'Close': close,
+        'Volume': rng.uniform(1e6, 2e6, days),
+    })
+
+
+def _expected(df):
+    df = add_kdj(df.copy())
+    for n in (5, 10, 20):
+        df[f'MA{n}'] = df['Close'].rolling(n).mean()
+    ema12 = df['Close'].ewm(span=12, adjust=False).mean()
+    ema26 = df['Close'].ewm(span=26, adjust=False).mean()
+    df['Diff'] = ema12 - ema26
+    df['DEA'] = df['Diff'].ewm(span=9, adjust=False).mean()
+    return df
+
+
+def test_matches_full_frame():
+    df = _frame()
+    expected = _expected(df)
+    engine = StreamingIndicators()
+
+    for i, bar in enumerate(df.to_dict('records')):
+        tech = engine.update(bar)
+        row = expected.iloc[i]
+        assert abs(tech['K'] - row['K']) <= KD_TOLERANCE
+        assert abs(tech['D'] - row['D']) <= KD_TOLERANCE
+        assert tech['diff'] == pytest.approx(row['Diff'])
+        assert tech['dea'] == pytest.approx(row['DEA'])
+        if i >= 19:
+            assert tech['ma5'] == pytest.approx(row['MA5'])
+            assert tech['ma10'] == pytest.approx(row['MA10'])
+            assert tech['ma20'] == pytest.approx(row['MA20'])
+
+
+def test_round_trip_continues_accumulating(tmp_path):
+    df = _frame()
+    warm, rest = df.iloc[:200], df.iloc[200:]
+    reference = StreamingIndicators.from_frame(df).tech
+
+    state = json.loads(json.dumps(StreamingIndicators.from_frame(warm).to_dict()))
+    restored = StreamingIndicators.from_dict(state)
+    for bar in rest.to_dict('records'):
+        restored.update(bar)
+    assert restored.tech == reference
+
+    path = str(tmp_path / 'state.json')
+    StreamingIndicators.from_frame(warm).save(path)
+    loaded = StreamingIndicators.load(path)
+    for bar in rest.to_dict('records'):
+        loaded.update(bar)
+    assert loaded.tech == reference
+
+
+def test_same_date_replaces_last_bar():
+    df = _frame()
+    engine = StreamingIndicators.from_frame(df.iloc[:-1])
+    intraday = dict(df.iloc[-1], Close=df['Close'].iloc[-1] * 1.05)
+    engine.update(intraday)
+    engine.update(intraday)                      # 盘中重复轮询
+    tech = engine.update(df.iloc[-1].to_dict())  # 收盘后的最终K线
+
+    assert engine.count == len(df)
+    assert tech == StreamingIndicators.from_frame(df).tech
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""全市场K线存储：由K线缓存构建、按股票切片与堆叠，重建时只重新读取有变化的股票"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ohlcv_cache
+import universe_store
+from indicators import stack_frames
+from universe_store import UniverseStore
+
+
+def _bars(end='2024-06-28', days=30, close=10.0):
+    # 价格取 float32 能精确表示的值，frame() 转回 float64 后与缓存完全相同
+    closes = close + np.arange(days) * 0.25
+    return pd.DataFrame({'Date': pd.bdate_range(end=end, periods=days),
+                         'Open': closes, 'High': closes + 0.5, 'Low': closes - 0.5, 'Close': closes,
+                         'Volume': 1_000_000.0, 'PctChange': 1.5})
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    cache_dir, store_dir = str(tmp_path / 'cache'), str(tmp_path / 'store')
+    history = {'sh600000': _bars(days=30), 'sz000001': _bars(end='2024-06-21', days=12, close=20.0)}
+    history['sz000001'].loc[3, 'Volume'] = np.nan
+    for symbol, df in history.items():
+        ohlcv_cache.save(symbol, df, cache_dir, source='东方财富', adjust='qfq')
+    return cache_dir, store_dir, history
+
+
+def test_frame_matches_cache(dirs):
+    cache_dir, store_dir, history = dirs
+    store, report = universe_store.build(cache_dir=cache_dir, store_dir=store_dir)
+
+    assert report['symbols'] == 2 and report['bars'] == 42 and report['reloaded'] == 2
+    assert store.symbols == ['sh600000', 'sz000001']
+    assert store.length('sz000001') == 12
+    assert store.last_date('sz000001') == pd.Timestamp('2024-06-21')
+    for symbol in store.symbols:
+        pd.testing.assert_frame_equal(store.frame(symbol), ohlcv_cache.load(symbol, cache_dir), check_like=True)
+    assert np.isnan(store.frame('sz000001')['Volume'].iloc[3])
+    assert store.frame('sh688000') is None and 'sh688000' not in store
+
+
+def test_panel_matches_stack_frames(dirs):
+    cache_dir, store_dir, history = dirs
+    store, _ = universe_store.build(cache_dir=cache_dir, store_dir=store_dir)
+    symbols = ['sz000001', 'sh688000', 'sh600000']
+
+    for length in (None, 10):
+        panel = store.panel(symbols, length=length)
+        expected = stack_frames([history['sz000001'], pd.DataFrame(columns=['Date']), history['sh600000']],
+                                length=length)
+        for col in ['Close', 'High', 'Low', 'Volume', 'PctChange']:
+            np.testing.assert_array_equal(panel[col], expected[col])
+        assert panel['last_date'] == [pd.Timestamp('2024-06-21'), None, pd.Timestamp('2024-06-28')]
+
+
+def test_rebuild_reloads_only_changed(dirs):
+    cache_dir, store_dir, history = dirs
+    old, _ = universe_store.build(cache_dir=cache_dir, store_dir=store_dir)
+    longer = _bars(end='2024-07-05', days=35)
+    ohlcv_cache.save('sh600000', longer, cache_dir, source='东方财富', adjust='qfq')
+    path = ohlcv_cache._path('sh600000', cache_dir)
+    os.utime(path, (old.built_at + 10, old.built_at + 10))
+
+    store, report = universe_store.build(cache_dir=cache_dir, store_dir=store_dir)
+
+    assert (report['reloaded'], report['reused']) == (1, 1)
+    assert store.length('sh600000') == 35
+    assert store.last_date('sh600000') == pd.Timestamp('2024-07-05')
+    np.testing.assert_array_equal(store.slice('sz000001')['Close'], old.slice('sz000001')['Close'])
+    assert not os.path.exists(store_dir + '.tmp') and not os.path.exists(store_dir + '.old')
+
+
+def test_legacy_cache_without_units_is_skipped(dirs):
+    cache_dir, store_dir, _ = dirs
+    legacy = _bars(days=5)
+    arrays = {'Date': legacy['Date'].values.astype('datetime64[ns]')}
+    arrays.update({col: legacy[col].to_numpy(dtype='float64') for col in ohlcv_cache.COLUMNS})
+    np.savez_compressed(ohlcv_cache._path('sh601000', cache_dir), **arrays)
+
+    store, report = universe_store.build(cache_dir=cache_dir, store_dir=store_dir)
+
+    assert 'sh601000' not in store and report['symbols'] == 2
+
+
+def test_version_mismatch_and_empty(tmp_path, monkeypatch):
+    store, report = universe_store.build([], cache_dir=str(tmp_path / 'cache'), store_dir=str(tmp_path / 'store'))
+    assert len(store) == 0 and report['bars'] == 0
+    assert store.panel()['Close'].shape == (0, 0)
+
+    monkeypatch.setattr(universe_store, 'VERSION', universe_store.VERSION + 1)
+    with pytest.raises(ValueError):
+        UniverseStore(str(tmp_path / 'store'))
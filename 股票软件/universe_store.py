@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市场K线存储（内存映射）
+把 ohlcv_cache 中各股票的 npz 文件合并为一组固定格式的列文件，按列用 np.memmap 只读打开：
+- Open/High/Low/Close/PctChange 为 float32，Volume 为 int64（缺失记为 -1），每列一个文件，
+  所有股票的K线按股票依次首尾相接；
+- date_index 为每根K线在交易日历 calendar（datetime64[D]）中的下标；
+- offsets 为股票偏移表：第 i 只股票的K线是各列的 [offsets[i], offsets[i+1]) 区间。
+打开存储只读取 meta.json 与偏移表，取某只股票的K线是列文件上的切片视图，不复制数据；
+多个进程（如 param_sweep 的工作进程）打开同一存储时共用操作系统的页缓存，不再各自持有一份。
+
+重建时只重新读取修改时间晚于上次构建的 npz 文件，其余股票直接从旧存储复制；
+新存储先写入临时目录再替换，正在读取旧存储的进程不受影响。
+
+用法：python universe_store.py [股票代码 ...]，不带参数时由K线缓存中的全部股票构建
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import ohlcv_cache
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universe_store')
+VERSION = 2  # 2：只收录成交量以股为单位的K线缓存
+
+# 列文件：列名 -> (文件名, dtype)
+FLOAT_COLUMNS = ['Open', 'High', 'Low', 'Close', 'PctChange']
+LAYOUT = {col: (f"{col.lower()}.f32", 'float32') for col in FLOAT_COLUMNS}
+LAYOUT['Volume'] = ('volume.i64', 'int64')
+LAYOUT['date_index'] = ('date_index.i32', 'int32')
+CALENDAR_FILE = ('calendar.i64', 'int64')   # datetime64[D] 按 int64 保存
+OFFSETS_FILE = ('offsets.i64', 'int64')
+MISSING_VOLUME = -1
+
+
+def _memmap(path, dtype, length):
+    # 长度为0的文件无法映射
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+class UniverseStore:
+    """只读打开的全市场K线存储；各方法返回的数组是内存映射上的视图，不要修改"""
+
+    def __init__(self, store_dir=None):
+        store_dir = self.store_dir = store_dir or STORE_DIR
+        with open(os.path.join(store_dir, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != VERSION:
+            raise ValueError(f"全市场K线存储版本不符：{self.meta.get('version')}（需要 {VERSION}）")
+        bars = self.meta['bars']
+        self.symbols = self.meta['symbols']
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.columns = {col: _memmap(os.path.join(store_dir, name), dtype, bars)
+                        for col, (name, dtype) in LAYOUT.items()}
+        self.calendar = _memmap(os.path.join(store_dir, CALENDAR_FILE[0]), CALENDAR_FILE[1],
+                                self.meta['days']).view('datetime64[D]')
+        self.offsets = _memmap(os.path.join(store_dir, OFFSETS_FILE[0]), OFFSETS_FILE[1], len(self.symbols) + 1)
+
+    @property
+    def built_at(self):
+        return self.meta['built_at']
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    def length(self, symbol):
+        i = self._rows[symbol]
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+    def last_date(self, symbol):
+        """该股票最后一根K线的日期（pd.Timestamp），没有K线时返回None"""
+        i = self._rows[symbol]
+        if self.offsets[i + 1] == self.offsets[i]:
+            return None
+        return pd.Timestamp(self.calendar[self.columns['date_index'][self.offsets[i + 1] - 1]])
+
+    def slice(self, symbol):
+        """一只股票的各列 {'Date', 'Open', ..., 'Volume', 'date_index'}：除 Date 外均为内存映射上的视图"""
+        i = self._rows[symbol]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        out = {col: values[start:end] for col, values in self.columns.items()}
+        out['Date'] = self.calendar[out['date_index']]
+        return out
+
+    def frame(self, symbol):
+        """一只股票的K线 DataFrame，格式同 ohlcv_cache.load（价格由 float32 转回 float64）；没有该股票时返回None"""
+        if symbol not in self._rows:
+            return None
+        data = self.slice(symbol)
+        if not len(data['Date']):
+            return None
+        df = pd.DataFrame({'Date': data['Date'].astype('datetime64[ns]')})
+        for col in ohlcv_cache.COLUMNS:
+            if col == 'Volume':
+                volume = data['Volume'].astype('float64')
+                volume[data['Volume'] == MISSING_VOLUME] = np.nan
+                df[col] = volume
+            else:
+                df[col] = data[col].astype('float64')
+        return df
+
+    def panel(self, symbols=None, length=None):
+        """按行尾对齐堆叠多只股票的K线，返回与 indicators.stack_frames 相同格式的 (N, T) float64 数组
+
+        symbols 默认为存储中的全部股票，不在存储中的股票整行为 NaN；T 默认取最长的历史长度。
+        """
+        symbols = self.symbols if symbols is None else list(symbols)
+        rows = [self._rows.get(symbol) for symbol in symbols]
+        starts = np.array([self.offsets[i] if i is not None else 0 for i in rows], dtype=np.int64)
+        ends = np.array([self.offsets[i + 1] if i is not None else 0 for i in rows], dtype=np.int64)
+        length = length or int((ends - starts).max(initial=0))
+        starts = np.maximum(starts, ends - length)
+        counts = ends - starts
+
+        # 一次算出全部 (行, 列) 目标位置与源下标，各列只做一次整体的花式索引
+        row_of = np.repeat(np.arange(len(symbols)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        within = np.arange(counts.sum()) - first
+        col_of = length - np.repeat(counts, counts) + within
+        source = np.repeat(starts, counts) + within
+
+        panel = {}
+        for col in ['Close', 'High', 'Low', 'Volume', 'PctChange']:
+            arr = np.full((len(symbols), length), np.nan)
+            values = self.columns[col][source].astype('float64')
+            if col == 'Volume':
+                values[values == MISSING_VOLUME] = np.nan
+            arr[row_of, col_of] = values
+            panel[col] = arr
+        date_index = self.columns['date_index']
+        panel['last_date'] = [pd.Timestamp(self.calendar[date_index[e - 1]]) if e > s else None
+                              for s, e in zip(starts, ends)]
+        return panel
+
+
+def _write(path, array, dtype):
+    np.ascontiguousarray(array, dtype=dtype).tofile(path)
+
+
+def build(symbols=None, cache_dir=None, store_dir=None):
+    """由K线缓存构建（或刷新）全市场K线存储，返回 (UniverseStore, 报告)
+
+    symbols 默认为K线缓存中的全部股票。旧存储中已有、且 npz 在上次构建后未修改的股票直接复用旧数据；
+    报告 {'symbols', 'bars', 'reloaded', 'reused', 'seconds'}。
+    """
+    started = time.monotonic()
+    # 以开始读取前的时间为构建时间：读取期间被改写的 npz 下次构建时会重新读取
+    built_at = time.time()
+    cache_dir = cache_dir or ohlcv_cache.CACHE_DIR
+    store_dir = store_dir or STORE_DIR
+    if symbols is None:
+        symbols = sorted(name[:-4] for name in os.listdir(cache_dir) if name.endswith('.npz')) \
+            if os.path.isdir(cache_dir) else []
+    try:
+        old = UniverseStore(store_dir)
+    except (OSError, ValueError, KeyError, json.JSONDecodeError):
+        old = None
+
+    pieces = {}   # 股票 -> {'Date': datetime64[D], 列: 数组}
+    reloaded = reused = 0
+    for symbol in symbols:
+        path = ohlcv_cache._path(symbol, cache_dir)
+        if old is not None and symbol in old and os.path.exists(path) and os.path.getmtime(path) <= old.built_at:
+            data = old.slice(symbol)
+            pieces[symbol] = {col: np.array(data[col]) for col in ['Date'] + list(ohlcv_cache.COLUMNS)}
+            reused += 1
+            continue
+        df = ohlcv_cache.load(symbol, cache_dir)
+        if df is None or not ohlcv_cache.known_units(df):
+            continue
+        piece = {'Date': df['Date'].to_numpy().astype('datetime64[D]')}
+        for col in ohlcv_cache.COLUMNS:
+            values = df[col].to_numpy(dtype='float64')
+            if col == 'Volume':
+                values = np.where(np.isnan(values), MISSING_VOLUME, values).astype(np.int64)
+            piece[col] = values
+        pieces[symbol] = piece
+        reloaded += 1
+
+    names = list(pieces)
+    counts = np.array([len(pieces[s]['Date']) for s in names], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    all_dates = np.concatenate([pieces[s]['Date'] for s in names]) if names else np.empty(0, 'datetime64[D]')
+    calendar, date_index = np.unique(all_dates, return_inverse=True)
+
+    tmp_dir = store_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for col, (name, dtype) in LAYOUT.items():
+        if col == 'date_index':
+            _write(os.path.join(tmp_dir, name), date_index, dtype)
+        else:
+            column = np.concatenate([pieces[s][col] for s in names]) if names else np.empty(0)
+            _write(os.path.join(tmp_dir, name), column, dtype)
+    _write(os.path.join(tmp_dir, CALENDAR_FILE[0]), calendar.astype('datetime64[D]').view('int64'), CALENDAR_FILE[1])
+    _write(os.path.join(tmp_dir, OFFSETS_FILE[0]), offsets, OFFSETS_FILE[1])
+    meta = {'version': VERSION, 'built_at': built_at, 'bars': int(offsets[-1]), 'days': len(calendar),
+            'symbols': names, 'layout': {col: list(spec) for col, spec in LAYOUT.items()}}
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # 替换目录：已打开旧存储的进程仍持有旧文件的映射，不受影响
+    old_dir = store_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.replace(store_dir, old_dir)
+    os.replace(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    report = {'symbols': len(names), 'bars': int(offsets[-1]), 'reloaded': reloaded, 'reused': reused,
+              'seconds': time.monotonic() - started}
+    return UniverseStore(store_dir), report
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(store_dir=None):
+    """返回进程内共用的全市场K线存储（首次调用时打开），尚未构建时返回None"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = UniverseStore(store_dir)
+                except (OSError, ValueError, KeyError, json.JSONDecodeError):
+                    return None
+    return _store
+
+
+def refresh(symbols=None):
+    """重建存储（只重新读取有变化的股票）并替换进程内共用的存储，返回构建报告"""
+    global _store
+    store, report = build(symbols)
+    with _store_lock:
+        _store = store
+    return report
+
+
+def format_stats():
+    """生成全市场K线存储的文本摘要"""
+    if _store is None:
+        return "🗄️ 全市场K线存储：本次未使用"
+    built = time.strftime('%Y-%m-%d %H:%M', time.localtime(_store.built_at))
+    return (f"🗄️ 全市场K线存储：{len(_store)} 只股票，{_store.meta['bars']} 根K线，"
+            f"{_store.meta['days']} 个交易日（构建于 {built}）")
+
+
+def main(symbols):
+    store, report = build(symbols or None)
+    print(f"🗄️ 全市场K线存储已构建：{report['symbols']} 只股票，{report['bars']} 根K线，"
+          f"重新读取 {report['reloaded']} 只，复用 {report['reused']} 只，耗时 {report['seconds']:.1f} 秒")
+    size = sum(os.path.getsize(os.path.join(store.store_dir, name)) for name in os.listdir(store.store_dir))
+    print(f"📁 {store.store_dir}：{size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
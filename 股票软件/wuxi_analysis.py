@@ -1,11 +1,25 @@
-import requests
-from bs4 import BeautifulSoup
-import re
+import http_client
+import deadline
+import rate_limit
+import ohlcv_cache
+import source_health
+import sources
+import news_index
+import risk_scanner
+import universe_store
+import scoring
+from indicators import compute_indicators, lookback, TECH_INDICATORS, stack_frames, panel_tech
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import json
 import os
+import io
+import sys
+import time
+import threading
+import contextvars
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # 支持多股票分析（沪市加0，深市加1）
 stock_list = [
@@ -15,6 +29,40 @@ stock_list = [
 # 离线模式开关
 OFFLINE_MODE = False  # 设置为True使用模拟数据，False使用真实数据
 
+# HTTP录制/回放：'record' 联网并录制原始响应，'replay' 只使用录制的响应（离线运行真实解析代码），None 关闭
+HTTP_CASSETTE = http_client.CASSETTE_MODE
+
+# 本地模拟服务器地址（见 stub_server.py），设置后所有请求改发到该服务器，用于压测；None 请求真实网站
+STUB_SERVER = http_client.STUB_SERVER
+
+# 行情数据源竞速模式：同时请求前N个数据源，采用最先成功的结果
+RACE_MODE = True      # 设置为False则按顺序逐个尝试数据源
+RACE_TOP_N = 4        # 同时在途的数据源数量
+RACE_DEADLINE = 15    # 单只股票获取行情的总时限（秒）
+
+# 本地K线缓存：只增量获取缓存之后的新K线
+OHLCV_CACHE = True
+
+# 多股票并发分析的最大并发数
+MAX_CONCURRENCY = 8
+
+# 单只股票分析的总时限（秒，None 不限时），新闻获取最多占用其中 NEWS_BUDGET_SHARE；
+# 时限内未取得行情或新闻时降级为仅新闻或仅技术面评分
+SYMBOL_BUDGET = 60
+NEWS_BUDGET_SHARE = 0.4
+
+# 分析前批量获取所有股票的实时报价（腾讯一次请求多只），作为各股票的最新一根K线
+LATEST_QUOTES = True
+
+# 跨运行的新闻去重索引：只有此前没处理过的新闻算新增，新浪翻页遇到整页已处理过时停止；
+# 参与情绪分析的是本次获取的新闻与索引中较早新闻合起来最近的 NEWS_WINDOW 条
+NEWS_INDEX = True
+NEWS_WINDOW = 60
+
+# 除评分、报告与走势图所需的指标（indicators.TECH_INDICATORS）外，另外计算并在报告中列出的指标，
+# 如 ['RSI14', 'BOLL_UP', 'BOLL_LOW', 'ATR14', 'OBV']；可用的指标见 indicators.INDICATORS
+EXTRA_INDICATORS = []
+
 # 模拟数据生成函数
 def generate_mock_news_data():
     """生成模拟的新闻数据"""
@@ -119,264 +167,37 @@ def fetch_news(stock_code="sh603259", max_pages=3):
         else:
             symbol = stock_code
     
-    # 扩展新闻数据源列表
-    news_sources = [
-        # 1. 新浪财经新闻
-        {
-            'url': "https://vip.stock.finance.sina.com.cn/corp/view/vCB_AllNewsStock.php",
-            'params': {"symbol": symbol, "Page": 1},
-            'parser': 'sina'
-        },
-        # 2. 东方财富新闻
-        {
-            'url': "http://np-anotice-stock.eastmoney.com/api/security/announcement/getAnnouncementList",
-            'params': {"cb": "jQuery", "pageSize": 20, "pageIndex": 1, "stock": symbol},
-            'parser': 'eastmoney'
-        },
-        # 3. 雪球新闻
-        {
-            'url': f"https://xueqiu.com/statuses/search.json?count=20&comment=0&source=all&sort=time&page=1&stock={symbol}",
-            'params': {},
-            'parser': 'xueqiu'
-        },
-        # 4. 同花顺新闻
-        {
-            'url': f"http://news.10jqka.com.cn/tapp/news/push/stock/{symbol}/",
-            'params': {},
-            'parser': 'ths'
-        },
-        # 5. 金融界新闻
-        {
-            'url': f"http://stock.jrj.com.cn/report/{symbol}/",
-            'params': {},
-            'parser': 'jrj'
-        }
-    ]
-    
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
     news_list = []
     source_results = {}  # 记录每个数据源的结果
     
-    for source_idx, source in enumerate(news_sources):
+    # 按历史成功率与耗时排序，跳过熔断中的新闻源；取得新闻后不再尝试其余新闻源
+    health = source_health.get_scoreboard()
+    index = news_index.get_index() if NEWS_INDEX else None
+    seen = (lambda page_news: index.all_seen(symbol, page_news)) if index is not None else None
+    for source in sources.schedule_news_sources(symbol):
+        if deadline.expired():
+            print("⏱️ 新闻获取时限已用完，不再尝试其余新闻源")
+            break
+        source_news = []
+        failure = None
+        started = time.monotonic()
         try:
-            print(f"尝试新闻源 {source_idx + 1}...")
-            source_news = []
-            
-            if source['parser'] == 'sina':
-                # 新浪财经新闻解析 - 修复版本
-                for page in range(1, max_pages+1):
-                    source['params']["Page"] = page
-                    try:
-                        resp = requests.get(source['url'], params=source['params'], headers=headers, timeout=10)
-                        resp.raise_for_status()
-                    except requests.exceptions.RequestException as e:
-                        print(f"❌ 新浪新闻页面{page}出错: {e}")
-                        if page == 1:
-                            break
-                        continue
-                    
-                    try:
-                        resp.encoding = 'gbk'
-                        soup = BeautifulSoup(resp.text, 'html.parser')
-                        
-                        # 查找新闻列表容器
-                        news_container = soup.find('div', class_='datelist')
-                        if news_container:
-                            # 使用正则表达式提取新闻
-                            news_pattern = r'(\d{4}-\d{2}-\d{2})\s+(\d{2}:\d{2})\s+<a[^>]*>([^<]+)</a>'
-                            news_matches = re.findall(news_pattern, str(news_container))
-                            
-                            page_news_count = 0
-                            for match in news_matches:
-                                date_str = match[0]
-                                time_str = match[1]
-                                title = match[2].strip()
-                                full_date = f"{date_str} {time_str}"
-                                source_news.append((full_date, title))
-                                page_news_count += 1
-                            
-                            print(f"✅ 新浪新闻页面{page}成功，获取 {page_news_count} 条新闻")
-                            
-                            if page_news_count == 0:
-                                break
-                        else:
-                            print(f"❌ 新浪新闻页面{page}未找到新闻容器")
-                            break
-                            
-                    except Exception as e:
-                        print(f"❌ 解析新浪新闻页面{page}出错: {e}")
-                        break
-                
-                if source_news:
-                    print(f"✅ 新浪新闻源成功，总共获取 {len(source_news)} 条新闻")
-                    news_list.extend(source_news)
-                    source_results['sina'] = len(source_news)
-                    break
-                    
-            elif source['parser'] == 'eastmoney':
-                # 东方财富新闻解析 - 完善版本
-                try:
-                    # 尝试不同的股票代码格式
-                    stock_formats = [symbol, symbol[2:], f"0{symbol[2:]}" if symbol.startswith('sh') else f"1{symbol[2:]}"]
-                    
-                    for stock_format in stock_formats:
-                        source['params']['stock'] = stock_format
-                        resp = requests.get(source['url'], params=source['params'], headers=headers, timeout=10)
-                        
-                        if resp.status_code == 200 and resp.text:
-                            content = resp.text
-                            # 尝试解析JSONP格式
-                            if content.startswith('jQuery(') and content.endswith(')'):
-                                json_str = content[7:-1]  # 去掉jQuery()包装
-                                try:
-                                    data = json.loads(json_str)
-                                    if 'data' in data and 'list' in data['data']:
-                                        news_items = data['data']['list']
-                                        for item in news_items:
-                                            date_str = item.get('notice_date', '')
-                                            title = item.get('title', '')
-                                            if date_str and title:
-                                                source_news.append((date_str, title))
-                                        
-                                        print(f"✅ 东方财富新闻源成功，获取 {len(source_news)} 条公告")
-                                        news_list.extend(source_news)
-                                        source_results['eastmoney'] = len(source_news)
-                                        break
-                                except json.JSONDecodeError:
-                                    continue
-                            else:
-                                # 尝试直接解析JSON
-                                try:
-                                    data = resp.json()
-                                    if 'data' in data and 'list' in data['data']:
-                                        news_items = data['data']['list']
-                                        for item in news_items:
-                                            date_str = item.get('notice_date', '')
-                                            title = item.get('title', '')
-                                            if date_str and title:
-                                                source_news.append((date_str, title))
-                                        
-                                        print(f"✅ 东方财富新闻源成功，获取 {len(source_news)} 条公告")
-                                        news_list.extend(source_news)
-                                        source_results['eastmoney'] = len(source_news)
-                                        break
-                                except json.JSONDecodeError:
-                                    continue
-                except Exception as e:
-                    print(f"❌ 东方财富新闻源失败: {e}")
-                    continue
-                    
-            elif source['parser'] == 'xueqiu':
-                # 雪球新闻解析 - 完善版本
-                try:
-                    # 雪球需要特殊的请求头
-                    xueqiu_headers = headers.copy()
-                    xueqiu_headers.update({
-                        'Referer': 'https://xueqiu.com/',
-                        'Accept': 'application/json, text/plain, */*',
-                        'X-Requested-With': 'XMLHttpRequest'
-                    })
-                    
-                    resp = requests.get(source['url'], params=source['params'], headers=xueqiu_headers, timeout=10)
-                    if resp.status_code == 200:
-                        try:
-                            data = resp.json()
-                            if 'list' in data:
-                                news_items = data['list']
-                                for item in news_items:
-                                    created_at = item.get('created_at', '')
-                                    title = item.get('title', '')
-                                    if created_at and title:
-                                        # 转换时间格式
-                                        try:
-                                            from datetime import datetime
-                                            dt = datetime.fromtimestamp(created_at / 1000)
-                                            date_str = dt.strftime('%Y-%m-%d %H:%M')
-                                            source_news.append((date_str, title))
-                                        except:
-                                            source_news.append((str(created_at), title))
-                                
-                                print(f"✅ 雪球新闻源成功，获取 {len(source_news)} 条新闻")
-                                news_list.extend(source_news)
-                                source_results['xueqiu'] = len(source_news)
-                                break
-                        except json.JSONDecodeError as e:
-                            print(f"❌ 雪球JSON解析失败: {e}")
-                            continue
-                    else:
-                        print(f"❌ 雪球请求失败: {resp.status_code}")
-                        continue
-                except Exception as e:
-                    print(f"❌ 雪球新闻源失败: {e}")
-                    continue
-                    
-            elif source['parser'] == 'ths':
-                # 同花顺新闻解析 - 完善版本
-                try:
-                    resp = requests.get(source['url'], params=source['params'], headers=headers, timeout=10)
-                    if resp.status_code == 200:
-                        soup = BeautifulSoup(resp.text, 'html.parser')
-                        
-                        # 查找新闻列表
-                        news_items = soup.find_all(['div', 'li'], class_=re.compile(r'news|item|list'))
-                        for item in news_items:
-                            # 查找日期和标题
-                            date_elem = item.find(['span', 'div'], class_=re.compile(r'date|time'))
-                            title_elem = item.find('a')
-                            
-                            if date_elem and title_elem:
-                                date_str = date_elem.get_text().strip()
-                                title = title_elem.get_text().strip()
-                                if date_str and title:
-                                    source_news.append((date_str, title))
-                        
-                        if source_news:
-                            print(f"✅ 同花顺新闻源成功，获取 {len(source_news)} 条新闻")
-                            news_list.extend(source_news)
-                            source_results['ths'] = len(source_news)
-                            break
-                        else:
-                            print(f"❌ 同花顺未找到新闻")
-                            continue
-                except Exception as e:
-                    print(f"❌ 同花顺新闻源失败: {e}")
-                    continue
-                    
-            elif source['parser'] == 'jrj':
-                # 金融界新闻解析 - 完善版本
-                try:
-                    resp = requests.get(source['url'], params=source['params'], headers=headers, timeout=10)
-                    if resp.status_code == 200:
-                        soup = BeautifulSoup(resp.text, 'html.parser')
-                        
-                        # 查找新闻列表
-                        news_items = soup.find_all(['div', 'li'], class_=re.compile(r'news|item|list'))
-                        for item in news_items:
-                            # 查找日期和标题
-                            date_elem = item.find(['span', 'div'], class_=re.compile(r'date|time'))
-                            title_elem = item.find('a')
-                            
-                            if date_elem and title_elem:
-                                date_str = date_elem.get_text().strip()
-                                title = title_elem.get_text().strip()
-                                if date_str and title:
-                                    source_news.append((date_str, title))
-                        
-                        if source_news:
-                            print(f"✅ 金融界新闻源成功，获取 {len(source_news)} 条新闻")
-                            news_list.extend(source_news)
-                            source_results['jrj'] = len(source_news)
-                            break
-                        else:
-                            print(f"❌ 金融界未找到新闻")
-                            continue
-                except Exception as e:
-                    print(f"❌ 金融界新闻源失败: {e}")
-                    continue
-                    
+            print(f"尝试新闻源 {source.label}...")
+            source_news = source.fetch(sources.format_symbol(symbol, source.symbol_format), max_pages=max_pages,
+                                       seen=seen)
+            if source_news:
+                print(f"✅ {source.label}新闻源成功，获取 {len(source_news)} 条新闻")
+                news_list.extend(source_news)
+                source_results[source.name] = len(source_news)
+                break
+            print(f"❌ {source.label}未找到新闻")
         except Exception as e:
-            print(f"❌ 新闻源 {source_idx + 1} 获取失败: {e}")
-            continue
+            print(f"❌ {source.label}新闻源获取失败: {e}")
+            failure = e
+        finally:
+            if not isinstance(failure, deadline.DeadlineExceeded):
+                health.record(f"news:{source.name}", bool(source_news), time.monotonic() - started,
+                              None if source_news else (failure or "未获取到新闻"))
     
     # 去重并排序
     unique_news = []
@@ -387,12 +208,17 @@ def fetch_news(stock_code="sh603259", max_pages=3):
             seen_titles.add(title)
     
     print(f"📰 总共获取到 {len(unique_news)} 条新闻（去重后）")
+    if index is not None and unique_news:
+        unique_news, fresh = index.merge(symbol, unique_news, NEWS_WINDOW)
+        print(f"🆕 其中新增 {len(fresh)} 条，结合此前已处理的新闻共分析最近 {len(unique_news)} 条")
     print(f"📊 各数据源贡献: {source_results}")
     
     return unique_news, source_results
 
 # 模块2：中文情绪分析 - 增强版本
-from snownlp import SnowNLP
+from sentiment import score_titles
+import headline_clusters
+import sentiment as sentiment_cache
 
 def analyze_sentiment(news_list):
     count_positive = 0
@@ -401,9 +227,14 @@ def analyze_sentiment(news_list):
     sentiment_scores = []
     
     print("\n📊 详细情绪分析:")
-    for i, (date, title) in enumerate(news_list[:10]):  # 显示前10条的分析
-        s = SnowNLP(title)
-        score = s.sentiments
+    # 近似重复的标题归为同一事件，每个事件只对代表标题评分；计数按事件，平均分按簇大小加权
+    events = headline_clusters.representatives(news_list)
+    if len(events) < len(news_list):
+        print(f"🧩 {len(news_list)} 条新闻归并为 {len(events)} 个事件")
+    scores = score_titles([title for _, title, _ in events])  # 全部标题批量评分，已评过分的直接取缓存
+    weights = [size for _, _, size in events]
+    for i, (date, title, size) in enumerate(events):
+        score = scores[i]
         sentiment_scores.append(score)
         
         if score > 0.7:
@@ -417,12 +248,13 @@ def analyze_sentiment(news_list):
             sentiment = "中性"
         
         if i < 10:  # 只显示前10条
-            print(f"  {date}: {title[:50]}... (情绪: {sentiment}, 分数: {score:.2f})")
+            print(f"  {date}: {title[:50]}...{f' ×{size}' if size > 1 else ''} (情绪: {sentiment}, 分数: {score:.2f})")
     
     total = len(news_list)
     sentiment_label = "中性"
+    avg_score = 0.5
     if total > 0:
-        avg_score = sum(sentiment_scores) / len(sentiment_scores)
+        avg_score = float(np.average(sentiment_scores, weights=weights))
         if count_negative > count_positive * 1.5:
             sentiment_label = "负面"
         elif count_positive > count_negative * 1.5:
@@ -439,244 +271,317 @@ def analyze_sentiment(news_list):
 # 模块3：技术指标分析
 import pandas as pd
 
-def fetch_stock_data(stock_code="sh603259"):
-    start_date = "20230101"
-    end_date = pd.Timestamp.today().strftime("%Y%m%d")
+# 行情数据源名称（按注册顺序，见 sources.py）
+DATA_SOURCE_NAMES = list(sources.PRICE_SOURCES)
+
+# 只有最新报价、历史K线由报价推算的数据源，结果不写入K线缓存
+SYNTHETIC_SOURCES = {name for name, source in sources.PRICE_SOURCES.items() if source.synthetic}
+
+# yfinance 默认 auto_adjust：按最新价格向前调整历史价格（拆股与分红），即前复权；
+# 与东方财富的算法细节不同时，由 ohlcv_cache.merge 的重叠校验发现并重新获取完整历史
+YFINANCE_ADJUST = 'qfq'
+
+def _source_adjust(source_name):
+    """数据源的复权方式（不在数据源表中、也不是 yfinance 的返回None，视为未知，不与缓存拼接）"""
+    if source_name == 'yfinance':
+        return YFINANCE_ADJUST
+    source = sources.PRICE_SOURCES.get(source_name)
+    return source.adjust if source is not None else None
+
+def _is_valid_ohlcv(df):
+    """检查是否为可用的K线数据（非空且包含日期与OHLCV列）"""
+    if df is None or df.empty:
+        return False
+    return all(col in df.columns for col in ['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+
+def _attempt_source(source, stock_code, start_date, end_date, count):
+    """请求一个行情数据源，并把成败、耗时与失败原因记入数据源健康记录"""
+    started = time.monotonic()
+    failure = None
+    df = None
+    try:
+        df = source.fetch(stock_code, start_date, end_date, count)
+        return df
+    except Exception as e:
+        failure = e
+        raise
+    finally:
+        # 本地时限已用完、请求根本没有发出，不算数据源的失败（否则全市场筛选到时限时会让各数据源熔断）
+        if not isinstance(failure, deadline.DeadlineExceeded):
+            ok = _is_valid_ohlcv(df)
+            source_health.get_scoreboard().record(f"price:{source.name}", ok, time.monotonic() - started,
+                                                  None if ok else (failure or "未取得有效K线"))
+
+def _race_sources(candidates, fetch_args, top_n=4, time_limit=15):
+    """竞速获取：同时请求top_n个数据源，采用最先解析成功的结果
     
-    # 扩展数据源列表
-    data_sources = [
-        # 1. 网易财经数据源（主要）
-        f"http://quotes.money.163.com/service/chddata.html?code={stock_code}&start={start_date}&end={end_date}&fields=TCLOSE;HIGH;LOW;OPEN;LCLOSE;PCHG;VOL",
-        
-        # 2. 新浪财经数据源
-        f"http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData?symbol={stock_code}&scale=240&ma=5&datalen=100",
-        
-        # 3. 东方财富数据源
-        f"http://push2his.eastmoney.com/api/qt/stock/kline/get?secid={stock_code}&fields1=f1,f2,f3,f4,f5,f6&fields2=f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61&klt=101&fqt=1&beg=0&end=20500101&smplmt=100&lmt=1000000",
-        
-        # 4. 腾讯财经数据源
-        f"http://qt.gtimg.cn/q={stock_code}",
-        
-        # 5. 雪球数据源
-        f"https://stock.xueqiu.com/v5/stock/chart/kline.json?symbol={stock_code}&period=day&type=before&count=100&indicator=kline,pe,pb,ps,pcf,market_capital,agt,ggt,balance",
-        
-        # 6. 同花顺数据源
-        f"http://d.10jqka.com.cn/v6/line/hs_{stock_code}/01/today.js",
-        
-        # 7. 大智慧数据源
-        f"http://hq.gw.com.cn/kline?code={stock_code}&period=day&count=100",
-        
-        # 8. 金融界数据源
-        f"http://q.jrjimg.cn/?q=cn|s|{stock_code}&n=hq&c=1&o=0&f=1&v=1.1",
-        
-        # 9. 和讯网数据源
-        f"http://webstock.10jqka.com.cn/hs_zfzq/hq/{stock_code}/",
-        
-        # 10. 凤凰网数据源
-        f"http://api.finance.ifeng.com/akdaily/?code={stock_code}&type=last&start={start_date}&end={end_date}"
-    ]
+    candidates 为按优先级排列的数据源适配器，fetch_args 为 (股票代码, 起始日期, 结束日期, 条数)；
+    某个数据源失败后立即补发下一个候选源，直到成功或超过time_limit秒。
+    返回 (df, 胜出的数据源, 耗时秒数)，全部失败时返回 (None, None, None)。
+    """
+    candidates = iter(candidates)
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max(1, top_n))
+    running = {}
     
-    df = None
-    for i, url in enumerate(data_sources):
+    def launch_next():
+        for source in candidates:
+            print(f"尝试数据源 {source.name}...")
+            # 在当前上下文中运行，使数据源的日志归入所属股票的输出
+            running[executor.submit(contextvars.copy_context().run, _attempt_source, source, *fetch_args)] = source
+            return True
+        return False
+    
+    try:
+        for _ in range(max(1, top_n)):
+            if not launch_next():
+                break
+        while running:
+            remaining = time_limit - (time.monotonic() - started)
+            if remaining <= 0:
+                print(f"⏱️ 行情获取超过{time_limit:.0f}秒时限，放弃剩余 {len(running)} 个数据源")
+                break
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = running.pop(future)
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"❌ 数据源 {source.name} 获取失败: {e}")
+                    df = None
+                if _is_valid_ohlcv(df):
+                    latency = time.monotonic() - started
+                    print(f"🏁 数据源 {source.name} 胜出，耗时 {latency:.2f} 秒")
+                    return df, source, latency
+                launch_next()
+    finally:
+        # 未开始的请求直接取消，进行中的请求不再等待
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return None, None, None
+
+def _yfinance_bars(stock_code):
+    """备用方案：使用yfinance（如果可用）获取最近3个月的日K线，失败时返回None"""
+    try:
+        import yfinance as yf
+        # 转换股票代码格式
+        if stock_code.startswith('sh'):
+            yahoo_code = stock_code[2:] + '.SS'
+        elif stock_code.startswith('sz'):
+            yahoo_code = stock_code[2:] + '.SZ'
+        else:
+            yahoo_code = stock_code
+        
+        ticker = yf.Ticker(yahoo_code)
+        df = ticker.history(period="3mo")
+        if df.empty:
+            print("❌ yfinance数据源也失败")
+            return None
+        df.reset_index(inplace=True)
+        df.rename(columns={
+            'Date': 'Date', 'Open': 'Open', 'High': 'High', 
+            'Low': 'Low', 'Close': 'Close', 'Volume': 'Volume'
+        }, inplace=True)
+        # 计算涨跌幅
+        df['PctChange'] = df['Close'].pct_change() * 100
+        print("✅ 使用yfinance数据源成功")
+        return df
+    except ImportError:
+        print("❌ yfinance未安装，无法使用备用数据源")
+    except Exception as e:
+        print(f"❌ yfinance数据源失败: {e}")
+    return None
+
+def _try_in_order(candidates, fetch_args):
+    """逐个尝试数据源，返回 (df, 数据源, 耗时秒数)，全部失败时返回 (None, None, None)"""
+    for source in candidates:
+        if deadline.expired():
+            print("⏱️ 行情获取时限已用完，不再尝试其余数据源")
+            break
         try:
-            print(f"尝试数据源 {i+1}...")
-            
-            if i == 0:  # 网易数据源
-                df = pd.read_csv(url, encoding='gbk')
-                if not df.empty:
-                    df.rename(columns={
-                        '日期': 'Date', '收盘价': 'Close', '最高价': 'High', '最低价': 'Low',
-                        '开盘价': 'Open', '前收盘': 'PrevClose', '涨跌幅': 'PctChange', '成交量': 'Volume'
-                    }, inplace=True)
-                    print(f"✅ 网易数据源成功")
-                    break
-                    
-            elif i == 1:  # 新浪数据源
-                import json
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    data = json.loads(resp.text)
-                    if data:
-                        df_data = []
-                        for item in data:
-                            df_data.append({
-                                'Date': item['day'],
-                                'Open': float(item['open']),
-                                'High': float(item['high']),
-                                'Low': float(item['low']),
-                                'Close': float(item['close']),
-                                'Volume': int(item['volume']),
-                                'PctChange': float(item.get('pct_chg', 0))
-                            })
-                        df = pd.DataFrame(df_data)
-                        print(f"✅ 新浪数据源成功")
-                        break
-                        
-            elif i == 2:  # 东方财富数据源
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data.get('data') and data['data'].get('klines'):
-                        df_data = []
-                        for line in data['data']['klines']:
-                            parts = line.split(',')
-                            if len(parts) >= 7:
-                                df_data.append({
-                                    'Date': parts[0],
-                                    'Open': float(parts[1]),
-                                    'Close': float(parts[2]),
-                                    'High': float(parts[3]),
-                                    'Low': float(parts[4]),
-                                    'Volume': int(parts[5]),
-                                    'PctChange': float(parts[6])
-                                })
-                        df = pd.DataFrame(df_data)
-                        print(f"✅ 东方财富数据源成功")
-                        break
-                        
-            elif i == 3:  # 腾讯数据源
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    text = resp.text
-                    if '~' in text:
-                        parts = text.split('~')
-                        if len(parts) > 30:
-                            df_data = []
-                            current_price = float(parts[3])
-                            change = float(parts[31])
-                            pct_change = float(parts[32])
-                            volume = int(parts[36])
-                            
-                            # 生成最近几天的数据
-                            for j in range(30):
-                                date = (pd.Timestamp.now() - pd.Timedelta(days=j)).strftime('%Y-%m-%d')
-                                df_data.append({
-                                    'Date': date,
-                                    'Open': current_price * (1 + np.random.normal(0, 0.01)),
-                                    'High': current_price * (1 + abs(np.random.normal(0, 0.005))),
-                                    'Low': current_price * (1 - abs(np.random.normal(0, 0.005))),
-                                    'Close': current_price,
-                                    'Volume': volume,
-                                    'PctChange': pct_change
-                                })
-                            df = pd.DataFrame(df_data)
-                            print(f"✅ 腾讯数据源成功")
-                            break
-                            
-            elif i == 4:  # 雪球数据源
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data.get('data') and data['data'].get('item'):
-                        df_data = []
-                        for item in data['data']['item']:
-                            df_data.append({
-                                'Date': item[0],
-                                'Open': float(item[1]),
-                                'High': float(item[2]),
-                                'Low': float(item[3]),
-                                'Close': float(item[4]),
-                                'Volume': int(item[5]),
-                                'PctChange': float(item[6]) if len(item) > 6 else 0
-                            })
-                        df = pd.DataFrame(df_data)
-                        print(f"✅ 雪球数据源成功")
-                        break
-                        
-            elif i == 5:  # 同花顺数据源
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    text = resp.text
-                    if 'data:' in text:
-                        # 解析同花顺数据格式
-                        data_start = text.find('data:') + 5
-                        data_end = text.find('};', data_start)
-                        if data_start > 5 and data_end > data_start:
-                            data_str = text[data_start:data_end]
-                            # 这里需要根据实际数据格式进行解析
-                            print(f"✅ 同花顺数据源成功")
-                            break
-                            
-            elif i == 6:  # 大智慧数据源
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data.get('data'):
-                        df_data = []
-                        for item in data['data']:
-                            df_data.append({
-                                'Date': item['date'],
-                                'Open': float(item['open']),
-                                'High': float(item['high']),
-                                'Low': float(item['low']),
-                                'Close': float(item['close']),
-                                'Volume': int(item['volume']),
-                                'PctChange': float(item.get('pct_change', 0))
-                            })
-                        df = pd.DataFrame(df_data)
-                        print(f"✅ 大智慧数据源成功")
-                        break
-                        
-            elif i == 7:  # 金融界数据源
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    text = resp.text
-                    if 'var hq_str_' in text:
-                        # 解析金融界数据格式
-                        print(f"✅ 金融界数据源成功")
-                        break
-                        
-            elif i == 8:  # 和讯网数据源
-                resp = requests.get(url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                if resp.status_code == 200:
-                    # 和讯网数据解析
-                    print(f"✅ 和讯网数据源成功")
-                    break
-                    
-            elif i == 9:  # 凤凰网数据源
-                df = pd.read_csv(url, encoding='utf-8')
-                if not df.empty:
-                    # 根据凤凰网的数据格式调整列名
-                    print(f"✅ 凤凰网数据源成功")
-                    break
-                    
+            print(f"尝试数据源 {source.name}...")
+            started = time.monotonic()
+            df = _attempt_source(source, *fetch_args)
+            if _is_valid_ohlcv(df):
+                return df, source, time.monotonic() - started
         except Exception as e:
-            print(f"❌ 数据源 {i+1} 获取失败: {e}")
-            continue
+            print(f"❌ 数据源 {source.name} 获取失败: {e}")
+    return None, None, None
+
+def _download_bars(stock_code, start_date="20230101", count=100, race=None, fallback=True, rotate=0,
+                   allow_synthetic=True):
+    """从各数据源下载日K线（起始日期start_date，条数上限count），返回 (df, 数据源名称, 耗时秒数)
     
-    if df is None or df.empty:
-        print("所有数据源都获取失败，使用备用方案...")
-        # 备用方案：使用yfinance（如果可用）
+    只有提供真实历史K线的数据源参与竞速；由最新报价推算K线的数据源（synthetic）不参与竞速，
+    只在真实数据源与 yfinance 都失败后才使用，避免推算出的K线抢先胜出、被当作真实历史评分。
+    race 为None时按 RACE_MODE 决定是否竞速；fallback 为False时不使用 yfinance 与推算K线，
+    allow_synthetic 为False时只不使用推算K线（已有真实K线缓存时由调用方退回缓存）；
+    rotate 把真实数据源的顺序轮转 rotate 位，批量获取时让各股票分摊到不同数据源的限流额度上。
+    """
+    end_date = pd.Timestamp.today().strftime("%Y%m%d")
+    fetch_args = (stock_code, start_date, end_date, count)
+    
+    candidates = sources.schedule_price_sources(stock_code)
+    real = [source for source in candidates if not source.synthetic]
+    synthetic = [source for source in candidates if source.synthetic]
+    if real:
+        real = real[rotate % len(real):] + real[:rotate % len(real)]
+    race_deadline = RACE_DEADLINE if deadline.remaining() is None else min(RACE_DEADLINE, deadline.remaining())
+    if RACE_MODE if race is None else race:
+        df, winner, latency = _race_sources(real, fetch_args, top_n=RACE_TOP_N, time_limit=race_deadline)
+    else:
+        df, winner, latency = _try_in_order(real, fetch_args)
+    if winner is not None:
+        return df, winner.name, latency
+    
+    if deadline.expired() or not fallback:
+        return None, None, None
+    print("所有数据源都获取失败，使用备用方案...")
+    df = _yfinance_bars(stock_code)
+    if df is not None:
+        return df, 'yfinance', None
+    if synthetic and allow_synthetic:
+        print("⚠️ 没有真实历史K线，改用由最新报价推算的K线")
+        df, winner, latency = _try_in_order(synthetic, fetch_args)
+        if winner is not None:
+            return df, winner.name, latency
+    return None, None, None
+
+# 本次运行批量获取的最新报价：股票代码 -> 报价（见 sources.fetch_latest_quotes）
+_latest_quotes = {}
+
+def load_latest_quotes(stock_codes):
+    """批量获取最新报价，供 fetch_stock_data 更新最新一根K线"""
+    started = time.monotonic()
+    quotes = sources.fetch_latest_quotes(stock_codes)
+    _latest_quotes.clear()
+    _latest_quotes.update({code: quote for code, quote in quotes.iterrows()})
+    print(f"📡 批量获取实时报价：{len(quotes)}/{len(stock_codes)} 只，耗时 {time.monotonic() - started:.2f} 秒")
+    return quotes
+
+def _apply_latest_quote(df, quote):
+    """用实时报价更新最新一根K线：与最后一根同日则覆盖，日期更新则追加（不写入K线缓存）"""
+    if pd.isna(quote['Date']) or not quote['Price'] > 0:
+        return df
+    dates = pd.to_datetime(df['Date'])
+    if quote['Date'] < dates.max():
+        return df
+    bar = {'Date': quote['Date'], 'Open': quote['Open'], 'High': quote['High'], 'Low': quote['Low'],
+           'Close': quote['Price'], 'Volume': quote['Volume'], 'PctChange': quote['PctChange']}
+    print(f"📡 实时报价更新最新K线：{quote['Date']:%Y-%m-%d} 现价 {quote['Price']:.2f}（{quote['PctChange']:+.2f}%）")
+    df = df[dates.to_numpy() != np.datetime64(quote['Date'])]
+    return pd.concat([df, pd.DataFrame([bar])], ignore_index=True)
+
+def _quote_for(stock_code):
+    """该股票的最新报价：本次已批量获取的直接取用，否则单独获取一次；取不到时返回None"""
+    if stock_code not in _latest_quotes:
         try:
-            import yfinance as yf
-            # 转换股票代码格式
-            if stock_code.startswith('sh'):
-                yahoo_code = stock_code[2:] + '.SS'
-            elif stock_code.startswith('sz'):
-                yahoo_code = stock_code[2:] + '.SZ'
-            else:
-                yahoo_code = stock_code
-            
-            ticker = yf.Ticker(yahoo_code)
-            df = ticker.history(period="3mo")
-            if not df.empty:
-                df.reset_index(inplace=True)
-                df.rename(columns={
-                    'Date': 'Date', 'Open': 'Open', 'High': 'High', 
-                    'Low': 'Low', 'Close': 'Close', 'Volume': 'Volume'
-                }, inplace=True)
-                # 计算涨跌幅
-                df['PctChange'] = df['Close'].pct_change() * 100
-                print("✅ 使用yfinance数据源成功")
+            quotes = sources.fetch_latest_quotes([stock_code])
+        except Exception as e:
+            print(f"⚠️ 获取实时报价失败: {e}")
+            return None
+        if stock_code not in quotes.index:
+            return None
+        _latest_quotes[stock_code] = quotes.loc[stock_code]
+    return _latest_quotes[stock_code]
+
+def load_bars(stock_code, race=None, fallback=True, rotate=0):
+    """取得一只股票的日K线：优先用本地缓存并增量获取，失败时退回缓存，再用实时报价更新最新一根
+    
+    已有真实K线缓存时不使用由报价推算的K线：真实数据源都失败就退回缓存，用最新报价补上最新一根。
+    race、fallback、rotate 传给 _download_bars。返回 (df, 数据源名称, 耗时秒数)，无法取得时返回 (None, None, None)。
+    """
+    cached = ohlcv_cache.load(stock_code) if OHLCV_CACHE else None
+    df = None
+    if cached is not None and not ohlcv_cache.known_units(cached):
+        print("⚠️ K线缓存没有记录数据源与成交量单位（旧版缓存），不再使用，重新获取完整历史")
+        cached = None
+    since = ohlcv_cache.fetch_start(cached)
+    if since is not None:
+        # 已有缓存：只获取缓存末尾几根K线之后的数据
+        count = len(pd.bdate_range(since, pd.Timestamp.today())) + 1
+        print(f"💾 K线缓存已有 {len(cached)} 根（截至 {cached['Date'].iloc[-1]:%Y-%m-%d}），增量获取 {since:%Y-%m-%d} 起的数据")
+        df, source_name, latency = _download_bars(stock_code, start_date=since.strftime("%Y%m%d"), count=count,
+                                                  race=race, fallback=fallback, rotate=rotate,
+                                                  allow_synthetic=False)
+        if df is None:
+            print("⚠️ 增量获取失败，使用本地缓存数据")
+            df, source_name, latency = cached, '本地缓存', None
+        elif not ohlcv_cache.compatible(cached, _source_adjust(source_name)):
+            print(f"⚠️ 增量数据来自{source_name}（复权方式 {_source_adjust(source_name)}），与缓存"
+                  f"（{cached.attrs.get('source')}，{cached.attrs.get('adjust')}）不能拼接，重新获取完整历史")
+            df = None
+        else:
+            df, report = ohlcv_cache.merge(cached, df)
+            if report['needs_full']:
+                print("⚠️ 增量数据与缓存无法衔接（可能发生了复权调整），重新获取完整历史")
+                df = None
             else:
-                print("❌ yfinance数据源也失败")
-                return None, None
-        except ImportError:
-            print("❌ yfinance未安装，无法使用备用数据源")
-            return None, None
+                print(f"💾 K线缓存合并：新增 {report['new']} 根，修正 {report['revised']} 根，共 {len(df)} 根")
+    
+    if df is None:
+        df, source_name, latency = _download_bars(stock_code, race=race, fallback=fallback, rotate=rotate,
+                                                  allow_synthetic=cached is None)
+        if df is None:
+            if cached is None:
+                return None, None, None
+            print("⚠️ 重新获取失败，使用本地缓存数据")
+            df, source_name, latency = cached, '本地缓存', None
+        elif OHLCV_CACHE and source_name not in SYNTHETIC_SOURCES:
+            df = ohlcv_cache.normalize(df)
+    
+    if OHLCV_CACHE and source_name not in SYNTHETIC_SOURCES and source_name != '本地缓存':
+        try:
+            ohlcv_cache.save(stock_code, df, source=source_name, adjust=_source_adjust(source_name))
         except Exception as e:
-            print(f"❌ yfinance数据源失败: {e}")
-            return None, None
+            print(f"⚠️ 写入K线缓存失败: {e}")
+    
+    if source_name == '本地缓存':
+        quote = _quote_for(stock_code)
+        if quote is not None:
+            df = _apply_latest_quote(df, quote)
+    elif stock_code in _latest_quotes and source_name not in SYNTHETIC_SOURCES:
+        df = _apply_latest_quote(df, _latest_quotes[stock_code])
+    return df, source_name, latency
+
+def _latest_tech(df, extra_indicators=()):
+    """由已算好指标的K线取最新一根，生成 evaluate_signals 与报告使用的技术指标字典"""
+    latest = df.iloc[-1]
+    tech = {
+        'last_date': latest['Date'].strftime("%Y-%m-%d"),
+        'last_close': latest['Close'],
+        'pct_change': latest['PctChange'],
+        'volume': latest['Volume'],
+        'ma5': latest['MA5'],
+        'ma10': latest['MA10'],
+        'ma20': latest['MA20'],
+        'diff': latest['Diff'],
+        'dea': latest['DEA'],
+        'macd_hist': latest['MACD_hist'],
+        'K': latest['K'],
+        'D': latest['D'],
+        'J': latest['J'],
+    }
+    
+    # 计算成交量是否放大
+    recent_vol_avg = df['Volume'].iloc[-6:-1].mean() if len(df) > 5 else df['Volume'].mean()
+    tech['volume_high'] = (not pd.isna(latest['Volume'])) and (latest['Volume'] > 1.2 * recent_vol_avg)
+    tech['oversold'] = latest['K'] < 20 and latest['D'] < 20
+    tech['overbought'] = latest['K'] > 80 and latest['D'] > 80
+    if extra_indicators:
+        tech['extra'] = {name: latest[name] for name in extra_indicators}
+    return tech
+
+def fetch_stock_data(stock_code="sh603259", extra_indicators=None):
+    """获取日K线并计算技术指标，返回 (df, 技术指标字典)，失败时返回 (None, None)
+    
+    只计算 TECH_INDICATORS 与 extra_indicators（默认 EXTRA_INDICATORS）及其依赖的指标，
+    额外指标的最新值放在技术指标字典的 'extra' 中。
+    """
+    extra_indicators = list(EXTRA_INDICATORS if extra_indicators is None else extra_indicators)
+    df, source_name, latency = load_bars(stock_code)
+    if df is None:
+        return None, None
     
     try:
         df['Date'] = pd.to_datetime(df['Date'])
@@ -690,62 +595,14 @@ def fetch_stock_data(stock_code="sh603259"):
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
         # 计算技术指标
-        df['MA5'] = df['Close'].rolling(window=5).mean()
-        df['MA10'] = df['Close'].rolling(window=10).mean()
-        df['MA20'] = df['Close'].rolling(window=20).mean()
-        df['EMA12'] = df['Close'].ewm(span=12, adjust=False).mean()
-        df['EMA26'] = df['Close'].ewm(span=26, adjust=False).mean()
-        df['Diff'] = df['EMA12'] - df['EMA26']
-        df['DEA'] = df['Diff'].ewm(span=9, adjust=False).mean()
-        df['MACD_hist'] = 2 * (df['Diff'] - df['DEA'])
-        
-        # KDJ计算
-        low_list = df['Low'].rolling(window=9).min()
-        high_list = df['High'].rolling(window=9).max()
-        df['RSV'] = (df['Close'] - low_list) / (high_list - low_list) * 100
-        
-        K_values = []
-        D_values = []
-        for i, rsv in enumerate(df['RSV']):
-            if i == 0 or pd.isna(rsv):
-                K = 50.0
-                D = 50.0
-            else:
-                if pd.isna(rsv):
-                    rsv = K_values[-1]
-                K = K_values[-1] * 2/3 + rsv * 1/3
-                D = D_values[-1] * 2/3 + K * 1/3
-            K_values.append(K)
-            D_values.append(D)
-        
-        df['K'] = K_values
-        df['D'] = D_values
-        df['J'] = 3 * df['K'] - 2 * df['D']
-        
-        # 获取最新数据
-        latest = df.iloc[-1]
-        tech = {
-            'last_date': latest['Date'].strftime("%Y-%m-%d"),
-            'last_close': latest['Close'],
-            'pct_change': latest['PctChange'],
-            'volume': latest['Volume'],
-            'ma5': latest['MA5'],
-            'ma10': latest['MA10'],
-            'ma20': latest['MA20'],
-            'diff': latest['Diff'],
-            'dea': latest['DEA'],
-            'macd_hist': latest['MACD_hist'],
-            'K': latest['K'],
-            'D': latest['D'],
-            'J': latest['J']
-        }
-        
-        # 计算成交量是否放大
-        recent_vol_avg = df['Volume'].iloc[-6:-1].mean() if len(df) > 5 else df['Volume'].mean()
-        tech['volume_high'] = (not pd.isna(latest['Volume'])) and (latest['Volume'] > 1.2 * recent_vol_avg)
-        tech['oversold'] = latest['K'] < 20 and latest['D'] < 20
-        tech['overbought'] = latest['K'] > 80 and latest['D'] > 80
+        requested = TECH_INDICATORS + extra_indicators
+        if len(df) < lookback(requested):
+            print(f"⚠️ 只有 {len(df)} 根K线，部分指标需要 {lookback(requested)} 根才有数值")
+        compute_indicators(df, requested)
         
+        tech = _latest_tech(df, extra_indicators)
+        tech['data_source'] = source_name
+        tech['fetch_latency'] = latency
         return df, tech
         
     except Exception as e:
@@ -754,80 +611,28 @@ def fetch_stock_data(stock_code="sh603259"):
 
 # 模块4：综合判断建议 - 增强版本
 def evaluate_signals(sentiment_label, tech, avg_sentiment_score=0.5):
-    """综合评估信号 - 增强版本"""
+    """综合评估信号 - 增强版本
     
+    评分规则与权重、阈值见 scoring.py。
+    sentiment_label 为 None（未取得新闻）时只按技术面评分，tech 为 None（未取得行情）时只按新闻情绪评分，
+    缺少的一项返回的分数为 None。
+    """
     # 1. 新闻情绪评分 (0-100分)
-    sentiment_score = 0
-    if sentiment_label == "正面":
-        sentiment_score = 80 + (avg_sentiment_score - 0.5) * 40  # 80-100分
-    elif sentiment_label == "负面":
-        sentiment_score = 20 + (avg_sentiment_score - 0.5) * 40  # 0-40分
-    else:  # 中性
-        sentiment_score = 40 + (avg_sentiment_score - 0.5) * 40  # 40-60分
+    sentiment_score = None
+    if sentiment_label is not None:
+        sentiment_score = scoring.sentiment_score(sentiment_label, avg_sentiment_score)
     
     # 2. 技术指标评分 (0-100分)
-    tech_score = 50  # 基础分
-    
-    # MACD评分
-    if tech.get('diff', 0) > tech.get('dea', 0):
-        tech_score += 10  # 多头趋势
-    else:
-        tech_score -= 10  # 空头趋势
-    
-    # KDJ评分
-    k_value = tech.get('K', 50)
-    d_value = tech.get('D', 50)
-    if k_value < 20 and d_value < 20:
-        tech_score += 15  # 超卖，买入信号
-    elif k_value > 80 and d_value > 80:
-        tech_score -= 15  # 超买，卖出信号
-    
-    # 均线评分
-    ma5 = tech.get('ma5', 0)
-    ma10 = tech.get('ma10', 0)
-    ma20 = tech.get('ma20', 0)
-    close = tech.get('last_close', 0)
-    
-    if close > ma5 > ma10 > ma20:
-        tech_score += 10  # 多头排列
-    elif close < ma5 < ma10 < ma20:
-        tech_score -= 10  # 空头排列
+    tech_score = None
+    if tech is not None:
+        tech_score = scoring.tech_score(tech)
     
-    # 成交量评分
-    if tech.get('volume_high', False):
-        tech_score += 5  # 成交量放大
-    
-    # 涨跌幅评分
-    pct_change = tech.get('pct_change', 0)
-    if pct_change > 3:
-        tech_score += 5  # 大涨
-    elif pct_change < -3:
-        tech_score -= 5  # 大跌
-    
-    # 确保分数在0-100范围内
-    tech_score = max(0, min(100, tech_score))
-    
-    # 3. 综合评分 (新闻40% + 技术60%)
-    final_score = sentiment_score * 0.4 + tech_score * 0.6
+    # 3. 综合评分 (默认新闻40% + 技术60%)，缺少一项时只用另一项
+    final_score = scoring.combine(sentiment_score, tech_score)
     
     # 4. 生成建议
-    if final_score >= 80:
-        signal = "强烈买入"
-        confidence = "高"
-    elif final_score >= 65:
-        signal = "买入"
-        confidence = "中高"
-    elif final_score >= 45:
-        signal = "持有"
-        confidence = "中"
-    elif final_score >= 30:
-        signal = "观望"
-        confidence = "中低"
-    else:
-        signal = "卖出"
-        confidence = "高"
-    
-    return signal, confidence, final_score, sentiment_score, tech_score
+    idx = scoring.signal_index(final_score)
+    return scoring.SIGNALS[idx], scoring.CONFIDENCE[idx], final_score, sentiment_score, tech_score
 
 # 模块5：保存分析结果到本地文件 - 增强版本
 def save_result_to_file(sentiment_label, tech, suggestion, confidence, scores, filename="wuxi_result.txt", stock_name="股票"):
@@ -840,8 +645,11 @@ def save_result_to_file(sentiment_label, tech, suggestion, confidence, scores, f
         # 新闻情绪分析
         f.write("📰 新闻情绪分析\n")
         f.write("-"*30 + "\n")
-        f.write(f"新闻情绪：{sentiment_label}\n")
-        f.write(f"情绪评分：{scores['sentiment']:.1f}/100\n\n")
+        if scores['sentiment'] is None:
+            f.write("新闻情绪：未获取到新闻（仅按技术面评分）\n\n")
+        else:
+            f.write(f"新闻情绪：{sentiment_label}\n")
+            f.write(f"情绪评分：{scores['sentiment']:.1f}/100\n\n")
         
         # 技术指标分析
         f.write("📈 技术指标分析\n")
@@ -852,14 +660,19 @@ def save_result_to_file(sentiment_label, tech, suggestion, confidence, scores, f
         f.write(f"均线：MA5={tech['ma5']:.2f}, MA10={tech['ma10']:.2f}, MA20={tech['ma20']:.2f}\n")
         f.write(f"MACD：DIF={tech['diff']:.2f}, DEA={tech['dea']:.2f}, Histogram={tech['macd_hist']:.2f}\n")
         f.write(f"KDJ：K={tech['K']:.1f}, D={tech['D']:.1f}, J={tech['J']:.1f}\n")
+        if tech.get('extra'):
+            f.write("其他指标：" + ", ".join(f"{name}={value:.2f}" for name, value in tech['extra'].items()) + "\n")
         f.write(f"技术信号：{'超卖' if tech['oversold'] else ('超买' if tech['overbought'] else '正常')}\n")
         f.write(f"技术评分：{scores['technical']:.1f}/100\n\n")
         
         # 综合评分
         f.write("🎯 综合评分\n")
         f.write("-"*30 + "\n")
-        f.write(f"新闻情绪评分：{scores['sentiment']:.1f}/100 (权重40%)\n")
-        f.write(f"技术指标评分：{scores['technical']:.1f}/100 (权重60%)\n")
+        if scores['sentiment'] is None:
+            f.write(f"技术指标评分：{scores['technical']:.1f}/100 (权重100%)\n")
+        else:
+            f.write(f"新闻情绪评分：{scores['sentiment']:.1f}/100 (权重{scoring.SENTIMENT_WEIGHT:.0%})\n")
+            f.write(f"技术指标评分：{scores['technical']:.1f}/100 (权重{1 - scoring.SENTIMENT_WEIGHT:.0%})\n")
         f.write(f"综合评分：{scores['final']:.1f}/100\n\n")
         
         # 操作建议
@@ -867,7 +680,7 @@ def save_result_to_file(sentiment_label, tech, suggestion, confidence, scores, f
         f.write("-"*30 + "\n")
         f.write(f"建议：{suggestion}\n")
         f.write(f"置信度：{confidence}\n")
-        f.write(f"风险等级：{'低' if scores['final'] >= 65 else ('中' if scores['final'] >= 45 else '高')}\n\n")
+        f.write(f"风险等级：{scoring.RISK_LEVELS[scoring.signal_index(scores['final'])]}\n\n")
         
         # 风险提示
         f.write("⚠️ 风险提示\n")
@@ -889,146 +702,136 @@ def send_wechat(msg, title="wuxi_analysis分析结果"):
     url = f"https://sctapi.ftqq.com/{SCKEY}.send"
     data = {"title": title, "desp": msg}
     try:
-        resp = requests.post(url, data=data, timeout=10)
+        resp = http_client.post(url, data=data)
         print("微信推送结果:", resp.text)
     except Exception as e:
         print("微信推送失败:", e)
 
-if __name__ == "__main__":
-    import io, sys
-    buf = io.StringIO()
-    sys_stdout = sys.stdout
-    sys.stdout = buf
+_PLOT_LOCK = threading.Lock()
 
-    print("=== 药明康德股票分析系统 ===")
+def analyze_stock(stock):
+    """分析单只股票：新闻情绪 + 技术指标 + 综合建议，返回结果摘要，无法获取数据时返回None
+    
+    整个分析在 SYMBOL_BUDGET 秒的总时限内完成，各请求的超时不超过剩余时间；时限内只取得新闻或只取得
+    行情时降级为仅新闻或仅技术面评分（结果中的 degraded 注明）。
+    """
+    with deadline.budget(SYMBOL_BUDGET):
+        return _analyze_stock(stock)
+
+def _print_risk_news(news_list):
+    # 按关键词表（risk_keywords.txt）扫描新闻标题，列出命中的风险词
+    warning_news = risk_scanner.scan_news(news_list)
+    if warning_news:
+        print("⚠️ 风险公告提示：")
+        for _, title, matches in warning_news:
+            terms = "、".join(dict.fromkeys(word for word, _ in matches))
+            print(f" - {title}（{terms}）")
+
+def _news_only_result(stock, sentiment_label, avg_score, news_list):
+    """未取得行情时只按新闻情绪给出建议"""
+    suggestion, confidence, final_score, sentiment_score, _ = evaluate_signals(sentiment_label, None, avg_score)
+    print("\n========= 综合分析结论（未取得行情，仅按新闻情绪评分） =========")
+    print(f"📰 新闻面情绪: {sentiment_label}")
+    print(f"🎯 综合评分: {final_score:.1f}/100 (仅新闻{sentiment_score:.1f})")
+    print(f"💡 操作建议：{suggestion} (置信度: {confidence})")
+    _print_risk_news(news_list)
+    print("\n" + "="*50)
+    print("✅ 分析完成（仅新闻）！")
+    return {
+        'code': stock['code'],
+        'name': stock['name'],
+        'signal': suggestion,
+        'confidence': confidence,
+        'final_score': final_score,
+        'degraded': '仅新闻'
+    }
+
+def _analyze_stock(stock):
+    print(f"\n========== 正在分析：{stock['name']}（{stock['code']}） ==========")
+    
+    # 获取新闻数据
     if OFFLINE_MODE:
-        print("📱 当前运行模式：离线模式（使用模拟数据）")
+        news_list = generate_mock_news_data()
+        source_results = {'mock': len(news_list)}
+        print(f"📰 生成 {len(news_list)} 条模拟新闻")
     else:
-        print("🌐 当前运行模式：在线模式（获取真实数据）")
-    
-    for stock in stock_list:
-        print(f"\n========== 正在分析：{stock['name']}（{stock['code']}） ==========")
-        
-        # 获取新闻数据
-        if OFFLINE_MODE:
-            news_list = generate_mock_news_data()
-            source_results = {'mock': len(news_list)}
-            print(f"📰 生成 {len(news_list)} 条模拟新闻")
-        else:
+        # 新闻最多占用总时限的 NEWS_BUDGET_SHARE，给行情获取留出时间
+        with deadline.budget(SYMBOL_BUDGET * NEWS_BUDGET_SHARE if SYMBOL_BUDGET else None):
             news_list, source_results = fetch_news(stock_code=stock['code'], max_pages=2)
-        
-        # 新闻源统计信息
-        news_source_info = f"新闻总数：{len(news_list)} 条\n"
-        if source_results:
-            for src, count in source_results.items():
-                news_source_info += f" - {src}：{count} 条\n"
-        print("【新闻数据源统计】")
-        print(news_source_info)
-        
-        sentiment_label, pos_count, neu_count, neg_count, avg_score = analyze_sentiment(news_list)
-        
-        # 获取股票数据
-        if OFFLINE_MODE:
-            df = generate_mock_stock_data(stock['code'], days=100)
-            print("📊 使用模拟股票数据")
-            tech_ind = None
-        else:
-            df, tech_ind = fetch_stock_data(stock_code=stock['code'])
-            if tech_ind is None:
-                print("无法获取股票数据，跳过。")
-                continue
-        
-        # 计算技术指标
-        if OFFLINE_MODE:
-            df['MA5'] = df['Close'].rolling(window=5).mean()
-            df['MA10'] = df['Close'].rolling(window=10).mean()
-            df['MA20'] = df['Close'].rolling(window=20).mean()
-            df['EMA12'] = df['Close'].ewm(span=12, adjust=False).mean()
-            df['EMA26'] = df['Close'].ewm(span=26, adjust=False).mean()
-            df['Diff'] = df['EMA12'] - df['EMA26']
-            df['DEA'] = df['Diff'].ewm(span=9, adjust=False).mean()
-            df['MACD_hist'] = 2 * (df['Diff'] - df['DEA'])
-            
-            # KDJ计算
-            low_list = df['Low'].rolling(window=9).min()
-            high_list = df['High'].rolling(window=9).max()
-            df['RSV'] = (df['Close'] - low_list) / (high_list - low_list) * 100
-            
-            K_values = []
-            D_values = []
-            for i, rsv in enumerate(df['RSV']):
-                if i == 0 or pd.isna(rsv):
-                    K = 50.0
-                    D = 50.0
-                else:
-                    if pd.isna(rsv):
-                        rsv = K_values[-1]
-                    K = K_values[-1] * 2/3 + rsv * 1/3
-                    D = D_values[-1] * 2/3 + K * 1/3
-                K_values.append(K)
-                D_values.append(D)
-            
-            df['K'] = K_values
-            df['D'] = D_values
-            df['J'] = 3 * df['K'] - 2 * df['D']
-            
-            # 获取最新数据
-            latest = df.iloc[-1]
-            recent_vol_avg = df['Volume'].iloc[-6:-1].mean() if len(df) > 5 else df['Volume'].mean()
-            
-            tech_ind = {
-                'last_date': latest['Date'].strftime("%Y-%m-%d"),
-                'last_close': latest['Close'],
-                'pct_change': latest['PctChange'],
-                'volume': latest['Volume'],
-                'ma5': latest['MA5'],
-                'ma10': latest['MA10'],
-                'ma20': latest['MA20'],
-                'diff': latest['Diff'],
-                'dea': latest['DEA'],
-                'macd_hist': latest['MACD_hist'],
-                'K': latest['K'],
-                'D': latest['D'],
-                'J': latest['J'],
-                'volume_high': latest['Volume'] > 1.2 * recent_vol_avg,
-                'oversold': latest['K'] < 20 and latest['D'] < 20,
-                'overbought': latest['K'] > 80 and latest['D'] > 80
-            }
-
-        print(f"\n📈 最近交易日({tech_ind['last_date']})收盘: {tech_ind['last_close']:.2f} 元  涨跌: {tech_ind['pct_change']:.2f}%  成交量: {tech_ind['volume']:,}")
-        print(f"📊 均线: MA5={tech_ind['ma5']:.2f}, MA10={tech_ind['ma10']:.2f}, MA20={tech_ind['ma20']:.2f}")
-        if tech_ind['K'] < 20 or tech_ind['D'] < 20:
-            kdj_status = "超卖区"
-        elif tech_ind['K'] > 80 or tech_ind['D'] > 80:
-            kdj_status = "超买区"
-        else:
-            kdj_status = "中性区"
-        print(f"📉 KDJ指标: K={tech_ind['K']:.1f}, D={tech_ind['D']:.1f}, J={tech_ind['J']:.1f} ({kdj_status})")
-        macd_status = "多头" if tech_ind['diff'] > tech_ind['dea'] else "空头"
-        print(f"📊 MACD指标: DIF={tech_ind['diff']:.2f}, DEA={tech_ind['dea']:.2f}, 状态: {macd_status}趋势")
+    
+    # 新闻源统计信息
+    news_source_info = f"新闻总数：{len(news_list)} 条\n"
+    if source_results:
+        for src, count in source_results.items():
+            news_source_info += f" - {src}：{count} 条\n"
+    print("【新闻数据源统计】")
+    print(news_source_info)
+    
+    sentiment_label, pos_count, neu_count, neg_count, avg_score = analyze_sentiment(news_list)
+    
+    # 获取股票数据
+    if OFFLINE_MODE:
+        df = generate_mock_stock_data(stock['code'], days=100)
+        print("📊 使用模拟股票数据")
+        tech_ind = None
+    else:
+        df, tech_ind = fetch_stock_data(stock_code=stock['code'])
+        if tech_ind is None:
+            if news_list:
+                return _news_only_result(stock, sentiment_label, avg_score, news_list)
+            print("无法获取股票数据，跳过。")
+            return None
+    
+    # 计算技术指标
+    if OFFLINE_MODE:
+        compute_indicators(df, TECH_INDICATORS + list(EXTRA_INDICATORS))
+        tech_ind = _latest_tech(df, EXTRA_INDICATORS)
 
-        # 综合评估
-        suggestion, confidence, final_score, sentiment_score, tech_score = evaluate_signals(sentiment_label, tech_ind, avg_score)
-        
-        print("\n========= 综合分析结论 =========")
-        print(f"📰 新闻面情绪: {sentiment_label}，📈 技术面信号: {'超卖' if tech_ind['oversold'] else ('超买' if tech_ind['overbought'] else '正常')}")
+    if tech_ind.get('data_source'):
+        latency_info = f"，耗时 {tech_ind['fetch_latency']:.2f} 秒" if tech_ind.get('fetch_latency') is not None else ""
+        print(f"🔌 行情数据源: {tech_ind['data_source']}{latency_info}")
+    print(f"\n📈 最近交易日({tech_ind['last_date']})收盘: {tech_ind['last_close']:.2f} 元  涨跌: {tech_ind['pct_change']:.2f}%  成交量: {tech_ind['volume']:,}")
+    print(f"📊 均线: MA5={tech_ind['ma5']:.2f}, MA10={tech_ind['ma10']:.2f}, MA20={tech_ind['ma20']:.2f}")
+    if tech_ind['K'] < 20 or tech_ind['D'] < 20:
+        kdj_status = "超卖区"
+    elif tech_ind['K'] > 80 or tech_ind['D'] > 80:
+        kdj_status = "超买区"
+    else:
+        kdj_status = "中性区"
+    print(f"📉 KDJ指标: K={tech_ind['K']:.1f}, D={tech_ind['D']:.1f}, J={tech_ind['J']:.1f} ({kdj_status})")
+    macd_status = "多头" if tech_ind['diff'] > tech_ind['dea'] else "空头"
+    print(f"📊 MACD指标: DIF={tech_ind['diff']:.2f}, DEA={tech_ind['dea']:.2f}, 状态: {macd_status}趋势")
+    if tech_ind.get('extra'):
+        print("📐 其他指标: " + ", ".join(f"{name}={value:.2f}" for name, value in tech_ind['extra'].items()))
+
+    # 综合评估（没有新闻时只按技术面评分）
+    suggestion, confidence, final_score, sentiment_score, tech_score = evaluate_signals(
+        sentiment_label if news_list else None, tech_ind, avg_score)
+    
+    print("\n========= 综合分析结论 =========")
+    print(f"📰 新闻面情绪: {sentiment_label if news_list else '未获取到新闻'}，📈 技术面信号: {'超卖' if tech_ind['oversold'] else ('超买' if tech_ind['overbought'] else '正常')}")
+    if sentiment_score is None:
+        print(f"🎯 综合评分: {final_score:.1f}/100 (仅技术{tech_score:.1f})")
+    else:
         print(f"🎯 综合评分: {final_score:.1f}/100 (新闻{sentiment_score:.1f} + 技术{tech_score:.1f})")
-        print(f"💡 操作建议：{suggestion} (置信度: {confidence})")
-
-        # 保存结果文本
-        filename_txt = f"{stock['name']}_分析结果.txt"
-        scores = {
-            'sentiment': sentiment_score,
-            'technical': tech_score,
-            'final': final_score
-        }
-        save_result_to_file(sentiment_label, tech_ind, suggestion, confidence, scores, filename=filename_txt, stock_name=stock['name'])
-
-        # 生成可视化图（保存为PNG）
-        try:
-            import matplotlib.pyplot as plt
-            import matplotlib.font_manager as fm
-            
+    print(f"💡 操作建议：{suggestion} (置信度: {confidence})")
+
+    # 保存结果文本
+    filename_txt = f"{stock['name']}_分析结果.txt"
+    scores = {
+        'sentiment': sentiment_score,
+        'technical': tech_score,
+        'final': final_score
+    }
+    save_result_to_file(sentiment_label, tech_ind, suggestion, confidence, scores, filename=filename_txt, stock_name=stock['name'])
+
+    # 生成可视化图（保存为PNG）
+    try:
+        import matplotlib.pyplot as plt
+        import matplotlib.font_manager as fm
+        
+        # pyplot 不是线程安全的，并发分析时逐个绘图
+        with _PLOT_LOCK:
             plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
             plt.rcParams['axes.unicode_minus'] = False
             
@@ -1045,20 +848,275 @@ if __name__ == "__main__":
             plt.tight_layout()
             plt.savefig(f"{stock['name']}_走势图.png", dpi=150, bbox_inches='tight')
             plt.close()
-            print(f"📊 走势图已保存为 {stock['name']}_走势图.png")
+        print(f"📊 走势图已保存为 {stock['name']}_走势图.png")
+    except Exception as e:
+        print(f"❌ 绘图失败: {e}")
+
+    _print_risk_news(news_list)
+
+    print("\n" + "="*50)
+    print("✅ 分析完成！")
+
+    return {
+        'code': stock['code'],
+        'name': stock['name'],
+        'signal': suggestion,
+        'confidence': confidence,
+        'final_score': final_score,
+        'degraded': None if news_list else '仅技术面'
+    }
+
+# 模块6：多股票并发分析
+_captured_output = contextvars.ContextVar('captured_output', default=None)
+
+class _OutputRouter:
+    """按上下文分流的stdout：正在分析某只股票的线程写入该股票自己的缓冲区"""
+    
+    def __init__(self, default):
+        self._default = default
+    
+    def write(self, s):
+        buf = _captured_output.get()
+        return (buf if buf is not None else self._default).write(s)
+    
+    def flush(self):
+        self._default.flush()
+
+def _run_captured(func, stock):
+    """在独立输出缓冲区中分析一只股票，异常只影响该股票本身"""
+    buf = io.StringIO()
+    token = _captured_output.set(buf)
+    try:
+        result = func(stock)
+    except Exception as e:
+        print(f"❌ 分析 {stock['name']}（{stock['code']}）失败: {e}")
+        result = None
+    finally:
+        _captured_output.reset(token)
+    return buf.getvalue(), result
+
+def run_pipeline(stocks, max_workers=None):
+    """并发分析多只股票
+    
+    最多同时分析max_workers只股票（默认MAX_CONCURRENCY），各股票的日志按stocks顺序依次输出，
+    单只股票失败不影响其余股票。返回与stocks顺序一致的结果列表（失败为None）。
+    """
+    max_workers = max(1, max_workers or MAX_CONCURRENCY)
+    if LATEST_QUOTES and not OFFLINE_MODE:
+        try:
+            load_latest_quotes([stock['code'] for stock in stocks])
         except Exception as e:
-            print(f"❌ 绘图失败: {e}")
-
-        # 公告关键词识别示例（简化版）
-        risk_keywords = ['减持', '问询函', '诉讼', '亏损', '下修', '退市']
-        warning_news = [title for _, title in news_list if any(k in title for k in risk_keywords)]
-        if warning_news:
-            print("⚠️ 风险公告提示：")
-            for title in warning_news:
-                print(" -", title)
-
-        print("\n" + "="*50)
-        print("✅ 分析完成！")
+            print(f"⚠️ 批量获取实时报价失败，使用各数据源的K线: {e}")
+    stdout = sys.stdout
+    sys.stdout = _OutputRouter(stdout)
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_run_captured, analyze_stock, stock) for stock in stocks]
+            for future in futures:
+                output, result = future.result()
+                stdout.write(output)
+                results.append(result)
+    finally:
+        sys.stdout = stdout
+    return results
+
+# 模块7：全市场筛选
+# python wuxi_analysis.py screen [N]：对沪深全部A股只按技术面评分（不抓新闻），列出综合评分最高的N只
+SCREEN_TOP_N = 30
+SCREEN_BUDGET = 180     # 全市场筛选的总时限（秒），到时仍未取得K线的股票不参与排名
+SCREEN_MIN_BARS = 30    # K线少于该数的股票（次新股）不参与排名
+
+def _is_current(last_date, quote_date):
+    """截至 last_date 的K线是否已含报价日前一个交易日（只需用报价补上最新一根，不必再增量获取）"""
+    if last_date is None or pd.isna(quote_date):
+        return False
+    return len(pd.bdate_range(pd.Timestamp(last_date), quote_date)) <= 2
+
+def _screen_bars(stock):
+    """筛选用的日K线：缓存已是最新时直接用批量报价补上最新一根，否则在时限内按 load_bars 获取
+
+    全市场有数千只股票，逐只竞速会让每只股票同时占用多个数据源的限流额度，因此这里不竞速：
+    按 stock['rotate'] 轮转数据源顺序，各股票先试不同的数据源，失败再依次尝试其余数据源；
+    也不使用 yfinance 与由报价推算的K线，推算K线不能参与排名。
+    """
+    code = stock['code']
+    quote = _latest_quotes.get(code)
+    cached = ohlcv_cache.load(code) if OHLCV_CACHE else None
+    if (ohlcv_cache.known_units(cached) and len(cached) and quote is not None
+            and _is_current(cached['Date'].iloc[-1], quote['Date'])):
+        return _apply_latest_quote(cached, quote)
+    if deadline.expired():
+        return None
+    return load_bars(code, race=False, fallback=False, rotate=stock.get('rotate', 0))[0]
+
+_PANEL_COLUMNS = ['Close', 'High', 'Low', 'Volume', 'PctChange']
+
+def _store_panel(store, codes, length):
+    """从全市场K线存储直接取出 (N, length) 面板，再按 _apply_latest_quote 的规则用批量报价更新最新一根"""
+    panel = store.panel(codes, length)
+    for row, code in enumerate(codes):
+        quote = _latest_quotes[code]
+        if pd.isna(quote['Date']) or not quote['Price'] > 0 or quote['Date'] < panel['last_date'][row]:
+            continue
+        if quote['Date'] > panel['last_date'][row]:
+            # 新的一根：整行左移一格（length 比最长历史多留了一格，不会丢掉K线）
+            for col in _PANEL_COLUMNS:
+                panel[col][row, :-1] = panel[col][row, 1:]
+            panel['last_date'][row] = quote['Date']
+        bar = {'Close': quote['Price'], 'High': quote['High'], 'Low': quote['Low'],
+               'Volume': quote['Volume'], 'PctChange': quote['PctChange']}
+        for col, value in bar.items():
+            panel[col][row, -1] = value
+    return panel
+
+def run_screen(top_n=SCREEN_TOP_N, time_limit=SCREEN_BUDGET, symbols=None, max_workers=None):
+    """全市场筛选
+    
+    获取沪深A股列表（symbols 为 [(代码, 名称), ...] 时只筛选这些股票），批量获取实时报价。
+    全市场K线存储（universe_store）中已是最新的股票直接从内存映射取出K线、用报价补上最新一根，
+    其余股票按K线缓存/增量获取（不竞速）在 time_limit 秒内并发取得，已有缓存、只需增量获取的股票先取，
+    之后刷新存储；全部K线堆叠后一次算出指标，逐只用 evaluate_signals 评分，
+    用容量为 top_n 的小顶堆保留评分最高的股票。
+    返回 (ranked, coverage)：ranked 为按评分从高到低排列的 [(综合评分, 代码, 名称, 建议, 技术指标字典), ...]，
+    coverage 为 {'total', 'covered', 'from_store', 'missing', 'short'}（参与排名、取自存储、
+    未能在时限内取得K线、K线不足 SCREEN_MIN_BARS 的股票数）。
+    """
+    started = time.monotonic()
+    with deadline.budget(time_limit):
+        if symbols is None:
+            symbols = sources.fetch_symbol_list()
+            print(f"📋 沪深A股列表：{len(symbols)} 只，耗时 {time.monotonic() - started:.2f} 秒")
+        if not symbols:
+            print("❌ 未获取到股票列表，无法筛选")
+            return [], {'total': 0, 'covered': 0, 'from_store': 0, 'missing': 0, 'short': 0}
+        names = dict(symbols)
+        codes = list(names)
+        try:
+            load_latest_quotes(codes)
+        except Exception as e:
+            print(f"⚠️ 批量获取实时报价失败，全部按K线缓存/逐只获取: {e}")
+        
+        store = universe_store.get_store() if OHLCV_CACHE else None
+        from_store, rest = [], []
+        for code in codes:
+            quote = _latest_quotes.get(code)
+            if store is not None and code in store and quote is not None \
+                    and _is_current(store.last_date(code), quote['Date']):
+                from_store.append(code)
+            else:
+                rest.append(code)
+        # 冷启动的股票需要获取完整历史，排在只需增量获取的股票之后，时限不够时先保住有缓存的股票
+        if store is not None:
+            rest.sort(key=lambda code: code not in store)
+        
+        # 逐只获取K线的日志量很大，各股票的输出丢弃，只统计结果
+        stdout = sys.stdout
+        sys.stdout = _OutputRouter(stdout)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers or MAX_CONCURRENCY)) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, _run_captured, _screen_bars,
+                                           {'code': code, 'name': names[code], 'rotate': i})
+                           for i, code in enumerate(rest)]
+                frames = [future.result()[1] for future in futures]
+        finally:
+            sys.stdout = stdout
+    fetched = time.monotonic()
+    
+    store_codes = [code for code in from_store if store.length(code) >= SCREEN_MIN_BARS]
+    usable = [(code, df) for code, df in zip(rest, frames) if df is not None and len(df) >= SCREEN_MIN_BARS]
+    missing = sum(df is None for df in frames)
+    coverage = {'total': len(codes), 'covered': len(store_codes) + len(usable), 'from_store': len(store_codes),
+                'missing': missing, 'short': len(codes) - len(store_codes) - len(usable) - missing}
+    print(f"📈 K线就绪 {coverage['covered']}/{len(codes)} 只（其中 {len(from_store)} 只直接取自全市场K线存储），"
+          f"耗时 {fetched - started:.1f} 秒" + (f"（{missing} 只未能在时限内取得K线，本次不参与排名）" if missing else ""))
+    
+    length = max([store.length(code) + 1 for code in store_codes] + [len(df) for _, df in usable], default=0)
+    panels = [stack_frames([df for _, df in usable], length)]
+    if store_codes:
+        panels.insert(0, _store_panel(store, store_codes, length))
+    # 恢复股票列表中的顺序，同分时排名与存储是否命中无关
+    position = {code: i for i, code in enumerate(codes)}
+    ordered = store_codes + [code for code, _ in usable]
+    order = sorted(range(len(ordered)), key=lambda i: position[ordered[i]])
+    ordered = [ordered[i] for i in order]
+    panel = {col: np.vstack([p[col] for p in panels])[order] for col in _PANEL_COLUMNS}
+    last_dates = [d for p in panels for d in p['last_date']]
+    panel['last_date'] = [last_dates[i] for i in order]
+    
+    techs = panel_tech(panel)
+    heap = []
+    for seq, (code, tech) in enumerate(zip(ordered, techs)):
+        if tech is None:
+            continue
+        signal, _, final_score, _, _ = evaluate_signals(None, tech)
+        # 同分时先出现的排在前面；seq 各不相同，不会比较到后面的字典
+        entry = (final_score, -seq, code, signal, tech)
+        if len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+    ranked = [(score, code, names[code], signal, tech)
+              for score, _, code, signal, tech in sorted(heap, reverse=True)]
+    print(f"🧮 指标计算与评分 {len(ordered)} 只，耗时 {time.monotonic() - fetched:.2f} 秒；"
+          f"全市场筛选共耗时 {time.monotonic() - started:.1f} 秒")
+    
+    if OHLCV_CACHE and rest:
+        report = universe_store.refresh()
+        print(f"🗄️ 全市场K线存储已刷新：{report['symbols']} 只股票，重新读取 {report['reloaded']} 只，"
+              f"耗时 {report['seconds']:.1f} 秒")
+    return ranked, coverage
+
+def format_screen(ranked, coverage=None):
+    """全市场筛选结果的文本表格；给出 coverage（见 run_screen）时先列出参与排名的股票数"""
+    lines = []
+    if coverage is not None:
+        total = coverage['total']
+        lines.append(f"📊 参与排名 {coverage['covered']}/{total} 只"
+                     f"（{coverage['covered'] / total * 100 if total else 0:.1f}%）")
+        if coverage['missing']:
+            lines.append(f"⚠️ {coverage['missing']} 只未能在时限内取得K线，未参与排名，以下结果并非全市场排名；"
+                         f"再次运行时会先用已缓存的K线")
+        if coverage['short']:
+            lines.append(f"ℹ️ {coverage['short']} 只K线不足 {SCREEN_MIN_BARS} 根（次新股），未参与排名")
+    lines += [f"🏆 全市场技术面评分前 {len(ranked)} 名：",
+              f"{'排名':<4}{'代码':<10}{'名称':<8}{'现价':>8}{'涨跌幅':>8}{'评分':>6}  建议"]
+    for i, (score, code, name, signal, tech) in enumerate(ranked, 1):
+        lines.append(f"{i:<6}{code:<12}{name:<8}{tech['last_close']:>10.2f}{tech['pct_change']:>+9.2f}%"
+                     f"{score:>8.0f}  {signal}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    buf = io.StringIO()
+    sys_stdout = sys.stdout
+    sys.stdout = buf
+
+    print("=== 药明康德股票分析系统 ===")
+    if OFFLINE_MODE:
+        print("📱 当前运行模式：离线模式（使用模拟数据）")
+    else:
+        print("🌐 当前运行模式：在线模式（获取真实数据）")
+    http_client.set_cassette(HTTP_CASSETTE)
+    http_client.set_stub_server(STUB_SERVER)
+    if STUB_SERVER:
+        print(f"🧪 模拟服务器模式：所有请求改发到 {STUB_SERVER}")
+    if HTTP_CASSETTE == 'replay':
+        print(f"📼 回放模式：使用录制 {http_client.CASSETTE_NAME} 中的响应，不联网")
+    elif HTTP_CASSETTE == 'record':
+        print(f"📼 录制模式：原始响应保存到录制 {http_client.CASSETTE_NAME}")
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'screen':
+        print(format_screen(*run_screen(int(sys.argv[2]) if len(sys.argv) > 2 else SCREEN_TOP_N)))
+    else:
+        run_pipeline(stock_list)
+    
+    print("\n" + http_client.format_stats())
+    print(rate_limit.format_stats())
+    print(sentiment_cache.format_stats())
+    print(source_health.format_stats())
+    print(news_index.format_stats())
+    print(risk_scanner.format_stats())
+    print(universe_store.format_stats())
 
     sys.stdout = sys_stdout
     result_str = buf.getvalue()
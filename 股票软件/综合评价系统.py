@@ -5,22 +5,32 @@
 整合多个权威数据源，生成综合投资建议
 """
 
-import requests
+import sys
+import http_client
+import rate_limit
+import kline_parsers
+import news_index
+import headline_clusters
+import scoring
 from bs4 import BeautifulSoup
 import json
 import re
 from datetime import datetime
 import pandas as pd
 import numpy as np
-from snownlp import SnowNLP
+from sentiment import score_titles
+import sentiment as sentiment_cache
+from indicators import compute_indicators, TECH_INDICATORS
 
 class StockAnalyzer:
     """股票分析器"""
     
+    # 参与情绪分析的最近新闻条数上限（含新闻索引中此前已处理的新闻）
+    NEWS_WINDOW = 60
+    
     def __init__(self, stock_code, stock_name):
         self.stock_code = stock_code
         self.stock_name = stock_name
-        self.headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
         
     def fetch_all_news(self):
         """获取所有可用数据源的新闻"""
@@ -52,6 +62,10 @@ class StockAnalyzer:
                 seen_titles.add(title)
         
         print(f"📊 总计获取 {len(unique_news)} 条新闻（去重后）")
+        if unique_news:
+            # 记入跨运行的新闻索引，与此前已处理的新闻合起来分析最近 NEWS_WINDOW 条
+            unique_news, fresh = news_index.get_index().merge(self.stock_code, unique_news, self.NEWS_WINDOW)
+            print(f"🆕 其中新增 {len(fresh)} 条，共分析最近 {len(unique_news)} 条")
         print(f"📈 数据源贡献: {source_results}")
         
         return unique_news, source_results
@@ -62,7 +76,7 @@ class StockAnalyzer:
         params = {"symbol": self.stock_code, "Page": 1}
         
         try:
-            resp = requests.get(url, params=params, headers=self.headers, timeout=10)
+            resp = http_client.get(url, params=params)
             if resp.status_code == 200:
                 resp.encoding = 'gbk'
                 soup = BeautifulSoup(resp.text, 'html.parser')
@@ -92,7 +106,7 @@ class StockAnalyzer:
         params = {"cb": "jQuery", "pageSize": 20, "pageIndex": 1, "stock": self.stock_code}
         
         try:
-            resp = requests.get(url, params=params, headers=self.headers, timeout=10)
+            resp = http_client.get(url, params=params)
             if resp.status_code == 200 and resp.text:
                 content = resp.text
                 news_list = []
@@ -130,9 +144,14 @@ class StockAnalyzer:
         sentiment_scores = []
         
         print("📰 详细情绪分析:")
-        for i, (date, title) in enumerate(news_list[:10]):  # 显示前10条
-            s = SnowNLP(title)
-            score = s.sentiments
+        # 近似重复的标题归为同一事件，每个事件只对代表标题评分；计数按事件，平均分按簇大小加权
+        events = headline_clusters.representatives(news_list)
+        if len(events) < len(news_list):
+            print(f"🧩 {len(news_list)} 条新闻归并为 {len(events)} 个事件")
+        scores = score_titles([title for _, title, _ in events])  # 全部标题批量评分，已评过分的直接取缓存
+        weights = [size for _, _, size in events]
+        for i, (date, title, size) in enumerate(events):
+            score = scores[i]
             sentiment_scores.append(score)
             
             if score > 0.7:
@@ -146,11 +165,11 @@ class StockAnalyzer:
                 sentiment = "中性"
             
             if i < 10:
-                print(f"  {date}: {title[:50]}... (情绪: {sentiment}, 分数: {score:.2f})")
+                print(f"  {date}: {title[:50]}...{f' ×{size}' if size > 1 else ''} (情绪: {sentiment}, 分数: {score:.2f})")
         
         # 计算总体情绪
         total = len(news_list)
-        avg_score = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.5
+        avg_score = float(np.average(sentiment_scores, weights=weights)) if sentiment_scores else 0.5
         
         sentiment_label = "中性"
         if total > 0:
@@ -174,59 +193,16 @@ class StockAnalyzer:
         params = {"symbol": self.stock_code, "scale": 240, "ma": 5, "datalen": 100}
         
         try:
-            resp = requests.get(url, params=params, headers=self.headers, timeout=10)
+            resp = http_client.get(url, params=params)
             if resp.status_code == 200:
-                data = resp.json()
-                if data:
-                    df_data = []
-                    for item in data:
-                        df_data.append({
-                            'Date': item['day'],
-                            'Open': float(item['open']),
-                            'High': float(item['high']),
-                            'Low': float(item['low']),
-                            'Close': float(item['close']),
-                            'Volume': int(item['volume']),
-                            'PctChange': float(item.get('pct_chg', 0))
-                        })
-                    
-                    df = pd.DataFrame(df_data)
+                df = kline_parsers.parse_sina_klines(resp.text)
+                if df is not None:
                     df['Date'] = pd.to_datetime(df['Date'])
                     df.sort_values('Date', inplace=True)
                     df.reset_index(drop=True, inplace=True)
                     
-                    # 计算技术指标
-                    df['MA5'] = df['Close'].rolling(window=5).mean()
-                    df['MA10'] = df['Close'].rolling(window=10).mean()
-                    df['MA20'] = df['Close'].rolling(window=20).mean()
-                    df['EMA12'] = df['Close'].ewm(span=12, adjust=False).mean()
-                    df['EMA26'] = df['Close'].ewm(span=26, adjust=False).mean()
-                    df['Diff'] = df['EMA12'] - df['EMA26']
-                    df['DEA'] = df['Diff'].ewm(span=9, adjust=False).mean()
-                    df['MACD_hist'] = 2 * (df['Diff'] - df['DEA'])
-                    
-                    # KDJ计算
-                    low_list = df['Low'].rolling(window=9).min()
-                    high_list = df['High'].rolling(window=9).max()
-                    df['RSV'] = (df['Close'] - low_list) / (high_list - low_list) * 100
-                    
-                    K_values = []
-                    D_values = []
-                    for i, rsv in enumerate(df['RSV']):
-                        if i == 0 or pd.isna(rsv):
-                            K = 50.0
-                            D = 50.0
-                        else:
-                            if pd.isna(rsv):
-                                rsv = K_values[-1]
-                            K = K_values[-1] * 2/3 + rsv * 1/3
-                            D = D_values[-1] * 2/3 + K * 1/3
-                        K_values.append(K)
-                        D_values.append(D)
-                    
-                    df['K'] = K_values
-                    df['D'] = D_values
-                    df['J'] = 3 * df['K'] - 2 * df['D']
+                    # 计算技术指标（均线、MACD、KDJ 及其依赖的中间指标）
+                    compute_indicators(df, TECH_INDICATORS)
                     
                     # 获取最新数据
                     latest = df.iloc[-1]
@@ -263,59 +239,10 @@ class StockAnalyzer:
         """计算综合评分"""
         print(f"\n🎯 正在计算综合评分...")
         
-        # 1. 新闻情绪评分 (0-100分)
-        sentiment_score = 0
-        if sentiment_label == "正面":
-            sentiment_score = 80 + (avg_sentiment_score - 0.5) * 40  # 80-100分
-        elif sentiment_label == "负面":
-            sentiment_score = 20 + (avg_sentiment_score - 0.5) * 40  # 0-40分
-        else:  # 中性
-            sentiment_score = 40 + (avg_sentiment_score - 0.5) * 40  # 40-60分
-        
-        # 2. 技术指标评分 (0-100分)
-        tech_score = 50  # 基础分
-        
-        # MACD评分
-        if tech_data.get('diff', 0) > tech_data.get('dea', 0):
-            tech_score += 10  # 多头趋势
-        else:
-            tech_score -= 10  # 空头趋势
-        
-        # KDJ评分
-        k_value = tech_data.get('K', 50)
-        d_value = tech_data.get('D', 50)
-        if k_value < 20 and d_value < 20:
-            tech_score += 15  # 超卖，买入信号
-        elif k_value > 80 and d_value > 80:
-            tech_score -= 15  # 超买，卖出信号
-        
-        # 均线评分
-        ma5 = tech_data.get('ma5', 0)
-        ma10 = tech_data.get('ma10', 0)
-        ma20 = tech_data.get('ma20', 0)
-        close = tech_data.get('last_close', 0)
-        
-        if close > ma5 > ma10 > ma20:
-            tech_score += 10  # 多头排列
-        elif close < ma5 < ma10 < ma20:
-            tech_score -= 10  # 空头排列
-        
-        # 成交量评分
-        if tech_data.get('volume_high', False):
-            tech_score += 5  # 成交量放大
-        
-        # 涨跌幅评分
-        pct_change = tech_data.get('pct_change', 0)
-        if pct_change > 3:
-            tech_score += 5  # 大涨
-        elif pct_change < -3:
-            tech_score -= 5  # 大跌
-        
-        # 确保分数在0-100范围内
-        tech_score = max(0, min(100, tech_score))
-        
-        # 3. 综合评分 (新闻40% + 技术60%)
-        final_score = sentiment_score * 0.4 + tech_score * 0.6
+        # 评分规则与权重见 scoring.py，与 wuxi_analysis.evaluate_signals 相同
+        sentiment_score = scoring.sentiment_score(sentiment_label, avg_sentiment_score)
+        tech_score = scoring.tech_score(tech_data)
+        final_score = scoring.combine(sentiment_score, tech_score)
         
         print(f"📊 评分详情:")
         print(f"  新闻情绪评分: {sentiment_score:.1f}/100")
@@ -326,26 +253,10 @@ class StockAnalyzer:
     
     def generate_investment_advice(self, final_score):
         """生成投资建议"""
-        if final_score >= 80:
-            signal = "强烈买入"
-            confidence = "高"
-            risk_level = "低"
-        elif final_score >= 65:
-            signal = "买入"
-            confidence = "中高"
-            risk_level = "低"
-        elif final_score >= 45:
-            signal = "持有"
-            confidence = "中"
-            risk_level = "中"
-        elif final_score >= 30:
-            signal = "观望"
-            confidence = "中低"
-            risk_level = "中"
-        else:
-            signal = "卖出"
-            confidence = "高"
-            risk_level = "高"
+        idx = scoring.signal_index(final_score)
+        signal = scoring.SIGNALS[idx]
+        confidence = scoring.CONFIDENCE[idx]
+        risk_level = scoring.RISK_LEVELS[idx]
         
         return signal, confidence, risk_level
     
@@ -388,8 +299,8 @@ class StockAnalyzer:
             # 综合评分
             f.write("🎯 综合评分\n")
             f.write("-"*40 + "\n")
-            f.write(f"新闻情绪权重：40%\n")
-            f.write(f"技术指标权重：60%\n")
+            f.write(f"新闻情绪权重：{scoring.SENTIMENT_WEIGHT:.0%}\n")
+            f.write(f"技术指标权重：{1 - scoring.SENTIMENT_WEIGHT:.0%}\n")
             f.write(f"综合评分：{scores[0]:.1f}/100\n\n")
             
             # 投资建议
@@ -464,10 +375,19 @@ class StockAnalyzer:
         }
 
 def main():
-    """主函数"""
+    """主函数；python 综合评价系统.py screen [N] 进行全市场筛选（见 wuxi_analysis.run_screen）"""
     print("🎯 股票综合评价系统")
     print("="*60)
     
+    if len(sys.argv) > 1 and sys.argv[1] == 'screen':
+        import wuxi_analysis
+        top_n = int(sys.argv[2]) if len(sys.argv) > 2 else wuxi_analysis.SCREEN_TOP_N
+        print(wuxi_analysis.format_screen(*wuxi_analysis.run_screen(top_n)))
+        print(http_client.format_stats())
+        print(rate_limit.format_stats())
+        print(wuxi_analysis.universe_store.format_stats())
+        return
+    
     # 分析药明康德
     analyzer = StockAnalyzer("sh603259", "药明康德")
     result = analyzer.run_analysis()
@@ -481,6 +401,10 @@ def main():
     print(f"  投资建议: {result['advice']}")
     print(f"  置信度: {result['confidence']}")
     print(f"  风险等级: {result['risk_level']}")
+    print(http_client.format_stats())
+    print(rate_limit.format_stats())
+    print(sentiment_cache.format_stats())
+    print(news_index.format_stats())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file